@@ -4,49 +4,98 @@ Provides intelligent study planning assistance using Google Gemini API
 """
 
 import os
+import asyncio
 import logging
+import threading
 from datetime import datetime, date
 from typing import List, Dict, Optional
-import google.generativeai as genai
 from database import Database
 
 logger = logging.getLogger(__name__)
 
+# User context for the agent prompt: tasks, subjects, recent sessions, active goals
+CONTEXT_QUERIES = (
+    """
+        SELECT t.title, t.description, t.status, t.priority, 
+               t.scheduled_date, t.estimated_hours, s.subject_name
+        FROM tasks t
+        LEFT JOIN subjects s ON t.subject_id = s.subject_id
+        WHERE t.user_id = %s
+        ORDER BY t.scheduled_date, t.priority DESC
+        LIMIT 20
+    """,
+    "SELECT subject_name, priority FROM subjects WHERE user_id = %s",
+    """
+        SELECT ss.start_time, ss.end_time, ss.focus_score, t.title
+        FROM study_sessions ss
+        LEFT JOIN tasks t ON ss.task_id = t.task_id
+        WHERE ss.user_id = %s
+        ORDER BY ss.start_time DESC
+        LIMIT 5
+    """,
+    """
+        SELECT title, target_value, current_value, goal_type, target_date, status
+        FROM study_goals
+        WHERE user_id = %s AND status != 'completed'
+        ORDER BY target_date
+        LIMIT 5
+    """
+)
+
+
 class AgentService:
     """AI Agent service for study planning assistance"""
     
     def __init__(self):
+        """Create the agent; the Gemini SDK is loaded on first use"""
+        self._model = None
+        self._initialized = False
+        self._init_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """Gemini model, imported and configured the first time it is needed"""
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    self._model = self._create_model()
+                    self._initialized = True
+        return self._model
+    
+    @staticmethod
+    def _create_model():
         """Initialize the AI agent with Gemini API"""
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             logger.warning('GEMINI_API_KEY not set. Agent will not function.')
-            self.model = None
-            return
+            return None
         
         try:
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            model = genai.GenerativeModel('gemini-pro')
             logger.info('AI Agent initialized successfully with Gemini Pro')
+            return model
         except Exception as e:
             logger.error(f'Failed to initialize AI agent: {e}')
-            self.model = None
+            return None
     
     def _get_user_context(self, user_id: int) -> str:
         """Get user's study context for the AI agent"""
+        rows = [Database.fetch_all(query, [user_id]) for query in CONTEXT_QUERIES]
+        return self._format_user_context(*rows)
+    
+    async def _get_user_context_async(self, user_id: int) -> str:
+        """Async variant of _get_user_context; the four queries run concurrently"""
+        from async_database import AsyncDatabase
+        rows = await asyncio.gather(*(AsyncDatabase.fetch_all(query, [user_id]) for query in CONTEXT_QUERIES))
+        return self._format_user_context(*rows)
+    
+    @staticmethod
+    def _format_user_context(tasks, subjects, sessions, goals) -> str:
+        """Render the rows fetched by CONTEXT_QUERIES as prompt text"""
         context_parts = []
         
-        # Get user's tasks
-        tasks_query = """
-            SELECT t.title, t.description, t.status, t.priority, 
-                   t.scheduled_date, t.estimated_hours, s.subject_name
-            FROM tasks t
-            LEFT JOIN subjects s ON t.subject_id = s.subject_id
-            WHERE t.user_id = %s
-            ORDER BY t.scheduled_date, t.priority DESC
-            LIMIT 20
-        """
-        tasks = Database.fetch_all(tasks_query, [user_id])
-        
         if tasks:
             context_parts.append("## Current Tasks:")
             for task in tasks:
@@ -57,26 +106,11 @@ class AgentService:
                     f"Status: {task['status']}"
                 )
         
-        # Get subjects
-        subjects_query = "SELECT subject_name, priority FROM subjects WHERE user_id = %s"
-        subjects = Database.fetch_all(subjects_query, [user_id])
-        
         if subjects:
             context_parts.append("\n## Subjects:")
             for subject in subjects:
                 context_parts.append(f"- {subject['subject_name']} (Priority: {subject['priority']})")
         
-        # Get recent study sessions
-        sessions_query = """
-            SELECT ss.start_time, ss.end_time, ss.focus_score, t.title
-            FROM study_sessions ss
-            LEFT JOIN tasks t ON ss.task_id = t.task_id
-            WHERE ss.user_id = %s
-            ORDER BY ss.start_time DESC
-            LIMIT 5
-        """
-        sessions = Database.fetch_all(sessions_query, [user_id])
-        
         if sessions:
             context_parts.append("\n## Recent Study Sessions:")
             for session in sessions:
@@ -89,16 +123,6 @@ class AgentService:
                 focus = session['focus_score'] or 'N/A'
                 context_parts.append(f"- {task_name}: {duration}, Focus: {focus}/10")
         
-        # Get study goals
-        goals_query = """
-            SELECT title, target_value, current_value, goal_type, target_date, status
-            FROM study_goals
-            WHERE user_id = %s AND status != 'completed'
-            ORDER BY target_date
-            LIMIT 5
-        """
-        goals = Database.fetch_all(goals_query, [user_id])
-        
         if goals:
             context_parts.append("\n## Active Goals:")
             for goal in goals:
@@ -151,43 +175,67 @@ class AgentService:
             }
         
         try:
-            # Get user context
             user_context = self._get_user_context(user_id)
+            response = self.model.generate_content(self._build_chat_prompt(user_context, message, chat_history))
+            return self._chat_result(response.text, user_context)
             
-            # Build the full prompt
-            system_prompt = self._get_system_prompt()
-            context_prompt = f"\n\n## User's Current Study Data:\n{user_context}\n\n"
-            
-            # Format chat history for Gemini
-            full_prompt = system_prompt + context_prompt
-            
-            if chat_history:
-                full_prompt += "\n## Previous Conversation:\n"
-                for msg in chat_history[-5:]:  # Last 5 messages for context
-                    role = "User" if msg['role'] == 'user' else "Assistant"
-                    full_prompt += f"{role}: {msg['content']}\n"
-            
-            full_prompt += f"\nUser: {message}\nAssistant:"
-            
-            # Generate response
-            response = self.model.generate_content(full_prompt)
-            
+        except Exception as e:
+            return self._chat_error(e)
+    
+    async def chat_async(self, user_id: int, message: str, chat_history: List[Dict] = None) -> Dict:
+        """Async variant of chat(): context queries and the Gemini call do not block a thread"""
+        if not self.model:
             return {
-                'response': response.text,
-                'context_used': {
-                    'tasks_count': user_context.count('📋') + user_context.count('⏳') + user_context.count('✅'),
-                    'has_context': len(user_context) > 50
-                },
-                'error': False
+                'response': 'Sorry, the AI agent is not configured. Please add your GEMINI_API_KEY to the .env file.',
+                'error': True
             }
+        
+        try:
+            user_context = await self._get_user_context_async(user_id)
+            response = await self.model.generate_content_async(
+                self._build_chat_prompt(user_context, message, chat_history)
+            )
+            return self._chat_result(response.text, user_context)
             
         except Exception as e:
-            logger.error(f'Agent chat error: {e}', exc_info=True)
-            return {
-                'response': 'Sorry, I encountered an error processing your message. Please try again.',
-                'error': True,
-                'error_message': str(e)
-            }
+            return self._chat_error(e)
+    
+    def _build_chat_prompt(self, user_context: str, message: str, chat_history: List[Dict] = None) -> str:
+        """Build the full Gemini prompt: system prompt, study data, recent history, message"""
+        system_prompt = self._get_system_prompt()
+        context_prompt = f"\n\n## User's Current Study Data:\n{user_context}\n\n"
+        
+        # Format chat history for Gemini
+        full_prompt = system_prompt + context_prompt
+        
+        if chat_history:
+            full_prompt += "\n## Previous Conversation:\n"
+            for msg in chat_history[-5:]:  # Last 5 messages for context
+                role = "User" if msg['role'] == 'user' else "Assistant"
+                full_prompt += f"{role}: {msg['content']}\n"
+        
+        full_prompt += f"\nUser: {message}\nAssistant:"
+        return full_prompt
+    
+    @staticmethod
+    def _chat_result(text: str, user_context: str) -> Dict:
+        return {
+            'response': text,
+            'context_used': {
+                'tasks_count': user_context.count('📋') + user_context.count('⏳') + user_context.count('✅'),
+                'has_context': len(user_context) > 50
+            },
+            'error': False
+        }
+    
+    @staticmethod
+    def _chat_error(e: Exception) -> Dict:
+        logger.error(f'Agent chat error: {e}', exc_info=True)
+        return {
+            'response': 'Sorry, I encountered an error processing your message. Please try again.',
+            'error': True,
+            'error_message': str(e)
+        }
     
     def get_proactive_suggestions(self, user_id: int) -> List[str]:
         """
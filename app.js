@@ -99,20 +99,18 @@ function loadTabData(tabName) {
 
 async function loadHomeData() {
     try {
-        const subjectsRes = await fetch(`${API_URL}/users/${currentUser.user_id}/subjects`, {
+        const dashboardRes = await fetch(`${API_URL}/dashboard`, {
             headers: { 'Authorization': `Bearer ${currentToken}` }
         });
 
-        if (subjectsRes.ok) {
-            const subjectsData = await subjectsRes.json();
-            const subjectsCount = subjectsData.subjects?.length || 0;
-            document.getElementById('subjectsCount').textContent = subjectsCount;
+        if (dashboardRes.ok) {
+            const dashboard = await dashboardRes.json();
+            document.getElementById('subjectsCount').textContent = dashboard.subjects_count;
+            document.getElementById('sessionsCount').textContent = dashboard.sessions_today;
+            document.getElementById('studyTime').textContent = `${dashboard.study_hours_today}h`;
+            document.getElementById('progressPercent').textContent = `${dashboard.progress_percent}%`;
         }
 
-        document.getElementById('sessionsCount').textContent = '1';
-        document.getElementById('studyTime').textContent = '0.4h';
-        document.getElementById('progressPercent').textContent = '27%';
-
         // Check if there's a generated plan
         checkForGeneratedPlan();
     } catch (error) {
@@ -481,21 +479,21 @@ async function handleAddSubjects(event) {
                     const subjectData = await response.json();
                     const subjectId = subjectData.subject_id || subjectData.id;
 
-                    // Create chapters for each topic
-                    for (let i = 0; i < topics.length; i++) {
-                        await fetch(`${API_URL}/subjects/${subjectId}/chapters`, {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                                'Authorization': `Bearer ${currentToken}`
-                            },
-                            body: JSON.stringify({
-                                chapter_name: topics[i],
+                    // Create all chapters for this subject in one request
+                    await fetch(`${API_URL}/subjects/${subjectId}/chapters`, {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'application/json',
+                            'Authorization': `Bearer ${currentToken}`
+                        },
+                        body: JSON.stringify({
+                            chapters: topics.map((topic, i) => ({
+                                chapter_name: topic,
                                 chapter_number: i + 1,
                                 estimated_hours: 2 // Default estimate
-                            })
-                        });
-                    }
+                            }))
+                        })
+                    });
                 }
             }
         }
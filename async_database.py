@@ -0,0 +1,251 @@
+"""
+Async database access for Smart Study Planner
+asyncio counterpart of Database backed by asyncpg (PostgreSQL) or aiosqlite (SQLite)
+"""
+
+import os
+import asyncio
+import sqlite3
+import threading
+import time
+import logging
+from importlib.util import find_spec
+from db_config import DatabaseConfig
+from db_pool import PoolTimeoutError
+from database import Database, _is_read_only
+from sql_compiler import SQLCompiler
+from query_stats import QueryInstrumentation
+from row_decoding import RowDecoder, register_sqlite_converters
+
+logger = logging.getLogger(__name__)
+
+
+def async_driver_available():
+    """Whether the optional async driver for the configured backend is installed"""
+    module = 'aiosqlite' if DatabaseConfig.DB_TYPE == 'sqlite' else 'asyncpg'
+    return find_spec(module) is not None
+
+
+def _rowcount(status):
+    """Affected rows from an asyncpg command tag such as 'UPDATE 3'"""
+    tail = status.rsplit(' ', 1)[-1] if status else ''
+    return int(tail) if tail.isdigit() else -1
+
+
+class _AsyncpgBackend:
+    """asyncpg pool sized like the synchronous PostgreSQL pool"""
+
+    def __init__(self):
+        self._pool = None
+
+    async def start(self):
+        import asyncpg
+        params = DatabaseConfig.get_psycopg2_connection_params()
+        if params.get('port'):
+            params['port'] = int(params['port'])
+        self._pool = await asyncpg.create_pool(
+            min_size=1,
+            max_size=DatabaseConfig.DB_POOL_SIZE + DatabaseConfig.DB_MAX_OVERFLOW,
+            max_inactive_connection_lifetime=DatabaseConfig.DB_POOL_RECYCLE or 0,
+            init=self._init_connection,
+            **params
+        )
+        logger.info("asyncpg connection pool initialized successfully")
+
+    @staticmethod
+    async def _init_connection(conn):
+        if DatabaseConfig.DB_DECIMAL_AS_FLOAT:
+            await conn.set_type_codec(
+                'numeric', encoder=str, decoder=float, schema='pg_catalog', format='text'
+            )
+
+    async def run(self, query, params, mode):
+        sql = SQLCompiler.compile(query, 'postgresql-numbered')
+        async with self._pool.acquire(timeout=DatabaseConfig.DB_POOL_TIMEOUT) as conn:
+            if mode == 'one':
+                row = await conn.fetchrow(sql, *params)
+                return (tuple(row.keys()), [row]) if row is not None else ((), [])
+            if mode == 'all':
+                rows = await conn.fetch(sql, *params)
+                return (tuple(rows[0].keys()) if rows else (), rows)
+            return _rowcount(await conn.execute(sql, *params))
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+
+class _AiosqliteBackend:
+    """Small aiosqlite pool with the same pragmas and converters as the sync pool"""
+
+    def __init__(self):
+        self._idle = []
+        self._slots = None
+
+    async def start(self):
+        register_sqlite_converters()
+        self._slots = asyncio.Semaphore(DatabaseConfig.DB_POOL_SIZE)
+        logger.info("aiosqlite connection pool initialized successfully")
+
+    async def _connect(self):
+        import aiosqlite
+        conn = await aiosqlite.connect(
+            DatabaseConfig.DB_SQLITE_PATH,
+            timeout=DatabaseConfig.DB_POOL_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        for name, value in DatabaseConfig.get_sqlite_pragmas().items():
+            if value is None or value == '':
+                continue
+            await conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    async def run(self, query, params, mode):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), DatabaseConfig.DB_POOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise PoolTimeoutError(
+                f"No SQLite connection available within {DatabaseConfig.DB_POOL_TIMEOUT}s"
+            )
+        conn = None
+        try:
+            conn = self._idle.pop() if self._idle else await self._connect()
+            cursor = await conn.execute(SQLCompiler.compile(query, 'sqlite'), params)
+            try:
+                columns = tuple(col[0] for col in cursor.description) if cursor.description else ()
+                if mode == 'one':
+                    row = await cursor.fetchone()
+                    result = (columns, [row] if row is not None else [])
+                elif mode == 'all':
+                    result = (columns, await cursor.fetchall())
+                else:
+                    result = cursor.rowcount
+            finally:
+                await cursor.close()
+            await conn.commit()
+            self._idle.append(conn)
+            return result
+        except Exception:
+            if conn is not None:
+                try:
+                    await conn.rollback()
+                    self._idle.append(conn)
+                except Exception:
+                    await conn.close()
+            raise
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().close()
+
+
+class AsyncDatabase:
+    """
+    Async counterpart of Database with the same fetch_one/fetch_all/execute_query surface.
+
+    The driver pool lives on one background event loop per process, so it
+    can be awaited from any loop (including the per-request loops Flask uses
+    for async views) without binding connections to a short-lived loop.
+    Statements are written PostgreSQL-style (%s placeholders) as in the models.
+    SQLite writes go through Database's writer thread when it is enabled.
+    """
+
+    _backend = None
+    _loop = None
+    _pid = None
+    _started = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _owner_loop(cls):
+        """Get this process's driver loop, starting it on first use (and after a fork)"""
+        if cls._loop is None or cls._pid != os.getpid():
+            with cls._lock:
+                if cls._loop is None or cls._pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='async-database', daemon=True).start()
+                    cls._backend = _AiosqliteBackend() if DatabaseConfig.DB_TYPE == 'sqlite' else _AsyncpgBackend()
+                    cls._started = asyncio.run_coroutine_threadsafe(cls._backend.start(), loop)
+                    cls._loop, cls._pid = loop, os.getpid()
+        return cls._loop
+
+    @classmethod
+    async def _run(cls, query, params, mode):
+        if DatabaseConfig.DB_TYPE == 'sqlite' and not _is_read_only(query):
+            Database._pool()
+            if Database._writer is not None:
+                return await cls._write(query, tuple(params or ()), mode)
+        loop = cls._owner_loop()
+        await asyncio.wrap_future(cls._started)
+        start = time.perf_counter()
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                cls._backend.run(query, tuple(params or ()), mode), loop
+            )
+            return await asyncio.wrap_future(future)
+        finally:
+            QueryInstrumentation.record(query, time.perf_counter() - start)
+
+    @classmethod
+    async def _write(cls, query, params, mode):
+        """Run a SQLite write as a job of the writer thread, joining its group commit"""
+        sql = SQLCompiler.compile(query, 'sqlite')
+
+        def work(cursor):
+            cursor.execute(sql, params)
+            columns = tuple(col[0] for col in cursor.description) if cursor.description else ()
+            if mode == 'one':
+                row = cursor.fetchone()
+                return (columns, [row] if row is not None else [])
+            if mode == 'all':
+                return (columns, cursor.fetchall())
+            return cursor.rowcount
+
+        start = time.perf_counter()
+        try:
+            # Cancelling the wrapper on timeout drops the job if it has not started
+            future = asyncio.wrap_future(Database._writer.submit(work))
+            return await asyncio.wait_for(future, DatabaseConfig.DB_POOL_TIMEOUT)
+        finally:
+            QueryInstrumentation.record(query, time.perf_counter() - start)
+
+    @staticmethod
+    def _decode(columns, rows, row_format):
+        if not rows:
+            return rows
+        decode = RowDecoder.for_columns(columns, row_format)
+        return [decode(row) for row in rows]
+
+    @classmethod
+    async def execute_query(cls, query, params=None, fetch=True, row_format='dict'):
+        """Execute a query and optionally fetch results"""
+        if not fetch:
+            return await cls._run(query, params, 'none')
+        columns, rows = await cls._run(query, params, 'all')
+        return cls._decode(columns, rows, row_format)
+
+    @classmethod
+    async def fetch_one(cls, query, params=None, row_format='dict'):
+        """Fetch a single row"""
+        columns, rows = await cls._run(query, params, 'one')
+        rows = cls._decode(columns, rows, row_format)
+        return rows[0] if rows else None
+
+    @classmethod
+    async def fetch_all(cls, query, params=None, row_format='dict'):
+        """Fetch all rows"""
+        columns, rows = await cls._run(query, params, 'all')
+        return cls._decode(columns, rows, row_format)
+
+    @classmethod
+    def close(cls):
+        """Close the driver pool and stop the background loop"""
+        if cls._loop is None or cls._pid != os.getpid():
+            return
+        loop = cls._loop
+        asyncio.run_coroutine_threadsafe(cls._backend.close(), loop).result(timeout=DatabaseConfig.DB_POOL_TIMEOUT)
+        loop.call_soon_threadsafe(loop.stop)
+        cls._loop = cls._backend = cls._started = None
+        logger.info("Async database pool closed")
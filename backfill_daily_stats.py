@@ -0,0 +1,32 @@
+"""
+Rebuild the daily_user_stats rollup from study_sessions, task_progress and tasks
+
+    python backfill_daily_stats.py [--user-id 42]
+
+Run after bulk imports or manual SQL edits to the raw tables; normal writes
+keep the rollup current on their own.
+"""
+
+import argparse
+import logging
+import time
+
+from database import Database
+from models import DailyStats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the daily study rollup')
+    parser.add_argument('--user-id', type=int, help='only rebuild this user (default: everyone)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    DailyStats.rebuild(args.user_id)
+    scope = f"user {args.user_id}" if args.user_id else "all users"
+    print(f"Rebuilt daily_user_stats for {scope} in {time.perf_counter() - start:.2f}s")
+    Database.close_pool()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    main()
@@ -0,0 +1,76 @@
+"""
+Priority scoring benchmark for Smart Study Planner
+Scores the same generated backlog with the per-task scalar function, the
+batch API from task rows and the batch API from prebuilt columns, and checks
+that every method returns identical scores. No database needed.
+
+    python bench_priority_scoring.py [--tasks 50000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import priority_scoring
+from records import TaskRecord
+
+
+def generate_tasks(count, rng):
+    """TaskRecords with mixed priorities, types, progress and deadlines (some on day boundaries)"""
+    now = datetime.now()
+    types = ['study', 'revision', 'assignment', 'exam', 'project']
+    tasks = []
+    for task_id in range(1, count + 1):
+        if rng.random() < 0.2:
+            deadline = None
+        elif rng.random() < 0.2:
+            deadline = now + timedelta(days=rng.randint(-3, 10), microseconds=rng.choice([-1, 0, 1]))
+        else:
+            deadline = now + timedelta(seconds=rng.randint(-5 * 86400, 30 * 86400))
+        tasks.append(TaskRecord(
+            task_id=task_id, user_id=1, title=f"task {task_id}", task_type=rng.choice(types),
+            priority=rng.randint(1, 5), deadline=deadline, completion_percentage=rng.randint(0, 100)
+        ))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare scalar and batch priority scoring')
+    parser.add_argument('--tasks', type=int, default=50000, help='tasks to score')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per method (best time is reported)')
+    parser.add_argument('--seed', type=int, default=22)
+    args = parser.parse_args()
+
+    tasks = generate_tasks(args.tasks, random.Random(args.seed))
+    now = datetime.now()
+    columns = priority_scoring.task_columns(tasks)
+
+    methods = {
+        'scalar': lambda: [priority_scoring.score_task(task, now) for task in tasks],
+        'batch rows': lambda: priority_scoring.score_tasks(tasks, now=now),
+        'batch columns': lambda: priority_scoring.score_columns(*columns, now=now),
+    }
+    if priority_scoring.np is not None:
+        methods['columns python'] = lambda: priority_scoring.score_columns(*columns, now=now, use_numpy=False)
+
+    print(f"{args.tasks} tasks, NumPy {'available' if priority_scoring.np is not None else 'not installed'}")
+    print(f"{'method':<16}{'ms':>10}{'us/task':>10}")
+    expected = None
+    for name, score in methods.items():
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            scores = score()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if expected is None:
+            expected = scores
+        elif scores != expected:
+            raise SystemExit(f"{name} scores differ from the scalar scores")
+        print(f"{name:<16}{best * 1000:>10.2f}{best * 1e6 / args.tasks:>10.3f}")
+    print("all methods returned identical scores")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Schedule builder benchmark for Smart Study Planner
+Runs the previous round-robin first-fit suggest_schedule loop, the
+schedule_engine best-fit packer and the 'optimal' schedule mode on the same
+generated pending tasks and compares run time, hours placed, deadline misses
+and score-weighted hours done on time. No database needed.
+
+    python bench_schedule.py [--tasks 100 1000 5000] [--days 7 30 90] [--hours 4]
+"""
+
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from planner_logic import SmartPlanner
+from records import TaskRecord
+
+
+def legacy_schedule(tasks, available_hours_per_day, days_ahead, start_date):
+    """suggest_schedule's placement loop before schedule_engine (kept for comparison)"""
+    tasks_with_scores = [{'task': t, 'score': SmartPlanner.calculate_priority_score(t)} for t in tasks]
+    tasks_with_scores.sort(key=lambda x: x['score'], reverse=True)
+
+    schedule = {}
+    for i in range(days_ahead):
+        schedule[(start_date + timedelta(days=i)).isoformat()] = []
+
+    current_day_index = 0
+    remaining_hours = {day: available_hours_per_day for day in schedule.keys()}
+    for item in tasks_with_scores:
+        task = item['task']
+        estimated_hours = task.estimated_hours
+        scheduled = False
+        attempts = 0
+        while not scheduled and attempts < days_ahead:
+            day_key = list(schedule.keys())[current_day_index]
+            if remaining_hours[day_key] >= estimated_hours:
+                schedule[day_key].append({
+                    'task_id': task.task_id,
+                    'estimated_hours': estimated_hours,
+                    'deadline': task.deadline.isoformat() if task.deadline else None
+                })
+                remaining_hours[day_key] -= estimated_hours
+                scheduled = True
+            else:
+                current_day_index = (current_day_index + 1) % days_ahead
+                attempts += 1
+    return schedule
+
+
+def generate_tasks(count, days, rng):
+    """Pending tasks with mixed sizes, priorities and deadlines"""
+    now = datetime.now()
+    types = ['study', 'revision', 'assignment', 'exam']
+    tasks = []
+    for task_id in range(1, count + 1):
+        deadline = now + timedelta(days=rng.randint(0, days), hours=rng.randint(0, 23)) if rng.random() < 0.8 else None
+        tasks.append(TaskRecord(
+            task_id=task_id, user_id=1, title=f"task {task_id}", task_type=rng.choice(types),
+            priority=rng.randint(1, 5), estimated_hours=rng.choice([0.5, 1, 1.5, 2, 3, 4, 6, 8]),
+            deadline=deadline, status='pending'
+        ))
+    return tasks
+
+
+def evaluate(schedule, tasks, start_date):
+    """
+    Hours placed, tasks fully placed, hours landing after their task's
+    deadline and priority-score-weighted hours placed by the deadline
+    """
+    deadline_day = {t.task_id: t.deadline.date() if t.deadline else None for t in tasks}
+    score = dict(zip(deadline_day, SmartPlanner.calculate_priority_scores(tasks)))
+    placed_hours = {}
+    late_hours = 0.0
+    on_time_value = 0.0
+    for day, entries in schedule.items():
+        day = date.fromisoformat(day)
+        for entry in entries:
+            placed_hours[entry['task_id']] = placed_hours.get(entry['task_id'], 0) + entry['estimated_hours']
+            due = deadline_day[entry['task_id']]
+            if due and day > due:
+                late_hours += entry['estimated_hours']
+            else:
+                on_time_value += score[entry['task_id']] * entry['estimated_hours']
+    complete = sum(1 for t in tasks if placed_hours.get(t.task_id, 0) >= t.estimated_hours - 1e-9)
+    return sum(placed_hours.values()), complete, late_hours, on_time_value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare schedule builders')
+    parser.add_argument('--tasks', type=int, nargs='+', default=[100, 1000, 5000], help='pending task counts')
+    parser.add_argument('--days', type=int, nargs='+', default=[7, 30, 90], help='days_ahead values')
+    parser.add_argument('--hours', type=float, default=4, help='available hours per day')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case (best time is reported)')
+    parser.add_argument('--budget', type=int, default=SmartPlanner.MAX_TIME_BUDGET_MS, help='optimal mode time budget (ms)')
+    parser.add_argument('--seed', type=int, default=21)
+    args = parser.parse_args()
+
+    start_date = date.today()
+    builders = {
+        'legacy': legacy_schedule,
+        'engine': lambda tasks, hours, days, start: SmartPlanner.build_schedule(tasks, hours, days, start),
+        'optimal': lambda tasks, hours, days, start: SmartPlanner.build_schedule(
+            tasks, hours, days, start, mode='optimal', time_budget_ms=args.budget
+        )
+    }
+
+    print(f"{args.hours:g} h/day; 'placed' is hours scheduled out of total capacity, "
+          f"'whole' is tasks fully placed, 'late' is hours after the task's deadline, "
+          f"'on-time' is score-weighted hours by the deadline")
+    print(f"{'tasks':>6}{'days':>6} {'builder':<8}{'ms':>10}{'placed':>16}{'whole':>8}{'late h':>8}{'on-time':>10}")
+    for count in args.tasks:
+        for days in args.days:
+            tasks = generate_tasks(count, days, random.Random(args.seed))
+            capacity = args.hours * days
+            for name, build in builders.items():
+                best = None
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    schedule = build(tasks, args.hours, days, start_date)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                placed, whole, late, on_time = evaluate(schedule, tasks, start_date)
+                print(
+                    f"{count:>6}{days:>6} {name:<8}{best * 1000:>10.2f}"
+                    f"{f'{placed:.0f}/{capacity:.0f}':>16}{whole:>8}{late:>8.1f}{on_time:>10.0f}"
+                )
+
+
+if __name__ == '__main__':
+    import logging
+    logging.disable(logging.WARNING)
+    main()
@@ -0,0 +1,141 @@
+"""
+SQLite write-throughput benchmark for Smart Study Planner
+Compares the single-writer queue (group commit) with every thread writing
+through its own pooled connection, on a fresh database file per run.
+
+    python bench_sqlite_writes.py [--threads 16] [--writes 200] [--synchronous FULL]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    'direct': 'False',  # each request thread writes on its own pooled connection
+    'queue': 'True'     # writes go through Database's single writer thread
+}
+
+_SCHEMA = """
+    CREATE TABLE bench_writes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        value REAL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_INSERT = "INSERT INTO bench_writes (user_id, value) VALUES (%s, %s) RETURNING id"
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def worker(args):
+    """Run the workload in this process (configured through the environment)"""
+    from database import Database
+
+    Database.execute_query(_SCHEMA, fetch=False)
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+
+    def run(thread_id):
+        local_latencies = []
+        for i in range(args.writes):
+            start = time.perf_counter()
+            try:
+                Database.fetch_one(_INSERT, (thread_id, float(i)))
+            except Exception as e:
+                with lock:
+                    key = str(e).split(':')[0]
+                    errors[key] = errors.get(key, 0) + 1
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local_latencies)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats = Database.pool_stats()
+    Database.close_pool()
+    print(json.dumps({
+        'writes': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'avg_batch': stats.get('writer', {}).get('avg_batch')
+    }))
+
+
+def run_mode(mode, args):
+    """Run one mode in a fresh interpreter against a new database file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DB_TYPE='sqlite',
+            DB_SQLITE_PATH=os.path.join(tmp, 'bench.db'),
+            DB_SQLITE_WRITE_QUEUE=MODES[mode],
+            DB_SQLITE_SYNCHRONOUS=args.synchronous,
+            DB_POOL_SIZE=str(args.threads),
+            DB_POOL_TIMEOUT=str(args.busy_timeout)
+        )
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker',
+             '--threads', str(args.threads), '--writes', str(args.writes)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare SQLite write paths under concurrent load')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent writer threads')
+    parser.add_argument('--writes', type=int, default=200, help='writes per thread')
+    parser.add_argument('--synchronous', default='NORMAL', help='PRAGMA synchronous (NORMAL or FULL)')
+    parser.add_argument('--busy-timeout', type=float, default=5.0, help='SQLite busy timeout in seconds')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    total = args.threads * args.writes
+    print(f"{args.threads} threads x {args.writes} writes, synchronous={args.synchronous}")
+    print(f"{'mode':<8}{'writes/s':>10}{'ok':>8}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}{'batch':>7}")
+    for mode in MODES:
+        try:
+            r = run_mode(mode, args)
+        except RuntimeError as e:
+            print(f"{mode:<8}error: {e}")
+            continue
+        failed = total - r['writes']
+        batch = f"{r['avg_batch']:.1f}" if r['avg_batch'] else '-'
+        print(
+            f"{mode:<8}{r['writes'] / r['seconds']:>10.0f}{r['writes']:>8}{failed:>8}"
+            f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{batch:>7}"
+        )
+        for message, count in r['errors'].items():
+            print(f"        {count} x {message}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup-time benchmark for Smart Study Planner
+Measures cold import cost, app construction and the first query, each in a
+fresh interpreter so module caches never hide a regression.
+
+    python bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Each stage runs in its own interpreter; earlier imports are part of the
+# measured stage so the numbers add up to a real cold start
+STAGES = [
+    ('import db_config', 'import db_config'),
+    ('import database', 'import database'),
+    ('import models', 'import models'),
+    ('import agent_service', 'import agent_service'),
+    # main builds its module-level app on import
+    ('import main', 'import main'),
+    ('first query', 'import main; from database import Database; Database.test_connection()'),
+]
+
+_TIMER = """
+import time, json
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+import sys
+print(json.dumps({{'ms': elapsed * 1000, 'pool': 'database' in sys.modules and sys.modules['database'].Database._connection_pool is not None, 'genai': 'google.generativeai' in sys.modules}}))
+"""
+
+
+def run_stage(statement):
+    """Time one statement in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-c', _TIMER.format(statement=statement)],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else 'failed')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Smart Study Planner startup cost')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per stage')
+    args = parser.parse_args()
+
+    print(f"{'stage':<24}{'median ms':>12}{'min ms':>10}  side effects")
+    for label, statement in STAGES:
+        try:
+            samples = [run_stage(statement) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{label:<24}{'error':>12}{'':>10}  {e}")
+            continue
+
+        times = [sample['ms'] for sample in samples]
+        effects = []
+        if samples[-1]['pool']:
+            effects.append('pool created')
+        if samples[-1]['genai']:
+            effects.append('LLM SDK imported')
+        print(f"{label:<24}{statistics.median(times):>12.1f}{min(times):>10.1f}  {', '.join(effects) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
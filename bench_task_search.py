@@ -0,0 +1,148 @@
+"""
+Task search benchmark for Smart Study Planner
+Loads one user with many generated tasks into a fresh SQLite database and
+compares the old leading-wildcard ILIKE filter with the FTS5 index behind
+Task.search, on the same one- and two-word prefix queries.
+
+    python bench_task_search.py [--tasks 100000] [--queries 200] [--limit 50]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import string
+import tempfile
+import time
+
+_SCHEMA = [
+    "CREATE TABLE users (user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT)",
+    """
+    CREATE TABLE subjects (
+        subject_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER, subject_name TEXT, color_code TEXT
+    )
+    """,
+    """
+    CREATE TABLE tasks (
+        task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL REFERENCES users(user_id),
+        subject_id INTEGER REFERENCES subjects(subject_id),
+        title TEXT NOT NULL,
+        description TEXT,
+        status TEXT DEFAULT 'pending',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX idx_tasks_user_created ON tasks(user_id, created_at DESC, task_id DESC)",
+]
+
+# The listing query main.py used before the full-text index
+_ILIKE_QUERY = """
+    SELECT t.*, s.subject_name, s.color_code
+    FROM tasks t
+    LEFT JOIN subjects s ON t.subject_id = s.subject_id
+    WHERE t.user_id = %s AND (t.title ILIKE %s OR t.description ILIKE %s)
+    ORDER BY t.created_at DESC, t.task_id DESC
+    LIMIT %s
+"""
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def _vocabulary(rng, size):
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))) for _ in range(size)]
+
+
+def build(path, args, rng, words):
+    """Create the schema, the FTS index and one user's tasks"""
+    from migrate_task_search import SQLITE_STATEMENTS
+
+    conn = sqlite3.connect(path)
+    for statement in _SCHEMA + SQLITE_STATEMENTS:
+        conn.execute(statement)
+    conn.execute("INSERT INTO users (username) VALUES ('bench')")
+    conn.execute("INSERT INTO users (username) VALUES ('other')")
+    conn.executemany(
+        "INSERT INTO subjects (user_id, subject_name, color_code) VALUES (1, ?, '#3B82F6')",
+        [(f"subject {i}",) for i in range(10)]
+    )
+
+    # Zipf-like word choice so queries hit both common and rare terms
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+
+    def text(low, high):
+        return ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(low, high)))
+
+    start = time.perf_counter()
+    for user_id, count in ((1, args.tasks), (2, args.tasks // 10)):
+        rows = [(user_id, rng.randint(1, 10), text(2, 6), text(6, 20)) for _ in range(count)]
+        conn.executemany("INSERT INTO tasks (user_id, subject_id, title, description) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ILIKE and full-text task search')
+    parser.add_argument('--tasks', type=int, default=100000, help='tasks for the searched user')
+    parser.add_argument('--queries', type=int, default=200, help='search queries to time per method')
+    parser.add_argument('--limit', type=int, default=50, help='rows returned per search')
+    parser.add_argument('--vocabulary', type=int, default=5000, help='distinct words in generated text')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = _vocabulary(rng, args.vocabulary)
+    workdir = tempfile.mkdtemp(prefix='bench_search_')
+    path = os.path.join(workdir, 'bench.db')
+
+    # Database reads its configuration at import time
+    os.environ['DB_TYPE'] = 'sqlite'
+    os.environ['DB_SQLITE_PATH'] = path
+    load_seconds = build(path, args, rng, words)
+    from database import Database
+    from models import Task
+
+    queries = []
+    for _ in range(args.queries):
+        picked = rng.sample(words[:len(words) // 2], rng.choice((1, 1, 2)))
+        queries.append(' '.join(word[:rng.randint(3, len(word))] for word in picked))
+
+    def ilike(query):
+        pattern = f"%{query}%"
+        return Database.fetch_all(_ILIKE_QUERY, (1, pattern, pattern, args.limit))
+
+    methods = {
+        'ilike': ilike,
+        'fts': lambda query: Task.search(1, query, limit=args.limit),
+    }
+
+    print(f"{args.tasks} tasks for the searched user, loaded in {load_seconds:.1f}s "
+          f"(SQLite {sqlite3.sqlite_version})")
+    print(f"{'method':<8}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'avg rows':>10}")
+    for name, search in methods.items():
+        search(queries[0])  # warm the page cache and statement cache
+        latencies, rows = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            rows += len(search(query))
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(
+            f"{name:<8}{_percentile(latencies, 0.5):>9.2f}{_percentile(latencies, 0.95):>9.2f}"
+            f"{max(latencies):>9.2f}{rows / len(queries):>10.1f}"
+        )
+    print("ilike matches substrings anywhere in a word; fts matches word prefixes, best match first")
+
+    Database.close_pool()
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
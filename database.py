@@ -4,143 +4,886 @@ Handles both PostgreSQL and SQLite database connections
 """
 
 import os
+import io
+import re
+import uuid
+import queue
+import threading
+import time as _time
+from concurrent.futures import Future, FIRST_COMPLETED, TimeoutError as FutureTimeoutError, wait as wait_futures
+from datetime import date, datetime, time
 from contextlib import contextmanager
+from functools import lru_cache
 from db_config import DatabaseConfig
+from db_pool import SQLiteConnectionPool, PostgresConnectionPool
+from sql_compiler import SQLCompiler
+from prepared_statements import PreparedStatementCache
+from query_stats import InstrumentedCursor, QueryInstrumentation
+from row_decoding import RowDecoder, register_sqlite_converters, register_postgres_decimal_as_float
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Import appropriate database driver
 if DatabaseConfig.DB_TYPE == 'sqlite':
     import sqlite3
-    # Enable foreign key support for SQLite
-    def dict_factory(cursor, row):
-        d = {}
-        for idx, col in enumerate(cursor.description):
-            d[col[0]] = row[idx]
-        return d
+    # DATE/DATETIME/TIME/DECIMAL/BOOLEAN columns are converted once by the driver
+    register_sqlite_converters()
 else:
     import psycopg2
-    from psycopg2 import pool, extras
+    from psycopg2 import extras, extensions
+    if DatabaseConfig.DB_DECIMAL_AS_FLOAT:
+        register_postgres_decimal_as_float()
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+_READ_RE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+_WRITE_RE = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|NEXTVAL|SETVAL)\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=DatabaseConfig.DB_STATEMENT_CACHE_SIZE)
+def _is_read_only(query):
+    """Whether a statement only reads (safe to send to a replica)"""
+    return bool(_READ_RE.match(query)) and not _WRITE_RE.search(query)
+
+
+def _identifier(name):
+    """Validate a table/column name used to build bulk statements"""
+    if not _IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return name
+
+
+def _copy_text_value(value):
+    """Encode a Python value for PostgreSQL COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+class SQLiteWriterError(Exception):
+    """Raised for writes the SQLite writer thread can no longer run"""
+
+
+class SQLiteWriter:
+    """
+    Single SQLite writer thread fed by a queue (group commit).
+    
+    Every write job is a callable taking a cursor. The writer takes whatever
+    jobs are queued (up to batch_size, optionally waiting group_commit_ms for
+    more) and runs them in one BEGIN IMMEDIATE transaction, each inside its
+    own savepoint so a failing job is rolled back alone. Callers get their
+    result only after the shared COMMIT. Readers keep using the pooled WAL
+    connections, so writers never contend with each other for the lock.
+    Database.transaction() blocks run as a single job through hold().
+    
+    Once the thread exits (stop() or an error) submit raises and every job
+    still queued fails with SQLiteWriterError, so no caller waits forever.
+    """
+    
+    def __init__(self, pool, batch_size=64, group_commit_ms=0):
+        self._pool = pool
+        self.batch_size = max(1, int(batch_size))
+        self.group_commit = max(0.0, group_commit_ms / 1000.0)
+        self._queue = queue.Queue()
+        self._stopping = False
+        # Guards _accepting so no job is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._accepting = True
+        
+        self._jobs = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._failed_jobs = 0
+        self._failed_batches = 0
+        
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+    
+    def submit(self, work):
+        """Queue work(cursor); returns a Future resolved after the group commit"""
+        future = Future()
+        with self._lock:
+            if not self._accepting or not self._thread.is_alive():
+                raise SQLiteWriterError("SQLite writer is not running")
+            self._queue.put((work, future))
+        return future
+    
+    @contextmanager
+    def hold(self, timeout=None):
+        """
+        Run the block as one write job on the writer's connection.
+        
+        The writer opens the job's savepoint and waits while the block runs
+        on the calling thread, so its statements never take the write lock
+        on another connection. The savepoint is rolled back if the block
+        raises; otherwise the context exits after the group commit.
+        """
+        ready = Future()
+        finished = threading.Event()
+        rolled_back = []
+        
+        def work(cursor):
+            ready.set_result(cursor.connection)
+            finished.wait()
+            if rolled_back:
+                raise SQLiteWriterError("Transaction block was rolled back")
+        
+        future = self.submit(work)
+        try:
+            done, _ = wait_futures([ready, future], timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                future.cancel()
+                raise FutureTimeoutError()
+            if not ready.done():
+                # The writer failed or stopped before reaching the job
+                future.result()
+            yield ready.result()
+        except BaseException:
+            rolled_back.append(True)
+            raise
+        finally:
+            finished.set()
+        future.result(timeout=timeout)
+    
+    def stop(self, timeout=None):
+        """Finish the queued jobs and stop the writer thread"""
+        with self._lock:
+            if self._accepting:
+                self._accepting = False
+                self._queue.put(None)
+        self._thread.join(timeout)
+    
+    def _next_batch(self):
+        job = self._queue.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = _time.monotonic() + self.group_commit
+        while len(batch) < self.batch_size:
+            remaining = deadline - _time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._stopping = True
+                break
+            batch.append(job)
+        return batch
+    
+    def _run(self):
+        conn = None
+        batch = None
+        error = None
+        try:
+            conn = self._pool.getconn()
+            # Transactions are managed explicitly below
+            conn.isolation_level = None
+            while not self._stopping:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                self._commit_batch(conn, batch)
+                batch = None
+        except Exception as e:
+            logger.error(f"SQLite writer thread stopped: {e}")
+            error = e
+        finally:
+            with self._lock:
+                self._accepting = False
+            self._fail_pending(batch or [], error)
+            if conn is not None:
+                self._pool.putconn(conn, close=True)
+    
+    def _fail_pending(self, batch, error):
+        """Fail the unfinished jobs of batch and everything still queued"""
+        jobs = list(batch)
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                jobs.append(job)
+        for _, future in jobs:
+            if not future.done():
+                self._failed_jobs += 1
+                stopped = SQLiteWriterError(f"SQLite writer stopped: {error}" if error else "SQLite writer stopped")
+                stopped.__cause__ = error
+                future.set_exception(stopped)
+    
+    def _commit_batch(self, conn, batch):
+        outcomes = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for work, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT write_job")
+                try:
+                    result = work(cursor)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT write_job")
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+                cursor.execute("RELEASE SAVEPOINT write_job")
+            cursor.execute("COMMIT")
+        except Exception as e:
+            # Nothing in the group is durable; fail every job in it
+            logger.error(f"SQLite group commit failed: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self._failed_batches += 1
+            outcomes = [(future, None, e) for _, future in batch if not future.done()]
+        finally:
+            cursor.close()
+        
+        self._batches += 1
+        self._jobs += len(batch)
+        self._max_batch = max(self._max_batch, len(batch))
+        for future, result, error in outcomes:
+            if error is not None:
+                self._failed_jobs += 1
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def stats(self):
+        """Return writer queue counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'jobs': self._jobs,
+            'batches': self._batches,
+            'avg_batch': round(self._jobs / self._batches, 2) if self._batches else 0.0,
+            'max_batch': self._max_batch,
+            'failed_jobs': self._failed_jobs,
+            'failed_batches': self._failed_batches
+        }
+
 
 class Database:
     """Database connection manager for both PostgreSQL and SQLite"""
     
     _connection_pool = None
+    _replica_pool = None
+    _writer = None
+    # Process that created the pools; a forked child builds its own
+    _pool_pid = None
+    _pool_lock = threading.Lock()
     _db_type = DatabaseConfig.DB_TYPE
+    _local = threading.local()
+    _prepared = (
+        PreparedStatementCache(DatabaseConfig.DB_PREPARED_CACHE_SIZE)
+        if DatabaseConfig.DB_PREPARED_STATEMENTS and DatabaseConfig.DB_TYPE != 'sqlite'
+        else None
+    )
     
     @classmethod
     def initialize_pool(cls):
-        """Initialize the connection pool"""
+        """Initialize the connection pool for the current process"""
         try:
-            if cls._connection_pool is None:
+            with cls._pool_lock:
+                if cls._connection_pool is not None and cls._pool_pid == os.getpid():
+                    return
+                if cls._connection_pool is not None:
+                    # Inherited across fork: the sockets belong to the parent, so
+                    # drop the pool without closing them and start afresh
+                    logger.info("Process forked; creating a new connection pool")
+                    cls._connection_pool = None
+                    cls._replica_pool = None
+                    cls._writer = None
+                    cls._local = threading.local()
                 if cls._db_type == 'sqlite':
-                    # SQLite doesn't need a connection pool
-                    cls._connection_pool = True
-                    logger.info("SQLite database initialized successfully")
+                    cls._connection_pool = SQLiteConnectionPool(
+                        DatabaseConfig.DB_SQLITE_PATH,
+                        max_size=DatabaseConfig.DB_POOL_SIZE,
+                        timeout=DatabaseConfig.DB_POOL_TIMEOUT,
+                        pragmas=DatabaseConfig.get_sqlite_pragmas(),
+                        detect_types=sqlite3.PARSE_DECLTYPES
+                    )
+                    logger.info("SQLite connection pool initialized successfully")
+                    
+                    if DatabaseConfig.DB_SQLITE_WRITE_QUEUE:
+                        cls._writer = SQLiteWriter(
+                            SQLiteConnectionPool(
+                                DatabaseConfig.DB_SQLITE_PATH,
+                                max_size=1,
+                                timeout=DatabaseConfig.DB_POOL_TIMEOUT,
+                                pragmas=DatabaseConfig.get_sqlite_pragmas(),
+                                detect_types=sqlite3.PARSE_DECLTYPES
+                            ),
+                            batch_size=DatabaseConfig.DB_SQLITE_WRITE_BATCH,
+                            group_commit_ms=DatabaseConfig.DB_SQLITE_GROUP_COMMIT_MS
+                        )
+                        logger.info("SQLite write queue started")
                 else:
-                    cls._connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                        minconn=1,
-                        maxconn=DatabaseConfig.DB_POOL_SIZE,
+                    cls._connection_pool = PostgresConnectionPool(
+                        pool_size=DatabaseConfig.DB_POOL_SIZE,
+                        max_overflow=DatabaseConfig.DB_MAX_OVERFLOW,
+                        timeout=DatabaseConfig.DB_POOL_TIMEOUT,
+                        recycle=DatabaseConfig.DB_POOL_RECYCLE,
+                        pre_ping=DatabaseConfig.DB_POOL_PRE_PING,
+                        ping_interval=DatabaseConfig.DB_POOL_PING_INTERVAL,
                         **DatabaseConfig.get_psycopg2_connection_params()
                     )
                     logger.info("PostgreSQL connection pool initialized successfully")
+                    
+                    replica_params = DatabaseConfig.get_replica_connection_params()
+                    if replica_params:
+                        cls._replica_pool = PostgresConnectionPool(
+                            pool_size=DatabaseConfig.DB_REPLICA_POOL_SIZE,
+                            max_overflow=DatabaseConfig.DB_MAX_OVERFLOW,
+                            timeout=DatabaseConfig.DB_POOL_TIMEOUT,
+                            recycle=DatabaseConfig.DB_POOL_RECYCLE,
+                            pre_ping=DatabaseConfig.DB_POOL_PRE_PING,
+                            ping_interval=DatabaseConfig.DB_POOL_PING_INTERVAL,
+                            **replica_params
+                        )
+                        logger.info("PostgreSQL replica pool initialized successfully")
+                cls._pool_pid = os.getpid()
         except Exception as e:
             logger.error(f"Error initializing database connection: {e}")
             raise
     
+    @classmethod
+    def _pool(cls):
+        """Get this process's pool, creating it on first use (and after a fork)"""
+        if cls._connection_pool is None or cls._pool_pid != os.getpid():
+            cls.initialize_pool()
+        return cls._connection_pool
+    
     @classmethod
     def close_pool(cls):
         """Close all connections"""
-        if cls._db_type != 'sqlite' and cls._connection_pool:
-            cls._connection_pool.closeall()
+        if cls._connection_pool:
+            # Never close a pool inherited from the parent process
+            if cls._pool_pid == os.getpid():
+                if cls._writer is not None:
+                    cls._writer.stop(DatabaseConfig.DB_POOL_TIMEOUT)
+                cls._connection_pool.closeall()
+                if cls._replica_pool is not None:
+                    cls._replica_pool.closeall()
+            cls._connection_pool = None
+            cls._replica_pool = None
+            cls._writer = None
             logger.info("Database connection pool closed")
     
+    @classmethod
+    def pool_stats(cls):
+        """Get connection pool usage statistics"""
+        if cls._connection_pool is None or cls._pool_pid != os.getpid():
+            return {'backend': cls._db_type, 'initialized': False}
+        stats = cls._connection_pool.stats()
+        if cls._replica_pool is not None:
+            stats['replica'] = cls._replica_pool.stats()
+        if cls._writer is not None:
+            stats['writer'] = cls._writer.stats()
+        return stats
+    
+    # ---- Read replica routing ----
+    
+    # user_id -> monotonic time until which that user's reads stay on the primary
+    _recent_writers = {}
+    
+    @classmethod
+    def set_current_user(cls, user_id):
+        """Bind the user served by this thread (keys read-your-writes stickiness)"""
+        cls._local.user_id = user_id
+        cls._local.wrote = False
+    
     @classmethod
     @contextmanager
-    def get_connection(cls):
-        """Get a database connection"""
-        if cls._connection_pool is None:
-            cls.initialize_pool()
+    def use_replica(cls):
+        """
+        Send read-only statements in this block to the replica, even right
+        after a write. For lag-tolerant reads such as analytics.
+        """
+        previous = getattr(cls._local, 'route', None)
+        cls._local.route = 'replica'
+        try:
+            yield
+        finally:
+            cls._local.route = previous
+    
+    @classmethod
+    @contextmanager
+    def use_primary(cls):
+        """Keep every statement in this block on the primary"""
+        previous = getattr(cls._local, 'route', None)
+        cls._local.route = 'primary'
+        try:
+            yield
+        finally:
+            cls._local.route = previous
+    
+    @classmethod
+    def _note_write(cls):
+        """Pin this thread's (and its user's) reads to the primary for a while"""
+        if cls._replica_pool is None:
+            return
+        cls._local.wrote = True
+        user_id = getattr(cls._local, 'user_id', None)
+        if user_id is not None:
+            now = _time.monotonic()
+            if len(cls._recent_writers) > 10000:
+                cls._recent_writers = {
+                    uid: until for uid, until in cls._recent_writers.items() if until > now
+                }
+            cls._recent_writers[user_id] = now + DatabaseConfig.DB_REPLICA_STICKY_SECONDS
+    
+    @classmethod
+    def _use_replica_for(cls, query):
+        """Whether a statement should run on the replica"""
+        if cls._replica_pool is None or cls.in_transaction() or not _is_read_only(query):
+            return False
+        route = getattr(cls._local, 'route', None)
+        if route is not None:
+            return route == 'replica'
+        if not DatabaseConfig.DB_REPLICA_AUTO_ROUTE or getattr(cls._local, 'wrote', False):
+            return False
+        user_id = getattr(cls._local, 'user_id', None)
+        return user_id is None or cls._recent_writers.get(user_id, 0) <= _time.monotonic()
+    
+    @classmethod
+    def in_transaction(cls):
+        """Whether the current thread is inside Database.transaction()"""
+        return getattr(cls._local, 'conn', None) is not None
+    
+    @classmethod
+    @contextmanager
+    def transaction(cls):
+        """
+        Run several model calls on one connection with a single commit.
         
-        if cls._db_type == 'sqlite':
-            conn = sqlite3.connect(DatabaseConfig.DB_SQLITE_PATH)
-            conn.row_factory = dict_factory
-            conn.execute("PRAGMA foreign_keys = ON")
+        Every Database call made on this thread inside the block joins the
+        transaction instead of checking out its own connection and committing.
+        Nested blocks join the outermost one. The work is rolled back if the
+        block raises. With the SQLite writer enabled the block runs as one
+        writer job, on the writer's connection.
+        """
+        if cls.in_transaction():
+            yield cls._local.conn
+            return
+        
+        pool = cls._pool()
+        if cls._writer is not None:
+            with cls._writer.hold(DatabaseConfig.DB_POOL_TIMEOUT) as conn:
+                cls._local.conn = conn
+                try:
+                    yield conn
+                finally:
+                    cls._local.conn = None
+            cls._note_write()
+            return
+        
+        conn = pool.getconn()
+        cls._local.conn = conn
+        try:
+            if cls._db_type == 'sqlite':
+                # Take the write lock up front; upgrading a deferred read
+                # transaction fails with "database is locked" under contention
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+            cls._note_write()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cls._local.conn = None
+            pool.putconn(conn)
+    
+    @classmethod
+    @contextmanager
+    def get_connection(cls, replica=False):
+        """
+        Get a database connection (the current transaction's, if any).
+        With replica set, a replica connection is used when one is configured.
+        """
+        if cls.in_transaction():
+            yield cls._local.conn
+            return
+        
+        pool = cls._pool()
+        if replica and cls._replica_pool is not None:
             try:
-                yield conn
-            finally:
-                conn.close()
+                conn = cls._replica_pool.getconn()
+                pool = cls._replica_pool
+            except Exception as e:
+                logger.warning(f"Replica unavailable, reading from primary: {e}")
+                conn = pool.getconn()
         else:
-            conn = cls._connection_pool.getconn()
-            try:
-                yield conn
-            finally:
-                cls._connection_pool.putconn(conn)
+            conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn)
     
     @classmethod
     @contextmanager
-    def get_cursor(cls, cursor_factory=None):
+    def get_cursor(cls, cursor_factory=None, replica=False):
         """Get a cursor from a connection"""
-        with cls.get_connection() as conn:
+        in_transaction = cls.in_transaction()
+        with cls.get_connection(replica) as conn:
             if cls._db_type == 'sqlite':
                 cursor = conn.cursor()
             else:
                 cursor = conn.cursor(cursor_factory=cursor_factory or extras.RealDictCursor)
             try:
-                yield cursor
-                conn.commit()
+                yield InstrumentedCursor(cursor)
+                # Inside Database.transaction() the outer block commits
+                if not in_transaction:
+                    conn.commit()
             except Exception as e:
-                conn.rollback()
+                if not in_transaction:
+                    conn.rollback()
                 logger.error(f"Database operation error: {e}")
                 raise
             finally:
                 cursor.close()
     
     @classmethod
-    def execute_query(cls, query, params=None, fetch=True):
-        """Execute a query and optionally fetch results"""
-        with cls.get_cursor() as cursor:
-            cursor.execute(query, params or ())
-            if fetch:
-                if cls._db_type == 'sqlite':
-                    # Convert rows to dict format for consistency
-                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
-                    rows = cursor.fetchall()
-                    return [dict(zip(columns, row)) for row in rows]
-                else:
-                    return cursor.fetchall()
+    def compile(cls, query):
+        """Translate a PostgreSQL-style query into the active dialect (cached)"""
+        return SQLCompiler.compile(query, cls._db_type)
+    
+    @classmethod
+    def _execute(cls, cursor, query, params=None, prepared=False):
+        """Run a query on a cursor, via a server-side prepared statement when enabled"""
+        if prepared and cls._prepared is not None:
+            cls._prepared.execute(cursor, query, params)
+        else:
+            cursor.execute(cls.compile(query), params or ())
+        if not _is_read_only(query):
+            cls._note_write()
+    
+    @classmethod
+    def _cursor_factory(cls, row_format):
+        """psycopg2 cursor class that yields rows closest to the requested format"""
+        if cls._db_type == 'sqlite':
+            return None
+        return extras.RealDictCursor if row_format == 'dict' else extensions.cursor
+    
+    @classmethod
+    def _fetchone(cls, cursor, row_format='dict'):
+        """Fetch and decode one row"""
+        row = cursor.fetchone()
+        if cls._db_type != 'sqlite' and row_format == 'dict':
+            return row
+        return RowDecoder.decode_one(cursor, row, row_format)
+    
+    @classmethod
+    def _fetchall(cls, cursor, row_format='dict', rows=None):
+        """Fetch (or take the given batch of) rows and decode them"""
+        if rows is None:
+            rows = cursor.fetchall()
+        if cls._db_type != 'sqlite' and row_format == 'dict':
+            return rows
+        return RowDecoder.decode_all(cursor, rows, row_format)
+    
+    @classmethod
+    def prepared_stats(cls):
+        """Get prepared statement cache statistics"""
+        if cls._prepared is None:
+            return {'enabled': False}
+        return dict(cls._prepared.stats(), enabled=True)
+    
+    @classmethod
+    def _statement(cls, query, params, prepared, row_format, result):
+        """Run one statement and collect its result ('all', 'one' or 'rowcount')"""
+        cls._pool()
+        
+        def work(cursor):
+            cls._execute(cursor, query, params, prepared)
+            if result == 'all':
+                return cls._fetchall(cursor, row_format)
+            if result == 'one':
+                return cls._fetchone(cursor, row_format)
             return cursor.rowcount
+        
+        if cls._writer is not None and not cls.in_transaction() and not _is_read_only(query):
+            return cls._write(work, query)
+        with cls.get_cursor(cls._cursor_factory(row_format), cls._use_replica_for(query)) as cursor:
+            return work(cursor)
+    
+    @classmethod
+    def _write(cls, work, label):
+        """Run work(cursor) on the SQLite writer thread and wait for its group commit"""
+        start = _time.perf_counter()
+        try:
+            future = cls._writer.submit(work)
+            try:
+                return future.result(timeout=DatabaseConfig.DB_POOL_TIMEOUT)
+            except FutureTimeoutError:
+                # A job that has not started is dropped; one already running may still commit
+                future.cancel()
+                raise
+        finally:
+            QueryInstrumentation.record(label, _time.perf_counter() - start)
     
     @classmethod
-    def fetch_one(cls, query, params=None):
-        """Fetch a single row"""
+    def _run_write(cls, work, label):
+        """Run a multi-statement write through the SQLite writer, or on a pooled cursor"""
+        cls._pool()
+        if cls._writer is not None and not cls.in_transaction():
+            return cls._write(work, label)
         with cls.get_cursor() as cursor:
-            cursor.execute(query, params or ())
+            return work(cursor)
+    
+    @classmethod
+    def execute_query(cls, query, params=None, fetch=True, prepared=False, row_format='dict'):
+        """Execute a query and optionally fetch results"""
+        return cls._statement(query, params, prepared, row_format, 'all' if fetch else 'rowcount')
+    
+    @classmethod
+    def fetch_one(cls, query, params=None, prepared=False, row_format='dict'):
+        """
+        Fetch a single row
+        row_format: 'dict' (default), 'tuple', 'record' (namedtuple) or a records.py class
+        """
+        return cls._statement(query, params, prepared, row_format, 'one')
+    
+    @classmethod
+    def fetch_all(cls, query, params=None, prepared=False, row_format='dict'):
+        """
+        Fetch all rows
+        row_format: 'dict' (default), 'tuple', 'record' (namedtuple) or a records.py class
+        """
+        return cls._statement(query, params, prepared, row_format, 'all')
+    
+    @classmethod
+    def iter_query(cls, query, params=None, batch_size=None, row_format='dict'):
+        """
+        Stream the rows of a query at constant memory.
+        
+        Rows are pulled from the server in batches of batch_size (a named
+        server-side cursor on PostgreSQL, fetchmany on SQLite) and yielded one
+        at a time. The connection stays checked out until the iterator is
+        exhausted or closed.
+        """
+        batch_size = batch_size or DatabaseConfig.DB_STREAM_BATCH_SIZE
+        
+        with cls.get_connection(cls._use_replica_for(query)) as conn:
             if cls._db_type == 'sqlite':
-                row = cursor.fetchone()
-                if row and cursor.description:
-                    columns = [desc[0] for desc in cursor.description]
-                    return dict(zip(columns, row))
-                return row
+                cursor = conn.cursor()
             else:
-                return cursor.fetchone()
+                cursor = conn.cursor(
+                    name=f"stream_{uuid.uuid4().hex[:12]}",
+                    cursor_factory=cls._cursor_factory(row_format)
+                )
+                cursor.itersize = batch_size
+            cursor = InstrumentedCursor(cursor)
+            try:
+                cursor.execute(cls.compile(query), params or ())
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for row in cls._fetchall(cursor, row_format, rows):
+                        yield row
+                if not cls.in_transaction():
+                    conn.commit()
+            finally:
+                # An abandoned stream is rolled back when the connection is returned
+                cursor.close()
     
     @classmethod
-    def fetch_all(cls, query, params=None):
-        """Fetch all rows"""
-        with cls.get_cursor() as cursor:
-            cursor.execute(query, params or ())
+    def execute_many(cls, query, params_list):
+        """
+        Execute one statement for every parameter set inside a single transaction.
+        Returns the number of parameter sets executed.
+        """
+        params_list = [tuple(p) for p in params_list]
+        if not params_list:
+            return 0
+        
+        def work(cursor):
             if cls._db_type == 'sqlite':
-                rows = cursor.fetchall()
-                if rows and cursor.description:
-                    columns = [desc[0] for desc in cursor.description]
-                    return [dict(zip(columns, row)) for row in rows]
-                return rows
+                cursor.executemany(cls.compile(query), params_list)
             else:
-                return cursor.fetchall()
+                extras.execute_batch(cursor, query, params_list, page_size=DatabaseConfig.DB_BULK_PAGE_SIZE)
+            return len(params_list)
+        
+        result = cls._run_write(work, query)
+        cls._note_write()
+        return result
+    
+    @classmethod
+    def bulk_insert(cls, table, columns, rows, returning=None):
+        """
+        Insert many rows in one transaction.
+        
+        Uses executemany on SQLite and execute_values (or COPY for large batches
+        without RETURNING) on PostgreSQL. When returning is given (e.g. '*' or
+        'task_id') the inserted rows are returned in input order, otherwise the
+        number of inserted rows.
+        """
+        table = _identifier(table)
+        columns = [_identifier(c) for c in columns]
+        rows = [tuple(r) for r in rows]
+        if not rows:
+            return [] if returning else 0
+        
+        column_list = ', '.join(columns)
+        
+        def work(cursor):
+            if cls._db_type == 'sqlite':
+                placeholders = ', '.join(['?'] * len(columns))
+                query = f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})"
+                if not returning:
+                    cursor.executemany(query, rows)
+                    return len(rows)
+                # sqlite3 cannot executemany a statement that yields rows; the
+                # statement is still compiled once and committed once
+                query += f" RETURNING {returning}"
+                inserted = []
+                for row in rows:
+                    cursor.execute(query, row)
+                    inserted.append(cls._fetchone(cursor))
+                return inserted
+            
+            if returning:
+                query = f"INSERT INTO {table} ({column_list}) VALUES %s RETURNING {returning}"
+                return extras.execute_values(
+                    cursor, query, rows,
+                    page_size=DatabaseConfig.DB_BULK_PAGE_SIZE, fetch=True
+                )
+            
+            if len(rows) >= DatabaseConfig.DB_COPY_THRESHOLD:
+                buffer = io.StringIO()
+                for row in rows:
+                    buffer.write('\t'.join(_copy_text_value(v) for v in row))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN", buffer)
+            else:
+                query = f"INSERT INTO {table} ({column_list}) VALUES %s"
+                extras.execute_values(cursor, query, rows, page_size=DatabaseConfig.DB_BULK_PAGE_SIZE)
+            return len(rows)
+        
+        result = cls._run_write(work, f"bulk_insert {table}")
+        cls._note_write()
+        return result
+    
+    @classmethod
+    def bulk_update(cls, table, key_column, rows, returning=None):
+        """
+        Update many rows in one transaction.
+        
+        rows is a list of dicts that each contain key_column plus the columns to
+        set. Rows are grouped by the set of columns they change. Without
+        returning each group runs as one batched statement (executemany /
+        execute_batch) and the number of rows processed is returned.
+        
+        With returning the updated rows come back in input order within each
+        group. On PostgreSQL a group is one UPDATE ... FROM (VALUES ...) per
+        page of rows; sqlite3 cannot batch a statement that yields rows, so
+        there each row runs its own UPDATE ... RETURNING (one compiled
+        statement, one commit).
+        """
+        table = _identifier(table)
+        key_column = _identifier(key_column)
+        
+        groups = {}
+        for row in rows:
+            columns = tuple(sorted(k for k in row if k != key_column))
+            if columns:
+                groups.setdefault(columns, []).append(row)
+        if not groups:
+            return [] if returning else 0
+        
+        def work(cursor):
+            updated = []
+            count = 0
+            for columns, group in groups.items():
+                set_clause = ', '.join(f"{_identifier(c)} = %s" for c in columns)
+                query = f"UPDATE {table} SET {set_clause} WHERE {key_column} = %s"
+                params_list = [tuple(row[c] for c in columns) + (row[key_column],) for row in group]
+                count += len(params_list)
+                
+                if returning and cls._db_type != 'sqlite':
+                    updated.extend(cls._update_from_values(cursor, table, key_column, columns, group, returning))
+                elif returning:
+                    query = cls.compile(f"{query} RETURNING {returning}")
+                    for params in params_list:
+                        cursor.execute(query, params)
+                        result = cls._fetchone(cursor)
+                        if result:
+                            updated.append(result)
+                elif cls._db_type == 'sqlite':
+                    cursor.executemany(cls.compile(query), params_list)
+                else:
+                    extras.execute_batch(cursor, query, params_list, page_size=DatabaseConfig.DB_BULK_PAGE_SIZE)
+            return updated if returning else count
+        
+        result = cls._run_write(work, f"bulk_update {table}")
+        cls._note_write()
+        return result
+    
+    # table -> {column: SQL type}, for typing VALUES lists (PostgreSQL)
+    _column_types = {}
+    
+    @classmethod
+    def _table_column_types(cls, cursor, table):
+        """Column types of a PostgreSQL table, looked up once per process"""
+        types = cls._column_types.get(table)
+        if types is None:
+            cursor.execute("""
+                SELECT attname, format_type(atttypid, atttypmod) AS column_type
+                FROM pg_attribute
+                WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            """, (table,))
+            types = {row['attname']: row['column_type'] for row in cursor.fetchall()}
+            cls._column_types[table] = types
+        return types
+    
+    @classmethod
+    def _update_from_values(cls, cursor, table, key_column, columns, group, returning):
+        """
+        UPDATE ... FROM (VALUES ...) RETURNING for one bulk_update group
+        (PostgreSQL); one round trip per DB_BULK_PAGE_SIZE rows
+        """
+        # Like row-by-row updates, the last row for a key wins
+        latest = {}
+        for row in group:
+            latest[row[key_column]] = row
+        
+        types = cls._table_column_types(cursor, table)
+        names = [key_column] + list(columns)
+        # Untyped VALUES would make NULLs and strings text; cast to the column types
+        template = '(' + ', '.join(f"%s::{types[name]}" for name in names) + ')'
+        aliases = ', '.join(f"_{i}" for i in range(len(names)))
+        set_clause = ', '.join(f"{_identifier(c)} = v._{i}" for i, c in enumerate(columns, 1))
+        # v's columns are _0.._n, so only the table's columns can match RETURNING
+        if returning.strip() == '*':
+            returning = f"{table}.*"
+        query = f"""
+            UPDATE {table} SET {set_clause}
+            FROM (VALUES %s) AS v ({aliases})
+            WHERE {table}.{key_column} = v._0
+            RETURNING {returning}
+        """
+        values = [tuple(row[name] for name in names) for row in latest.values()]
+        updated = extras.execute_values(
+            cursor, query, values, template=template,
+            page_size=DatabaseConfig.DB_BULK_PAGE_SIZE, fetch=True
+        )
+        
+        position = {key: i for i, key in enumerate(latest)}
+        if all(key_column in row for row in updated):
+            updated.sort(key=lambda row: position[row[key_column]])
+        return updated
     
     @classmethod
     def test_connection(cls):
@@ -159,6 +902,3 @@ class Database:
         except Exception as e:
             logger.error(f"Connection test failed: {e}")
             return False
-
-# Initialize the connection pool when module is imported
-Database.initialize_pool()
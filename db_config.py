@@ -29,6 +29,55 @@ class DatabaseConfig:
     # Connection pool settings
     DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
     DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # seconds, 0 = never
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    DB_POOL_PING_INTERVAL = float(os.getenv('DB_POOL_PING_INTERVAL', '10'))  # ping only after this idle time
+    
+    # Read replica (PostgreSQL only); leave DB_REPLICA_HOST empty to disable
+    DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', '')
+    DB_REPLICA_PORT = os.getenv('DB_REPLICA_PORT', DB_PORT)
+    DB_REPLICA_NAME = os.getenv('DB_REPLICA_NAME', DB_NAME)
+    DB_REPLICA_USER = os.getenv('DB_REPLICA_USER', DB_USER)
+    DB_REPLICA_PASSWORD = os.getenv('DB_REPLICA_PASSWORD', DB_PASSWORD)
+    DB_REPLICA_POOL_SIZE = int(os.getenv('DB_REPLICA_POOL_SIZE', str(DB_POOL_SIZE)))
+    DB_REPLICA_AUTO_ROUTE = os.getenv('DB_REPLICA_AUTO_ROUTE', 'True').lower() == 'true'
+    # Reads stay on the primary for this long after a user's write (read-your-writes)
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+    
+    # SQLite connection tuning (applied once per pooled connection)
+    DB_SQLITE_JOURNAL_MODE = os.getenv('DB_SQLITE_JOURNAL_MODE', 'WAL')
+    DB_SQLITE_SYNCHRONOUS = os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    DB_SQLITE_CACHE_SIZE = int(os.getenv('DB_SQLITE_CACHE_SIZE', '-16000'))  # negative = KiB
+    DB_SQLITE_MMAP_SIZE = int(os.getenv('DB_SQLITE_MMAP_SIZE', '268435456'))
+    
+    # Serialise SQLite writes through one writer thread with group commit
+    DB_SQLITE_WRITE_QUEUE = os.getenv('DB_SQLITE_WRITE_QUEUE', 'True').lower() == 'true'
+    DB_SQLITE_WRITE_BATCH = int(os.getenv('DB_SQLITE_WRITE_BATCH', '64'))
+    DB_SQLITE_GROUP_COMMIT_MS = float(os.getenv('DB_SQLITE_GROUP_COMMIT_MS', '0'))  # wait for more jobs
+    
+    # Number of dialect-compiled statements kept in memory
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '512'))
+    
+    # Server-side prepared statements for hot queries (PostgreSQL only, opt-in)
+    DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', 'False').lower() == 'true'
+    DB_PREPARED_CACHE_SIZE = int(os.getenv('DB_PREPARED_CACHE_SIZE', '64'))
+    
+    # Bulk write batching (rows per round trip, and the PostgreSQL COPY cut-over)
+    DB_BULK_PAGE_SIZE = int(os.getenv('DB_BULK_PAGE_SIZE', '500'))
+    DB_COPY_THRESHOLD = int(os.getenv('DB_COPY_THRESHOLD', '1000'))
+    
+    # Rows fetched per round trip by Database.iter_query
+    DB_STREAM_BATCH_SIZE = int(os.getenv('DB_STREAM_BATCH_SIZE', '1000'))
+    
+    # Query instrumentation
+    DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', '5'))
+    DB_SLOWEST_QUERIES_KEPT = int(os.getenv('DB_SLOWEST_QUERIES_KEPT', '5'))
+    
+    # Decode every PostgreSQL NUMERIC column as float instead of Decimal,
+    # process-wide (opt-in). Record row formats convert their typed fields anyway.
+    DB_DECIMAL_AS_FLOAT = os.getenv('DB_DECIMAL_AS_FLOAT', 'False').lower() == 'true'
     
     @classmethod
     def get_connection_string(cls):
@@ -38,29 +87,55 @@ class DatabaseConfig:
         else:
             return cls.DB_HOST
     
+    @classmethod
+    def get_sqlite_pragmas(cls):
+        """Get the pragmas applied to each new SQLite connection"""
+        return {
+            'journal_mode': cls.DB_SQLITE_JOURNAL_MODE,
+            'synchronous': cls.DB_SQLITE_SYNCHRONOUS,
+            'cache_size': cls.DB_SQLITE_CACHE_SIZE,
+            'mmap_size': cls.DB_SQLITE_MMAP_SIZE,
+            'foreign_keys': 'ON'
+        }
+    
     @classmethod
     def get_psycopg2_connection_params(cls):
         """Get connection parameters for psycopg2"""
         if cls.DB_TYPE == 'sqlite':
             return {'database': cls.DB_SQLITE_PATH}
         else:
-            if cls.DB_HOST.startswith('postgresql://'):
-                parsed = urlparse(cls.DB_HOST)
-                return {
-                    'host': parsed.hostname,
-                    'port': parsed.port,
-                    'database': parsed.path.lstrip('/'),
-                    'user': parsed.username,
-                    'password': parsed.password
-                }
-            else:
-                return {
-                    'host': cls.DB_HOST,
-                    'port': cls.DB_PORT,
-                    'database': cls.DB_NAME,
-                    'user': cls.DB_USER,
-                    'password': cls.DB_PASSWORD
-                }
+            return cls._postgres_params(cls.DB_HOST, cls.DB_PORT, cls.DB_NAME, cls.DB_USER, cls.DB_PASSWORD)
+    
+    @classmethod
+    def get_replica_connection_params(cls):
+        """Get psycopg2 connection parameters for the read replica (None if not configured)"""
+        if cls.DB_TYPE == 'sqlite' or not cls.DB_REPLICA_HOST:
+            return None
+        return cls._postgres_params(
+            cls.DB_REPLICA_HOST, cls.DB_REPLICA_PORT, cls.DB_REPLICA_NAME,
+            cls.DB_REPLICA_USER, cls.DB_REPLICA_PASSWORD
+        )
+    
+    @staticmethod
+    def _postgres_params(host, port, name, user, password):
+        """Connection parameters from discrete settings or a postgresql:// URL in host"""
+        if host.startswith('postgresql://'):
+            parsed = urlparse(host)
+            return {
+                'host': parsed.hostname,
+                'port': parsed.port,
+                'database': parsed.path.lstrip('/'),
+                'user': parsed.username,
+                'password': parsed.password
+            }
+        else:
+            return {
+                'host': host,
+                'port': port,
+                'database': name,
+                'user': user,
+                'password': password
+            }
 
 # Application Configuration
 class AppConfig:
@@ -71,6 +146,15 @@ class AppConfig:
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', '5000'))
     
+    # Serve agent chat, analytics overview and dashboard data from async views
+    # (needs flask[async] plus asyncpg or aiosqlite)
+    ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() == 'true'
+    
+    # In-process cache of schedule, recommendation and workload results per
+    # user (entries, 0 = off) and how long an entry may be served (seconds)
+    PLANNER_CACHE_SIZE = int(os.getenv('PLANNER_CACHE_SIZE', '1024'))
+    PLANNER_CACHE_TTL = float(os.getenv('PLANNER_CACHE_TTL', '300'))
+    
     # CORS settings
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*').split(',')
     
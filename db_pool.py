@@ -0,0 +1,295 @@
+"""
+Connection pools for Smart Study Planner
+Bounded, thread-safe pools used by the Database manager
+"""
+
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+class _BoundedPool:
+    """
+    Checkout/return pool holding up to ``pool_size + max_overflow`` connections.
+
+    Connections are opened lazily and reused LIFO. Callers block for up to
+    ``timeout`` seconds once every slot is checked out. Connections opened in
+    the overflow band are closed on return when the idle set is already full.
+    Subclasses implement _connect, _is_usable and _reset.
+    The method names mirror psycopg2's pools (getconn/putconn/closeall).
+    """
+
+    backend = None
+
+    def __init__(self, pool_size=5, max_overflow=0, timeout=30.0, recycle=None):
+        self.pool_size = max(1, int(pool_size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.max_size = self.pool_size + self.max_overflow
+        self.timeout = timeout
+        self.recycle = recycle or None
+
+        self._idle = []
+        # connection -> time it was opened
+        self._opened = {}
+        # Slots reserved by checkouts still connecting outside the lock; a
+        # counter, so concurrent reservations each hold their own slot
+        self._connecting = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._waiting = 0
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _is_usable(self, conn, idle_for):
+        """Check a connection taken from the idle set before handing it out"""
+        return True
+
+    def _reset(self, conn):
+        """Roll back whatever the caller left open; return False to discard"""
+        return True
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _size(self):
+        return len(self._opened) + self._connecting
+
+    def getconn(self):
+        """Check a connection out of the pool, blocking up to the pool timeout"""
+        while True:
+            conn = self._checkout()
+            if conn is not None:
+                return conn
+
+    def _checkout(self):
+        """One checkout attempt; returns None when an idle connection had to be dropped"""
+        deadline = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._size() < self.max_size:
+                    conn = None
+                    # Reserve the slot before connecting outside the lock
+                    self._connecting += 1
+                    break
+
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                    self._waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No {self.backend} connection available within {self.timeout}s "
+                        f"(pool size {self.pool_size}, overflow {self.max_overflow})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._checkouts += 1
+
+        if conn is None:
+            return self._open()
+
+        now = time.monotonic()
+        if self.recycle and now - self._opened.get(conn, now) >= self.recycle:
+            self._recycled += 1
+            self._discard(conn)
+            return None
+        if not self._is_usable(conn, now - returned_at):
+            self._discarded += 1
+            logger.info(f"Discarding stale {self.backend} connection")
+            self._discard(conn)
+            return None
+        return conn
+
+    def _open(self):
+        """Open a connection into a slot reserved by _checkout"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._connecting -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._connecting -= 1
+            closed = self._closed
+            if not closed:
+                self._opened[conn] = time.monotonic()
+                self._created += 1
+            self._cond.notify()
+        if closed:
+            # closeall() ran while this connection was being opened
+            self._close(conn)
+            raise PoolTimeoutError("Connection pool is closed")
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        self._close(conn)
+        with self._cond:
+            self._opened.pop(conn, None)
+            self._cond.notify()
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool"""
+        if not close and not self._reset(conn):
+            close = True
+
+        with self._cond:
+            overflow = len(self._idle) >= self.pool_size and self._waiting == 0
+            if close or self._closed or overflow or conn not in self._opened:
+                self._opened.pop(conn, None)
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """Close every connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            for conn in self._opened:
+                self._close(conn)
+            self._opened.clear()
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        """Return a snapshot of pool gauges and counters"""
+        with self._cond:
+            size = self._size()
+            idle = len(self._idle)
+            return {
+                'backend': self.backend,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'size': size,
+                'idle': idle,
+                'checked_out': size - idle,
+                'overflow': max(0, size - self.pool_size),
+                'waiting': self._waiting,
+                'created': self._created,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+                'discarded': self._discarded
+            }
+
+
+class SQLiteConnectionPool(_BoundedPool):
+    """
+    Bounded pool of SQLite connections.
+
+    Reusing connections means the per-connection pragmas (WAL journal,
+    synchronous, cache and mmap sizes, foreign keys) are applied exactly once
+    per connection instead of per query.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, database, max_size=5, timeout=30.0, pragmas=None, row_factory=None, detect_types=0):
+        super().__init__(pool_size=max_size, timeout=timeout)
+        self.database = database
+        self.pragmas = pragmas or {}
+        self.row_factory = row_factory
+        self.detect_types = detect_types
+
+    def _connect(self):
+        """Open a new connection and apply the configured pragmas"""
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            detect_types=self.detect_types,
+            check_same_thread=False
+        )
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        for name, value in self.pragmas.items():
+            if value is None or value == '':
+                continue
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _reset(self, conn):
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                return False
+        return True
+
+
+class PostgresConnectionPool(_BoundedPool):
+    """
+    psycopg2 pool that grows into an overflow band and blocks when exhausted.
+
+    Connections idle for longer than ``ping_interval`` seconds are checked
+    with ``SELECT 1`` before reuse (when ``pre_ping`` is set). Connections
+    older than ``recycle`` seconds are closed and replaced.
+    """
+
+    backend = 'postgresql'
+
+    def __init__(self, pool_size=5, max_overflow=10, timeout=30.0, recycle=None,
+                 pre_ping=True, ping_interval=0, **connect_kwargs):
+        super().__init__(pool_size=pool_size, max_overflow=max_overflow, timeout=timeout, recycle=recycle)
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+
+    def _connect(self):
+        import psycopg2
+        return psycopg2.connect(**self.connect_kwargs)
+
+    def _is_usable(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if not self.pre_ping or idle_for < self.ping_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"PostgreSQL connection failed pre-ping: {e}")
+            return False
+
+    def _reset(self, conn):
+        from psycopg2 import extensions
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                return False
+        return True
@@ -0,0 +1,50 @@
+"""
+Full-text task search for Smart Study Planner
+Turns search-box text into an index-backed match on task titles and
+descriptions: FTS5 (tasks_fts) on SQLite, a GIN expression index on
+PostgreSQL. Every word is matched as a prefix, so "calc" finds "Calculus".
+"""
+
+import re
+from database import Database
+
+MAX_TERMS = 8
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# Must match idx_tasks_search exactly (schema.sql / migrate_task_search.py) for
+# PostgreSQL to use the index; titles weigh more than descriptions in the rank
+PG_DOCUMENT = (
+    "(setweight(to_tsvector('simple', coalesce({prefix}title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({prefix}description, '')), 'B'))"
+)
+
+# bm25() column weights for tasks_fts(user_id, title, description)
+_FTS_WEIGHTS = '0.0, 10.0, 5.0'
+
+
+def terms(text):
+    """Lower-cased words of a search string (at most MAX_TERMS)"""
+    return [word.lower() for word in _WORD.findall(text or '')][:MAX_TERMS]
+
+
+def task_match(text, user_id, alias='t'):
+    """
+    JOIN clause, its params and a best-first ORDER BY expression restricting
+    tasks {alias} to those containing every word of text as a prefix.
+    Returns None when text has no searchable words.
+    """
+    words = terms(text)
+    if not words:
+        return None
+
+    if Database._db_type == 'sqlite':
+        # The indexed user_id column keeps the match inside one user's tasks
+        prefixes = ' AND '.join(f'"{word}"*' for word in words)
+        expression = f'user_id:"{int(user_id)}" AND {{title description}}: ({prefixes})'
+        join = f"JOIN tasks_fts ON tasks_fts.rowid = {alias}.task_id AND tasks_fts MATCH %s"
+        return join, [expression], f"bm25(tasks_fts, {_FTS_WEIGHTS})"
+
+    document = PG_DOCUMENT.format(prefix=f'{alias}.')
+    join = f"JOIN to_tsquery('simple', %s) AS search_query ON {document} @@ search_query"
+    return join, [' & '.join(f'{word}:*' for word in words)], f"ts_rank({document}, search_query) DESC"
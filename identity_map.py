@@ -0,0 +1,88 @@
+"""
+Request-scoped identity map for Smart Study Planner
+Rows looked up by primary key are cached on flask.g for the rest of the
+request, so repeated get_by_id calls never go back to the database
+"""
+
+from flask import g, has_request_context
+from database import Database
+
+
+class IdentityMap:
+    """
+    Per-request cache of rows keyed by (table, primary key, row format).
+
+    Outside a request (background jobs, scripts) every call goes straight
+    to the loader. Inside a Database.transaction() cached rows are still
+    served, but nothing new is cached and writes only evict, so a rollback
+    can never leave uncommitted values behind.
+    """
+
+    @staticmethod
+    def _entries():
+        if not has_request_context():
+            return None
+        entries = g.get('identity_map')
+        if entries is None:
+            entries = g.identity_map = {}
+        return entries
+
+    @classmethod
+    def lookup(cls, table, key, row_format, load):
+        """Return the cached row for table/key, calling load(row_format) on a miss"""
+        entries = cls._entries()
+        if entries is None:
+            return load(row_format)
+
+        row = entries.get((table, key, row_format))
+        if row is None:
+            row = load(row_format)
+            if row is None or Database.in_transaction():
+                return row
+            entries[(table, key, row_format)] = row
+        # Hand out copies of dict rows so callers cannot edit the cached one
+        return dict(row) if isinstance(row, dict) else row
+
+    @classmethod
+    def peek(cls, table, key, row_format='dict'):
+        """Return the cached row without loading it (None on a miss)"""
+        entries = cls._entries()
+        return entries.get((table, key, row_format)) if entries is not None else None
+
+    @classmethod
+    def store(cls, table, key, row):
+        """Replace the cached row after a write that returned the full row"""
+        entries = cls._entries()
+        if entries is None:
+            return
+        cls._evict(entries, table, key)
+        if row is not None and not Database.in_transaction():
+            entries[(table, key, 'dict')] = dict(row)
+
+    @classmethod
+    def merge(cls, table, key, changes):
+        """Fold written columns into a cached dict row (other formats are dropped)"""
+        entries = cls._entries()
+        if entries is None:
+            return
+        cached = entries.get((table, key, 'dict'))
+        cls._evict(entries, table, key)
+        if cached is not None and changes is not None and not Database.in_transaction():
+            entries[(table, key, 'dict')] = {**cached, **changes}
+
+    @classmethod
+    def discard(cls, table, key=None):
+        """Forget one row, or every row of a table when key is None"""
+        entries = cls._entries()
+        if entries is None:
+            return
+        if key is not None:
+            cls._evict(entries, table, key)
+            return
+        for entry in [entry for entry in entries if entry[0] == table]:
+            del entries[entry]
+
+    @staticmethod
+    def _evict(entries, table, key):
+        for entry in [entry for entry in entries if entry[0] == table and entry[1] == key]:
+            del entries[entry]
@@ -0,0 +1,282 @@
+"""
+Index advisor for Smart Study Planner
+Explains every SQL statement written in the model layer against the
+configured database and reports the ones that fall back to a full table scan.
+Statements assembled at runtime are explained as rendered by the model
+methods in RENDERED_CALLS.
+
+    python index_advisor.py [--module models.py] [--allow User.get_all] [--verbose]
+
+Exits with status 1 when an unexpected full scan is found, so it can run in CI
+against a database built from schema.sql / schema_sqlite.sql.
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from database import Database
+from models import Task, SchedulePlan
+from sql_compiler import SQLCompiler
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_SQL_START = re.compile(r'^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_SQL_BODY = re.compile(r'\b(FROM|INTO|SET)\b', re.IGNORECASE)
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIAS = {'where', 'on', 'set', 'left', 'right', 'inner', 'join', 'group', 'order', 'limit', 'values', 'using'}
+
+# Statements that are expected to read a whole table
+ALLOWED_SCANS = {
+    'User.get_all': 'admin listing of every user',
+    'DailyStats.rebuild': 'backfill re-aggregates every raw row',
+}
+
+# f-string statements, rendered by calling the method with representative
+# arguments; the SQL it would run is captured and explained, never executed
+RENDERED_CALLS = {
+    'Task.get_by_user': (
+        lambda: Task.get_by_user(1),
+        lambda: Task.get_by_user(
+            1, status='pending', limit=50, fields='planning',
+            after=Task.USER_KEYSET.cursor_for({'deadline': datetime(2030, 1, 1), 'priority': 3, 'task_id': 1})
+        ),
+    ),
+    'Task.get_by_ids': (lambda: Task.get_by_ids(1, [1, 2, 3], status='pending', fields='planning'),),
+    'Task.get_by_date_range': (lambda: Task.get_by_date_range(1, date(2030, 1, 1), date(2030, 1, 7)),),
+    'Task.search': (lambda: Task.search(1, 'chapter notes'),),
+    'Task._status_before': (lambda: Task._status_before([1, 2, 3]),),
+    'Task.get_overdue_tasks': (lambda: Task.get_overdue_tasks(1, fields='summary'),),
+    'SchedulePlan.replace_days': (
+        lambda: SchedulePlan.replace_days(1, None, []),
+        lambda: SchedulePlan.replace_days(1, [date(2030, 1, 1), date(2030, 1, 2)], []),
+    ),
+}
+
+
+class _QueryCollector(ast.NodeVisitor):
+    """Collects SQL string literals with the Class.method they appear in"""
+
+    def __init__(self):
+        self.scope = []
+        self.queries = []
+        self.dynamic = []
+
+    def _visit_scope(self, node):
+        self.scope.append(node.name)
+        self.generic_visit(node)
+        self.scope.pop()
+
+    visit_ClassDef = visit_FunctionDef = visit_AsyncFunctionDef = _visit_scope
+
+    def _location(self):
+        return '.'.join(self.scope) or '<module>'
+
+    def visit_Expr(self, node):
+        # Bare string expressions are docstrings, not statements
+        if not (isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+            self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str) and _SQL_START.match(node.value) and _SQL_BODY.search(node.value):
+            self.queries.append((self._location(), node.lineno, node.value))
+
+    def visit_JoinedStr(self, node):
+        # f-string statements are assembled at runtime and cannot be explained statically
+        text = ''.join(v.value for v in node.values if isinstance(v, ast.Constant) and isinstance(v.value, str))
+        if _SQL_START.match(text):
+            self.dynamic.append((self._location(), node.lineno))
+
+
+def collect_queries(path):
+    """(location, line, sql) for every SQL literal in a module, plus dynamic ones"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    collector = _QueryCollector()
+    collector.visit(tree)
+    return collector.queries, collector.dynamic
+
+
+@contextmanager
+def _captured_statements():
+    """Collect the SQL handed to Database._statement instead of running it"""
+    statements = []
+    original = Database.__dict__['_statement']
+
+    def capture(cls, query, params, prepared, row_format, result):
+        statements.append(query)
+        return {'all': [], 'one': None}.get(result, 0)
+
+    Database._statement = classmethod(capture)
+    try:
+        yield statements
+    finally:
+        Database._statement = original
+
+
+def render_calls(calls):
+    """Distinct SQL statements run by the given calls"""
+    with _captured_statements() as statements:
+        for call in calls:
+            call()
+    return list(dict.fromkeys(statements))
+
+
+def _aliases(sql):
+    """Map table aliases (and names) used in a statement to table names"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table.lower()] = table
+        if alias and alias.lower() not in _NOT_ALIAS:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def _param_count(compiled, dialect):
+    """Bound parameters of a statement already compiled for dialect"""
+    if dialect == 'sqlite':
+        return compiled.count('?')
+    return max((int(n) for n in re.findall(r'\$(\d+)', compiled)), default=0)
+
+
+def _explain_sqlite(conn, sql, tables):
+    cursor = conn.cursor()
+    try:
+        compiled = Database.compile(sql)
+        cursor.execute("EXPLAIN QUERY PLAN " + compiled, [None] * _param_count(compiled, 'sqlite'))
+        details = [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    aliases = _aliases(sql)
+    scans, notes = [], []
+    for detail in details:
+        match = re.match(r'SCAN (\w+)( VIRTUAL TABLE INDEX \d+:\S)?', detail)
+        # A virtual table searched through a constraint (FTS5 MATCH) is not a scan
+        if match and not match.group(2):
+            table = aliases.get(match.group(1).lower(), match.group(1))
+            # CTEs and subqueries are not tables
+            if table.lower() in tables:
+                scans.append(table)
+        elif 'TEMP B-TREE' in detail:
+            notes.append(detail.lower())
+    return scans, notes, details
+
+
+def _explain_postgres(cursor, sql):
+    numbered = SQLCompiler.compile(sql, 'postgresql-numbered')
+    count = _param_count(numbered, 'postgresql-numbered')
+    cursor.execute("SAVEPOINT advisor")
+    try:
+        cursor.execute(f"PREPARE advisor_stmt AS {numbered}")
+        args = f"({', '.join(['NULL'] * count)})" if count else ''
+        cursor.execute(f"EXPLAIN EXECUTE advisor_stmt{args}")
+        details = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DEALLOCATE advisor_stmt")
+        cursor.execute("RELEASE SAVEPOINT advisor")
+    except Exception:
+        cursor.execute("ROLLBACK TO SAVEPOINT advisor")
+        raise
+
+    scans, notes = [], []
+    for detail in details:
+        match = re.search(r'Seq Scan on (\w+)', detail)
+        if match:
+            scans.append(match.group(1))
+        elif re.search(r'->\s+Sort\b|^Sort\b', detail.strip()):
+            notes.append('explicit sort')
+    return scans, notes, details
+
+
+def analyse(paths, allowed):
+    """Explain every collected statement; returns a list of result dicts"""
+    results = []
+    with Database.get_connection() as conn:
+        if Database._db_type == 'sqlite':
+            tables = {row[0].lower() for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            pg_cursor = None
+        else:
+            tables = None
+            pg_cursor = conn.cursor()
+            # With sequential scans priced out, a remaining Seq Scan means no index applies;
+            # generic plans keep the NULL placeholders from being constant-folded
+            pg_cursor.execute("SET LOCAL enable_seqscan = off")
+            pg_cursor.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+
+        try:
+            for path in paths:
+                queries, dynamic = collect_queries(path)
+                module = os.path.basename(path)
+                rendered = set()
+                for location, line in dynamic:
+                    if location in RENDERED_CALLS:
+                        if location not in rendered:
+                            rendered.add(location)
+                            queries += [(location, line, sql) for sql in render_calls(RENDERED_CALLS[location])]
+                        continue
+                    results.append({
+                        'module': module, 'location': location, 'line': line, 'sql': '',
+                        'status': 'dynamic', 'detail': 'built at runtime; not explained'
+                    })
+                queries.sort(key=lambda query: query[1])
+
+                for location, line, sql in queries:
+                    result = {'module': module, 'location': location, 'line': line, 'sql': ' '.join(sql.split())}
+                    try:
+                        if pg_cursor is None:
+                            scans, notes, plan = _explain_sqlite(conn, sql, tables)
+                        else:
+                            scans, notes, plan = _explain_postgres(pg_cursor, sql)
+                    except Exception as e:
+                        result.update(status='error', detail=str(e).splitlines()[0])
+                        results.append(result)
+                        continue
+
+                    result['plan'] = plan
+                    if scans and location not in allowed:
+                        result.update(status='full scan', detail=', '.join(sorted(set(scans))))
+                    elif scans:
+                        result.update(status='allowed', detail=allowed[location])
+                    else:
+                        result.update(status='ok', detail='; '.join(notes))
+                    results.append(result)
+        finally:
+            if pg_cursor is not None:
+                pg_cursor.close()
+                conn.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report model queries that need a full table scan')
+    parser.add_argument('--module', action='append', help='Python module to scan (default: models.py)')
+    parser.add_argument('--allow', action='append', default=[], help='Class.method allowed to scan a table')
+    parser.add_argument('--verbose', action='store_true', help='print every statement and its plan')
+    args = parser.parse_args()
+
+    paths = [os.path.join(BACKEND_DIR, m) if not os.path.isabs(m) else m for m in (args.module or ['models.py'])]
+    allowed = dict(ALLOWED_SCANS)
+    allowed.update({location: 'allowed on the command line' for location in args.allow})
+
+    results = analyse(paths, allowed)
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+        if r['status'] == 'ok' and not args.verbose:
+            continue
+        print(f"{r['status']:<10} {r['module']}:{r['line']:<5} {r['location']:<40} {r['detail']}")
+        if args.verbose and r.get('plan'):
+            for step in r['plan']:
+                print(f"{'':<12}{step}")
+
+    print(f"\n{Database._db_type}: " + ', '.join(f"{n} {status}" for status, n in sorted(counts.items())))
+    Database.close_pool()
+    return 1 if counts.get('full scan') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,18 +3,27 @@ Smart Study Planner - Main Flask Application
 RESTful API for study planning and progress tracking
 """
 
-from flask import Flask, request, jsonify, send_from_directory, g
+from flask import Flask, Blueprint, current_app, request, jsonify, send_from_directory, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from datetime import datetime, date, time, timedelta, timezone
 import json
 import os
+import asyncio
+import inspect
 import jwt
 import bcrypt
 from functools import wraps
+from importlib.util import find_spec
 
 from db_config import AppConfig, DatabaseConfig
 from database import Database
-from models import User, Subject, Task, StudySession, TaskProgress, WeeklySummary, StudyGoal, StudyStreak, Notification, FileAttachment, ChatMessage
+from async_database import AsyncDatabase, async_driver_available
+from query_stats import QueryInstrumentation
+from row_decoding import to_json_value
+from pagination import Keyset, InvalidCursorError, page_size
+import full_text
+from models import User, Subject, Task, StudySession, TaskProgress, WeeklySummary, StudyGoal, StudyStreak, Notification, FileAttachment, ChatMessage, DailyStats
 from planner_logic import SmartPlanner
 from rescheduler import TaskRescheduler
 from progress_tracker import ProgressTracker
@@ -24,55 +33,101 @@ from agent_background import background_agent
 
 import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__, static_folder='../frontend', static_url_path='')
-app.config['SECRET_KEY'] = AppConfig.SECRET_KEY
-CORS(app, origins=AppConfig.CORS_ORIGINS)
-
-# Custom JSON encoder for date/time objects
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (date, datetime)):
-            return obj.isoformat()
-        if isinstance(obj, time):
-            return obj.isoformat()
-        return super().default(obj)
-
-app.json_encoder = CustomJSONEncoder
+# Routes are registered on a blueprint; create_app() builds the Flask app
+bp = Blueprint('main', __name__)
+
+# JSON provider for the typed column values returned by the database layer
+class CustomJSONProvider(DefaultJSONProvider):
+    @staticmethod
+    def default(obj):
+        if hasattr(obj, 'to_dict'):
+            return obj.to_dict()
+        value = to_json_value(obj)
+        if value is not obj:
+            return value
+        return DefaultJSONProvider.default(obj)
+
+# ============= QUERY INSTRUMENTATION =============
+@bp.before_app_request
+def start_query_stats():
+    """Collect per-request query statistics"""
+    QueryInstrumentation.start_request(f"{request.method} {request.path}")
+
+@bp.after_app_request
+def report_query_stats(response):
+    """Report query count/time and flag likely N+1 patterns"""
+    stats = QueryInstrumentation.end_request()
+    if stats is None:
+        return response
+    
+    QueryInstrumentation.report(stats)
+    if AppConfig.DEBUG:
+        summary = stats.summary()
+        response.headers['X-DB-Query-Count'] = str(summary['query_count'])
+        response.headers['X-DB-Time-Ms'] = str(summary['db_time_ms'])
+        if summary['slowest']:
+            response.headers['X-DB-Slowest-Ms'] = str(summary['slowest'][0]['ms'])
+        response.headers['X-DB-N-Plus-One'] = str(len(summary['n_plus_one']))
+    return response
+
+@bp.teardown_app_request
+def clear_query_stats(error=None):
+    """Drop statistics left behind by requests that failed before after_request"""
+    QueryInstrumentation.end_request()
+    Database.set_current_user(None)
 
 # JWT Secret Key
 JWT_SECRET = AppConfig.SECRET_KEY
 JWT_ALGORITHM = 'HS256'
 
 # ============= AUTHENTICATION MIDDLEWARE =============
+def _authenticate():
+    """Validate the bearer token and bind the user; returns an error response or None"""
+    token = request.headers.get('Authorization')
+    if not token:
+        return jsonify({'error': 'Token is missing'}), 401
+
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        g.user_id = payload['user_id']
+        g.username = payload['username']
+        Database.set_current_user(g.user_id)
+    except jwt.ExpiredSignatureError:
+        return jsonify({'error': 'Token has expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid token'}), 401
+    return None
+
 def token_required(f):
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            error = _authenticate()
+            if error is not None:
+                return error
+            return await f(*args, **kwargs)
+        return decorated_async
+
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-
-        try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            g.user_id = payload['user_id']
-            g.username = payload['username']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
-
+        error = _authenticate()
+        if error is not None:
+            return error
         return f(*args, **kwargs)
     return decorated
 
+def replica_reads(f):
+    """Serve a read-only, lag-tolerant endpoint from the read replica (if configured)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        with Database.use_replica():
+            return f(*args, **kwargs)
+    return decorated
+
 def hash_password(password):
     """Hash a password using bcrypt"""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -96,7 +151,7 @@ def generate_token(user_id, username):
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 # ============= AUTHENTICATION ENDPOINTS =============
-@app.route('/api/auth/register', methods=['POST'])
+@bp.route('/api/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
     try:
@@ -148,7 +203,7 @@ def register():
         logger.error(f'Registration error: {e}')
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def login():
     """Authenticate user and return token"""
     try:
@@ -198,18 +253,21 @@ def login():
         return jsonify({'error': 'Internal server error'}), 500
 
 # ============= HEALTH CHECK =============
-@app.route('/api/health', methods=['GET'])
+@bp.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     db_status = Database.test_connection()
     return jsonify({
         'status': 'healthy' if db_status else 'unhealthy',
         'database': 'connected' if db_status else 'disconnected',
+        'pool': Database.pool_stats(),
+        'prepared_statements': Database.prepared_stats(),
+        'planner_cache': SmartPlanner.cache_stats(),
         'timestamp': datetime.now().isoformat()
     })
 
 # ============= USER ENDPOINTS =============
-@app.route('/api/users', methods=['GET', 'POST'])
+@bp.route('/api/users', methods=['GET', 'POST'])
 def users():
     """Get all users or create a new user"""
     if request.method == 'GET':
@@ -226,7 +284,7 @@ def users():
         )
         return jsonify({'user': user}), 201
 
-@app.route('/api/users/<int:user_id>', methods=['GET', 'PUT'])
+@bp.route('/api/users/<int:user_id>', methods=['GET', 'PUT'])
 def user_detail(user_id):
     """Get or update user by ID"""
     if request.method == 'GET':
@@ -278,7 +336,7 @@ def user_detail(user_id):
         return jsonify({'error': 'Failed to update endpoint'}), 500
 
 # ============= SUBJECT ENDPOINTS =============
-@app.route('/api/users/<int:user_id>/subjects', methods=['GET', 'POST'])
+@bp.route('/api/users/<int:user_id>/subjects', methods=['GET', 'POST'])
 def subjects(user_id):
     """Get subjects or create a new subject"""
     if request.method == 'GET':
@@ -299,7 +357,7 @@ def subjects(user_id):
         )
         return jsonify({'subject': subject}), 201
 
-@app.route('/api/subjects/<int:subject_id>', methods=['GET', 'PUT', 'DELETE'])
+@bp.route('/api/subjects/<int:subject_id>', methods=['GET', 'PUT', 'DELETE'])
 def subject_detail(subject_id):
     """Get, update, or delete a subject"""
     if request.method == 'GET':
@@ -320,7 +378,7 @@ def subject_detail(subject_id):
         return jsonify({'message': 'Subject deleted'}), 200
 
 
-@app.route('/api/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
+@bp.route('/api/tasks/<int:task_id>', methods=['GET', 'PUT', 'DELETE'])
 def task_detail(task_id):
     """Get, update, or delete a task"""
     if request.method == 'GET':
@@ -353,23 +411,28 @@ def task_detail(task_id):
         Task.delete(task_id)
         return jsonify({'message': 'Task deleted'}), 200
 
-@app.route('/api/users/<int:user_id>/tasks/overdue', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/tasks/overdue', methods=['GET'])
 def overdue_tasks(user_id):
     """Get overdue tasks"""
     tasks = Task.get_overdue_tasks(user_id)
     return jsonify({'tasks': tasks})
 
 # ============= PLANNER ENDPOINTS =============
-@app.route('/api/users/<int:user_id>/planner/schedule', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/planner/schedule', methods=['GET'])
 def suggest_schedule(user_id):
     """Get suggested schedule"""
     hours_per_day = request.args.get('hours_per_day', 4, type=int)
     days_ahead = request.args.get('days_ahead', 7, type=int)
+    mode = request.args.get('mode', 'greedy')
+    time_budget_ms = request.args.get('time_budget_ms', type=int)
     
-    schedule = SmartPlanner.suggest_schedule(user_id, hours_per_day, days_ahead)
+    try:
+        schedule = SmartPlanner.suggest_schedule(user_id, hours_per_day, days_ahead, mode, time_budget_ms)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify({'schedule': schedule})
 
-@app.route('/api/users/<int:user_id>/planner/recommendations', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/planner/recommendations', methods=['GET'])
 def daily_recommendations(user_id):
     """Get daily recommendations"""
     target_date_str = request.args.get('date')
@@ -378,7 +441,7 @@ def daily_recommendations(user_id):
     recommendations = SmartPlanner.get_daily_recommendations(user_id, target_date)
     return jsonify(recommendations)
 
-@app.route('/api/users/<int:user_id>/planner/workload', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/planner/workload', methods=['GET'])
 def workload_analysis(user_id):
     """Analyze workload"""
     days_ahead = request.args.get('days_ahead', 7, type=int)
@@ -386,13 +449,13 @@ def workload_analysis(user_id):
     return jsonify(analysis)
 
 # ============= RESCHEDULER ENDPOINTS =============
-@app.route('/api/users/<int:user_id>/reschedule/auto', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/reschedule/auto', methods=['POST'])
 def auto_reschedule(user_id):
     """Run automatic rescheduling"""
     results = TaskRescheduler.auto_reschedule_all(user_id)
     return jsonify(results)
 
-@app.route('/api/users/<int:user_id>/reschedule/balance', methods=['POST'])
+@bp.route('/api/users/<int:user_id>/reschedule/balance', methods=['POST'])
 def balance_workload(user_id):
     """Balance workload"""
     days_ahead = request.args.get('days_ahead', 7, type=int)
@@ -402,7 +465,7 @@ def balance_workload(user_id):
     return jsonify({'rebalanced': results})
 
 # ============= PROGRESS TRACKING ENDPOINTS =============
-@app.route('/api/tasks/<int:task_id>/progress', methods=['POST'])
+@bp.route('/api/tasks/<int:task_id>/progress', methods=['POST'])
 def update_progress(task_id):
     """Update task progress"""
     data = request.json
@@ -417,7 +480,7 @@ def update_progress(task_id):
         return jsonify(result)
     return jsonify({'error': 'Failed to update progress'}), 400
 
-@app.route('/api/tasks/<int:task_id>/analytics', methods=['GET'])
+@bp.route('/api/tasks/<int:task_id>/analytics', methods=['GET'])
 def task_analytics(task_id):
     """Get task analytics"""
     analytics = ProgressTracker.get_task_analytics(task_id)
@@ -426,7 +489,7 @@ def task_analytics(task_id):
     return jsonify({'error': 'Task not found'}), 404
 
 # ============= WEEKLY SUMMARY ENDPOINTS =============
-@app.route('/api/users/<int:user_id>/summary/weekly', methods=['GET', 'POST'])
+@bp.route('/api/users/<int:user_id>/summary/weekly', methods=['GET', 'POST'])
 def weekly_summary(user_id):
     """Get or generate weekly summary"""
     if request.method == 'POST':
@@ -439,7 +502,7 @@ def weekly_summary(user_id):
         summaries = WeeklySummary.get_by_user(user_id)
         return jsonify({'summaries': summaries})
 
-@app.route('/api/users/<int:user_id>/summary/comparison', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/summary/comparison', methods=['GET'])
 def summary_comparison(user_id):
     """Get weekly summary comparison"""
     weeks_back = request.args.get('weeks', 4, type=int)
@@ -449,7 +512,7 @@ def summary_comparison(user_id):
     return jsonify({'error': 'No summaries found'}), 404
 
 # ============= POMODORO SESSIONS ENDPOINTS =============
-@app.route('/api/sessions', methods=['POST'])
+@bp.route('/api/sessions', methods=['POST'])
 @token_required
 def create_session():
     """Create a new pomodoro session (not tied to a specific task)"""
@@ -483,7 +546,7 @@ def create_session():
         return jsonify({'error': 'Internal server error'}), 500
 
 # ============= FILE UPLOAD ENDPOINTS =============
-@app.route('/api/files/upload', methods=['POST'])
+@bp.route('/api/files/upload', methods=['POST'])
 @token_required
 def upload_file():
     """Upload a file"""
@@ -552,7 +615,7 @@ def upload_file():
         logger.error(f'File upload error: {e}')
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/files/<int:attachment_id>', methods=['DELETE'])
+@bp.route('/api/files/<int:attachment_id>', methods=['DELETE'])
 @token_required
 def delete_file(attachment_id):
     """Delete a file"""
@@ -577,20 +640,32 @@ def delete_file(attachment_id):
         logger.error(f'File deletion error: {e}')
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/users/<int:user_id>/files', methods=['GET'])
+@bp.route('/api/users/<int:user_id>/files', methods=['GET'])
 @token_required
 def get_user_files(user_id):
     """Get all files uploaded by a user"""
     try:
-        files = FileAttachment.get_by_user(user_id)
-        return jsonify({'files': files})
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        if not limit and not cursor:
+            return jsonify({'files': FileAttachment.get_by_user(user_id)})
+
+        limit = page_size(limit)
+        rows = FileAttachment.get_by_user(user_id, limit=limit + 1, after=cursor)
+        files, next_cursor = FileAttachment.KEYSET.page(rows, limit)
+        return jsonify({'files': files, 'next_cursor': next_cursor})
 
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f'Get user files error: {e}')
         return jsonify({'error': 'Internal server error'}), 500
 
 # ============= ENHANCED TASKS ENDPOINT =============
-@app.route('/api/users/<int:user_id>/tasks', methods=['GET', 'POST'])
+# Newest first; pages continue from the cursor's (created_at, task_id)
+_TASK_LIST_KEYSET = Keyset(('t.created_at', 'DESC'), ('t.task_id', 'DESC'))
+
+@bp.route('/api/users/<int:user_id>/tasks', methods=['GET', 'POST'])
 @token_required
 def tasks(user_id):
     """Get tasks with advanced filtering or create a new task"""
@@ -603,19 +678,19 @@ def tasks(user_id):
         date_from = request.args.get('date_from')
         date_to = request.args.get('date_to')
         limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
 
-        # Build query with filters
-        query = """
+        # Build query with filters; a search joins the full-text index first
+        match = full_text.task_match(search, user_id) if search else None
+        join, params, rank = match if match else ('', [], None)
+        query = f"""
             SELECT t.*, s.subject_name, s.color_code as subject_color
             FROM tasks t
+            {join}
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s
         """
-        params = [user_id]
-
-        if search:
-            query += " AND (t.title ILIKE %s OR t.description ILIKE %s)"
-            params.extend([f'%{search}%', f'%{search}%'])
+        params.append(user_id)
 
         if status:
             query += " AND t.status = %s"
@@ -637,43 +712,67 @@ def tasks(user_id):
             query += " AND t.scheduled_date <= %s"
             params.append(date_to)
 
-        query += " ORDER BY t.created_at DESC"
-
-        if limit:
+        if rank:
+            # Searches come back best match first; the rank has no stable
+            # keyset, so a search returns one page of at most limit matches
+            if cursor:
+                return jsonify({'error': 'cursor cannot be combined with search'}), 400
+            query += f" ORDER BY {rank}, t.created_at DESC, t.task_id DESC"
+            if not limit:
+                return jsonify({'tasks': Database.fetch_all(query, params)})
             query += " LIMIT %s"
-            params.append(limit)
+            params.append(page_size(limit))
+            return jsonify({'tasks': Database.fetch_all(query, params), 'next_cursor': None})
 
-        user_tasks = Database.fetch_all(query, params)
-        return jsonify({'tasks': user_tasks})
+        if not limit and not cursor:
+            query += " " + _TASK_LIST_KEYSET.order_by()
+            return jsonify({'tasks': Database.fetch_all(query, params)})
+
+        # Paginated listing: fetch one extra row to know whether there is a next page
+        limit = page_size(limit)
+        try:
+            condition, after_params = _TASK_LIST_KEYSET.after(cursor)
+        except InvalidCursorError as e:
+            return jsonify({'error': str(e)}), 400
+        if condition:
+            query += f" AND {condition}"
+            params.extend(after_params)
+        query += f" {_TASK_LIST_KEYSET.order_by()} LIMIT %s"
+        params.append(limit + 1)
+
+        user_tasks, next_cursor = _TASK_LIST_KEYSET.page(Database.fetch_all(query, params), limit)
+        return jsonify({'tasks': user_tasks, 'next_cursor': next_cursor})
 
     elif request.method == 'POST':
         data = request.json
         
-        # Enhanced Task Creation logic
-        # If user provides a NEW subject name, create it on the fly
-        if data.get('new_subject_name'):
-            # Check if subject already exists
-            existing_subject_query = "SELECT * FROM subjects WHERE user_id = %s AND subject_name = %s"
-            existing_subject = Database.fetch_one(existing_subject_query, (user_id, data['new_subject_name']))
-            
-            if existing_subject:
-                new_subject = existing_subject
-            else:
-                new_subject = Subject.create(
-                    user_id=user_id,
-                    subject_name=data['new_subject_name'],
-                    color_code=data.get('new_subject_color', '#3B82F6'),
-                    priority=3 # Default priority
-                )
+        # Subject lookup/creation and the task insert share one transaction
+        with Database.transaction():
+            # Enhanced Task Creation logic
+            # If user provides a NEW subject name, create it on the fly
+            if data.get('new_subject_name'):
+                # Check if subject already exists
+                existing_subject_query = "SELECT * FROM subjects WHERE user_id = %s AND subject_name = %s"
+                existing_subject = Database.fetch_one(existing_subject_query, (user_id, data['new_subject_name']))
+                
+                if existing_subject:
+                    new_subject = existing_subject
+                else:
+                    new_subject = Subject.create(
+                        user_id=user_id,
+                        subject_name=data['new_subject_name'],
+                        color_code=data.get('new_subject_color', '#3B82F6'),
+                        priority=3 # Default priority
+                    )
+                
+                if new_subject:
+                    data['subject_id'] = new_subject['subject_id']
+                    # Remove temp fields so Task.create doesn't complain
+                    del data['new_subject_name']
+                    if 'new_subject_color' in data:
+                        del data['new_subject_color']
             
-            if new_subject:
-                data['subject_id'] = new_subject['subject_id']
-                # Remove temp fields so Task.create doesn't complain
-                del data['new_subject_name']
-                if 'new_subject_color' in data:
-                    del data['new_subject_color']
-        
-        task = Task.create(user_id=user_id, **data)
+            task = Task.create(user_id=user_id, **data)
         
         # Background agent integration
         agent_suggestion = background_agent.on_task_created(user_id, task)
@@ -689,30 +788,30 @@ def tasks(user_id):
         return jsonify({'task': task, 'agent_suggestion': agent_suggestion}), 201
 
 # ============= STATIC FILES =============
-@app.route('/')
+@bp.route('/')
 def serve_landing():
     """Serve the landing page"""
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(current_app.static_folder, 'index.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def serve_dashboard():
     """Serve the dashboard (requires authentication)"""
-    return send_from_directory(app.static_folder, 'dashboard.html')
+    return send_from_directory(current_app.static_folder, 'dashboard.html')
 
-@app.route('/login')
+@bp.route('/login')
 def serve_login():
     """Serve the login page"""
-    return send_from_directory(app.static_folder, 'login.html')
+    return send_from_directory(current_app.static_folder, 'login.html')
 
-@app.route('/register')
+@bp.route('/register')
 def serve_register():
     """Serve the register page"""
-    return send_from_directory(app.static_folder, 'register.html')
+    return send_from_directory(current_app.static_folder, 'register.html')
 
 # ============= ADVANCED FEATURES API =============
 
 # Study Goals API
-@app.route('/api/goals', methods=['GET', 'POST'])
+@bp.route('/api/goals', methods=['GET', 'POST'])
 @token_required
 def goals():
     """Get or create study goals"""
@@ -744,7 +843,7 @@ def goals():
         else:
             return jsonify({'error': 'Failed to create goal'}), 500
 
-@app.route('/api/goals/<int:goal_id>', methods=['GET', 'PUT', 'DELETE'])
+@bp.route('/api/goals/<int:goal_id>', methods=['GET', 'PUT', 'DELETE'])
 @token_required
 def goal_detail(goal_id):
     """Get, update, or delete a specific goal"""
@@ -778,7 +877,7 @@ def goal_detail(goal_id):
         return jsonify({'message': 'Goal deleted successfully'})
 
 # Study Streaks API
-@app.route('/api/streaks', methods=['GET'])
+@bp.route('/api/streaks', methods=['GET'])
 @token_required
 def streaks():
     """Get study streaks for user"""
@@ -794,7 +893,7 @@ def streaks():
         'stats': stats
     })
 
-@app.route('/api/streaks/log', methods=['POST'])
+@bp.route('/api/streaks/log', methods=['POST'])
 @token_required
 def log_streak():
     """Log study activity for streak tracking"""
@@ -813,7 +912,7 @@ def log_streak():
         return jsonify({'error': 'Failed to log streak'}), 500
 
 # Notifications API
-@app.route('/api/notifications', methods=['GET', 'POST'])
+@bp.route('/api/notifications', methods=['GET', 'POST'])
 @token_required
 def notifications():
     """Get or create notifications"""
@@ -821,8 +920,10 @@ def notifications():
     
     if request.method == 'GET':
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-        notifications_list = Notification.get_by_user(user_id, unread_only)
-        return jsonify({'notifications': notifications_list})
+        limit = page_size(request.args.get('limit', type=int), default=20)
+        rows = Notification.get_by_user(user_id, unread_only, limit=limit + 1, after=request.args.get('cursor'))
+        notifications_list, next_cursor = Notification.KEYSET.page(rows, limit)
+        return jsonify({'notifications': notifications_list, 'next_cursor': next_cursor})
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -845,7 +946,7 @@ def notifications():
         else:
             return jsonify({'error': 'Failed to create notification'}), 500
 
-@app.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
+@bp.route('/api/notifications/<int:notification_id>/read', methods=['PUT'])
 @token_required
 def mark_notification_read(notification_id):
     """Mark notification as read"""
@@ -861,7 +962,7 @@ def mark_notification_read(notification_id):
     Notification.mark_as_read(notification_id)
     return jsonify({'message': 'Notification marked as read'})
 
-@app.route('/api/notifications/mark-all-read', methods=['PUT'])
+@bp.route('/api/notifications/mark-all-read', methods=['PUT'])
 @token_required
 def mark_all_notifications_read():
     """Mark all notifications as read"""
@@ -870,82 +971,173 @@ def mark_all_notifications_read():
     return jsonify({'message': 'All notifications marked as read'})
 
 # Analytics API
-@app.route('/api/analytics/overview', methods=['GET'])
-@token_required
-def analytics_overview():
-    """Get comprehensive analytics overview"""
-    user_id = g.user_id
-    
-    # Get current week data
-    today = date.today()
+# Aggregate queries shared by the sync views and their async variants
+_TASK_COUNTS_QUERY = """
+    SELECT COUNT(*) AS planned,
+           COALESCE(SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END), 0) AS completed
+    FROM tasks
+    WHERE user_id = %s AND scheduled_date BETWEEN %s AND %s
+"""
+
+def _fetch_specs(specs):
+    """Run {name: (query, params, single_row)} specs one after another"""
+    return {
+        name: (Database.fetch_one if single else Database.fetch_all)(query, params)
+        for name, (query, params, single) in specs.items()
+    }
+
+async def _fetch_specs_async(specs):
+    """Run {name: (query, params, single_row)} specs concurrently"""
+    rows = await asyncio.gather(*(
+        (AsyncDatabase.fetch_one if single else AsyncDatabase.fetch_all)(query, params)
+        for query, params, single in specs.values()
+    ))
+    return dict(zip(specs, rows))
+
+def _analytics_overview_queries(user_id, today):
+    """Queries behind /api/analytics/overview"""
     week_start = today - timedelta(days=today.weekday())
     week_end = week_start + timedelta(days=6)
-    
-    # Weekly statistics
-    weekly_tasks = Task.get_by_date_range(user_id, week_start, week_end)
-    completed_tasks = [t for t in weekly_tasks if t['status'] == 'completed']
-    weekly_sessions = StudySession.get_by_user_and_date_range(user_id, week_start, week_end)
-    
-    total_weekly_hours = sum(s['duration_hours'] for s in weekly_sessions)
-    completion_rate = (len(completed_tasks) / len(weekly_tasks)) * 100 if weekly_tasks else 0
-    
-    # Monthly statistics
     month_start = today.replace(day=1)
-    monthly_tasks = Task.get_by_date_range(user_id, month_start, today)
-    monthly_completed = [t for t in monthly_tasks if t['status'] == 'completed']
-    monthly_sessions = StudySession.get_by_user_and_date_range(user_id, month_start, today)
-    total_monthly_hours = sum(s['duration_hours'] for s in monthly_sessions)
+    
+    return {
+        'weekly_tasks': (_TASK_COUNTS_QUERY, (user_id, week_start, week_end), True),
+        'weekly_sessions': (DailyStats.TOTALS_QUERY, (user_id, week_start, week_end), True),
+        'monthly_tasks': (_TASK_COUNTS_QUERY, (user_id, month_start, today), True),
+        'monthly_sessions': (DailyStats.TOTALS_QUERY, (user_id, month_start, today), True),
+        'subjects': ("""
+            SELECT s.subject_id, s.subject_name,
+                   COUNT(t.task_id) AS total_tasks,
+                   COALESCE(SUM(CASE WHEN t.status = 'completed' THEN 1 ELSE 0 END), 0) AS tasks_completed
+            FROM subjects s
+            LEFT JOIN tasks t ON t.subject_id = s.subject_id
+            WHERE s.user_id = %s
+            GROUP BY s.subject_id, s.subject_name, s.priority
+            ORDER BY s.priority DESC, s.subject_name
+        """, (user_id,), False),
+        'subject_hours': (DailyStats.SUBJECT_HOURS_QUERY, (user_id,), False),
+        'goals': ("""
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(CASE WHEN status = 'active' THEN 1 ELSE 0 END), 0) AS active
+            FROM study_goals
+            WHERE user_id = %s
+        """, (user_id,), True),
+        'current_streak': (StudyStreak.CURRENT_STREAK_QUERY, (user_id,), True),
+        'streak_stats': (StudyStreak.STREAK_STATS_QUERY, (user_id,), True)
+    }
+
+def _analytics_overview_response(results):
+    """Shape the overview results into the API response"""
+    weekly = results['weekly_tasks']
+    monthly = results['monthly_tasks']
+    completion_rate = (weekly['completed'] / weekly['planned']) * 100 if weekly['planned'] else 0
     
     # Subject performance
-    subjects = Subject.get_by_user(user_id)
+    hours_by_subject = {row['subject_id']: float(row['hours']) for row in results['subject_hours']}
     subject_stats = []
-    for subject in subjects:
-        subject_tasks = Task.get_by_subject(subject['subject_id'])
-        subject_completed = [t for t in subject_tasks if t['status'] == 'completed']
-        subject_sessions = StudySession.get_by_subject(subject['subject_id'])
-        subject_hours = sum(s['duration_hours'] for s in subject_sessions)
-        
+    for subject in results['subjects']:
+        total = subject['total_tasks']
+        completed = subject['tasks_completed']
         subject_stats.append({
-            'subject': subject['name'],
-            'tasks_completed': len(subject_completed),
-            'total_tasks': len(subject_tasks),
-            'study_hours': subject_hours,
-            'completion_rate': (len(subject_completed) / len(subject_tasks)) * 100 if subject_tasks else 0
+            'subject': subject['subject_name'],
+            'tasks_completed': completed,
+            'total_tasks': total,
+            'study_hours': round(hours_by_subject.get(subject['subject_id'], 0.0), 2),
+            'completion_rate': (completed / total) * 100 if total else 0
         })
     
-    # Goals progress
-    goals = StudyGoal.get_by_user(user_id)
-    active_goals = [g for g in goals if g['status'] == 'active']
-    
-    # Streaks
-    current_streak = StudyStreak.get_current_streak(user_id)
-    streak_stats = StudyStreak.get_streak_stats(user_id)
-    
-    return jsonify({
+    streak = results['current_streak']
+    return {
         'weekly': {
-            'tasks_planned': len(weekly_tasks),
-            'tasks_completed': len(completed_tasks),
+            'tasks_planned': weekly['planned'],
+            'tasks_completed': weekly['completed'],
             'completion_rate': round(completion_rate, 2),
-            'study_hours': round(total_weekly_hours, 2)
+            'study_hours': round(float(results['weekly_sessions']['hours']), 2)
         },
         'monthly': {
-            'tasks_planned': len(monthly_tasks),
-            'tasks_completed': len(monthly_completed),
-            'study_hours': round(total_monthly_hours, 2)
+            'tasks_planned': monthly['planned'],
+            'tasks_completed': monthly['completed'],
+            'study_hours': round(float(results['monthly_sessions']['hours']), 2)
         },
         'subjects': subject_stats,
         'goals': {
-            'active': len(active_goals),
-            'total': len(goals)
+            'active': results['goals']['active'],
+            'total': results['goals']['total']
         },
         'streaks': {
-            'current': current_streak,
-            'stats': streak_stats
+            'current': streak['streak_days'] if streak else 0,
+            'stats': results['streak_stats']
         }
-    })
+    }
+
+@bp.route('/api/analytics/overview', methods=['GET'])
+@token_required
+@replica_reads
+def analytics_overview():
+    """Get comprehensive analytics overview"""
+    results = _fetch_specs(_analytics_overview_queries(g.user_id, date.today()))
+    return jsonify(_analytics_overview_response(results))
 
-@app.route('/api/analytics/chart-data', methods=['GET'])
 @token_required
+async def analytics_overview_async():
+    """Async variant of analytics_overview; the queries run concurrently"""
+    results = await _fetch_specs_async(_analytics_overview_queries(g.user_id, date.today()))
+    return jsonify(_analytics_overview_response(results))
+
+# Dashboard API
+def _dashboard_queries(user_id, today):
+    """Queries behind /api/dashboard"""
+    return {
+        'subjects': ("SELECT COUNT(*) AS count FROM subjects WHERE user_id = %s", (user_id,), True),
+        'tasks_today': (_TASK_COUNTS_QUERY, (user_id, today, today), True),
+        'sessions_today': (DailyStats.TOTALS_QUERY, (user_id, today, today), True),
+        'upcoming': ("""
+            SELECT t.task_id, t.title, t.scheduled_date, t.scheduled_time, t.priority, t.status,
+                   s.subject_name, s.color_code
+            FROM tasks t
+            LEFT JOIN subjects s ON t.subject_id = s.subject_id
+            WHERE t.user_id = %s AND t.status != 'completed' AND t.scheduled_date >= %s
+            ORDER BY t.scheduled_date, t.scheduled_time
+            LIMIT 5
+        """, (user_id, today), False),
+        'unread_notifications': (
+            "SELECT COUNT(*) AS count FROM notifications WHERE user_id = %s AND is_read = %s",
+            (user_id, False), True
+        )
+    }
+
+def _dashboard_response(results):
+    """Shape the dashboard results into the API response"""
+    tasks_today = results['tasks_today']
+    sessions_today = results['sessions_today']
+    progress = (tasks_today['completed'] / tasks_today['planned']) * 100 if tasks_today['planned'] else 0
+    return {
+        'subjects_count': results['subjects']['count'],
+        'tasks_today': tasks_today['planned'],
+        'tasks_completed_today': tasks_today['completed'],
+        'progress_percent': round(progress),
+        'sessions_today': sessions_today['sessions'],
+        'study_hours_today': round(float(sessions_today['hours']), 2),
+        'upcoming_tasks': results['upcoming'],
+        'unread_notifications': results['unread_notifications']['count']
+    }
+
+@bp.route('/api/dashboard', methods=['GET'])
+@token_required
+def dashboard_data():
+    """Get the home-tab summary in one request"""
+    results = _fetch_specs(_dashboard_queries(g.user_id, date.today()))
+    return jsonify(_dashboard_response(results))
+
+@token_required
+async def dashboard_data_async():
+    """Async variant of dashboard_data; the queries run concurrently"""
+    results = await _fetch_specs_async(_dashboard_queries(g.user_id, date.today()))
+    return jsonify(_dashboard_response(results))
+
+@bp.route('/api/analytics/chart-data', methods=['GET'])
+@token_required
+@replica_reads
 def analytics_chart_data():
     """Get data for charts and visualizations"""
     user_id = g.user_id
@@ -956,44 +1148,32 @@ def analytics_chart_data():
     start_date = end_date - timedelta(days=days)
     
     if chart_type == 'weekly_progress':
-        # Daily study hours and task completion
+        # Daily study hours and task completion; days without activity have no rollup row
+        by_day = {row['stat_date']: row for row in DailyStats.daily(user_id, start_date, end_date)}
         data = []
         current_date = start_date
         while current_date <= end_date:
-            sessions = StudySession.get_by_user_and_date(user_id, current_date)
-            tasks = Task.get_completed_by_date(user_id, current_date)
-            
-            daily_hours = sum(s['duration_hours'] for s in sessions)
-            
+            day = by_day.get(current_date)
             data.append({
                 'date': current_date.isoformat(),
-                'study_hours': round(daily_hours, 2),
-                'tasks_completed': len(tasks)
+                'study_hours': round(float(day['hours']), 2) if day else 0,
+                'tasks_completed': day['tasks_completed'] if day else 0
             })
             current_date += timedelta(days=1)
         
         return jsonify({'data': data})
     
     elif chart_type == 'subject_distribution':
-        subjects = Subject.get_by_user(user_id)
-        data = []
-        
-        for subject in subjects:
-            sessions = StudySession.get_by_subject_and_date_range(subject['subject_id'], start_date, end_date)
-            hours = sum(s['duration_hours'] for s in sessions)
-            
-            if hours > 0:
-                data.append({
-                    'subject': subject['name'],
-                    'hours': round(hours, 2)
-                })
-        
+        data = [
+            {'subject': row['subject_name'], 'hours': round(float(row['hours']), 2)}
+            for row in DailyStats.by_subject(user_id, start_date, end_date)
+        ]
         return jsonify({'data': data})
     
     return jsonify({'error': 'Invalid chart type'}), 400
 
 # File Attachments API
-@app.route('/api/attachments/<int:task_id>', methods=['GET', 'POST'])
+@bp.route('/api/attachments/<int:task_id>', methods=['GET', 'POST'])
 @token_required
 def task_attachments(task_id):
     """Get or upload attachments for a task"""
@@ -1014,7 +1194,7 @@ def task_attachments(task_id):
         return jsonify({'error': 'File upload not implemented yet'}), 501
 
 # ============= CHAPTERS API =============
-@app.route('/api/subjects/\u003cint:subject_id\u003e/chapters', methods=['GET', 'POST'])
+@bp.route('/api/subjects/\u003cint:subject_id\u003e/chapters', methods=['GET', 'POST'])
 @token_required
 def subject_chapters(subject_id):
     """Get or create chapters for a subject"""
@@ -1047,21 +1227,31 @@ def subject_chapters(subject_id):
     
     elif request.method == 'POST':
         data = request.json
-        query = """
-            INSERT INTO chapters (subject_id, chapter_name, chapter_number, difficulty, estimated_hours)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING chapter_id
-        """
-        chapter_id = Database.execute(query, (
-            subject_id,
-            data['chapter_name'],
-            data['chapter_number'],
-            data.get('difficulty', 'MEDIUM'),
-            data.get('estimated_hours', 2.0)
-        ))
-        return jsonify({'chapter_id': chapter_id, 'message': 'Chapter created'}), 201
-
-@app.route('/api/chapters/\u003cint:chapter_id\u003e', methods=['GET', 'PUT', 'DELETE'])
+        # Accept either a single chapter or {"chapters": [...]} for batch creation
+        chapters_data = data['chapters'] if 'chapters' in data else [data]
+        rows = [
+            (
+                subject_id,
+                chapter['chapter_name'],
+                chapter['chapter_number'],
+                chapter.get('difficulty', 'MEDIUM'),
+                chapter.get('estimated_hours', 2.0)
+            )
+            for chapter in chapters_data
+        ]
+        created = Database.bulk_insert(
+            'chapters',
+            ['subject_id', 'chapter_name', 'chapter_number', 'difficulty', 'estimated_hours'],
+            rows,
+            returning='chapter_id'
+        )
+        chapter_ids = [row['chapter_id'] for row in created]
+        
+        if 'chapters' in data:
+            return jsonify({'chapter_ids': chapter_ids, 'message': f'{len(chapter_ids)} chapters created'}), 201
+        return jsonify({'chapter_id': chapter_ids[0], 'message': 'Chapter created'}), 201
+
+@bp.route('/api/chapters/\u003cint:chapter_id\u003e', methods=['GET', 'PUT', 'DELETE'])
 @token_required
 def chapter_detail(chapter_id):
     """Get, update, or delete a chapter"""
@@ -1105,23 +1295,23 @@ def chapter_detail(chapter_id):
         if updates:
             values.append(chapter_id)
             query = f"UPDATE chapters SET {', '.join(updates)} WHERE chapter_id = %s"
-            Database.execute(query, tuple(values))
+            Database.execute_query(query, tuple(values), fetch=False)
         
         return jsonify({'message': 'Chapter updated'})
     
     elif request.method == 'DELETE':
-        Database.execute("DELETE FROM chapters WHERE chapter_id = %s", (chapter_id,))
+        Database.execute_query("DELETE FROM chapters WHERE chapter_id = %s", (chapter_id,), fetch=False)
         return jsonify({'message': 'Chapter deleted'})
 
 # ============= BADGES API =============
-@app.route('/api/badges', methods=['GET'])
+@bp.route('/api/badges', methods=['GET'])
 def get_badges():
     """Get all available badges"""
     query = "SELECT * FROM badges ORDER BY badge_level, criteria_value"
     badges = Database.fetch_all(query)
     return jsonify({'badges': badges})
 
-@app.route('/api/users/\u003cint:user_id\u003e/badges', methods=['GET'])
+@bp.route('/api/users/\u003cint:user_id\u003e/badges', methods=['GET'])
 @token_required
 def user_badges(user_id):
     """Get badges earned by user"""
@@ -1148,7 +1338,7 @@ def user_badges(user_id):
         'total_earned': len(earned_badges)
     })
 
-@app.route('/api/users/\u003cint:user_id\u003e/badges/check', methods=['POST'])
+@bp.route('/api/users/\u003cint:user_id\u003e/badges/check', methods=['POST'])
 @token_required
 def check_and_award_badges(user_id):
     """Check if user has earned any new badges"""
@@ -1173,7 +1363,7 @@ def check_and_award_badges(user_id):
             # Get current streak
             streak_query = """
                 SELECT COUNT(*) as streak FROM study_streaks
-                WHERE user_id = %s AND streak_date >= CURRENT_DATE - INTERVAL '%s days'
+                WHERE user_id = %s AND streak_date >= CURRENT_DATE - %s * INTERVAL '1 day'
             """
             result = Database.fetch_one(streak_query, (user_id, badge['criteria_value']))
             if result and result['streak'] >= badge['criteria_value']:
@@ -1182,8 +1372,8 @@ def check_and_award_badges(user_id):
         elif badge['criteria_type'] == 'study_hours':
             # Get total study hours
             hours_query = """
-                SELECT COALESCE(SUM(duration_minutes), 0) / 60.0 as total_hours
-                FROM study_sessions WHERE user_id = %s
+                SELECT COALESCE(SUM(study_minutes), 0) / 60.0 as total_hours
+                FROM daily_user_stats WHERE user_id = %s
             """
             result = Database.fetch_one(hours_query, (user_id,))
             if result and result['total_hours'] >= badge['criteria_value']:
@@ -1207,7 +1397,7 @@ def check_and_award_badges(user_id):
         if earned:
             # Award badge
             insert_query = "INSERT INTO user_badges (user_id, badge_id) VALUES (%s, %s)"
-            Database.execute(insert_query, (user_id, badge['badge_id']))
+            Database.execute_query(insert_query, (user_id, badge['badge_id']), fetch=False)
             newly_earned.append(badge)
     
     return jsonify({
@@ -1216,7 +1406,8 @@ def check_and_award_badges(user_id):
     })
 
 # ============= LIVE STATISTICS API =============
-@app.route('/api/stats/live', methods=['GET'])
+@bp.route('/api/stats/live', methods=['GET'])
+@replica_reads
 def live_statistics():
     """Get live platform statistics"""
     stats = {}
@@ -1224,14 +1415,14 @@ def live_statistics():
     # Active students (users who studied in last 7 days)
     active_query = """
         SELECT COUNT(DISTINCT user_id) as count
-        FROM study_sessions
-        WHERE start_time >= CURRENT_DATE - INTERVAL '7 days'
+        FROM daily_user_stats
+        WHERE stat_date >= CURRENT_DATE - INTERVAL '7 days' AND sessions > 0
     """
     result = Database.fetch_one(active_query)
     stats['active_students'] = result['count'] if result else 0
     
     # Total study sessions
-    sessions_query = "SELECT COUNT(*) as count FROM study_sessions"
+    sessions_query = "SELECT COALESCE(SUM(sessions), 0) as count FROM daily_user_stats"
     result = Database.fetch_one(sessions_query)
     stats['study_sessions'] = result['count'] if result else 0
     
@@ -1255,7 +1446,7 @@ def live_statistics():
     return jsonify(stats)
 
 # ============= USER PREFERENCES API =============
-@app.route('/api/users/\u003cint:user_id\u003e/preferences', methods=['GET', 'PUT'])
+@bp.route('/api/users/\u003cint:user_id\u003e/preferences', methods=['GET', 'PUT'])
 @token_required
 def user_preferences(user_id):
     """Get or update user preferences"""
@@ -1284,25 +1475,25 @@ def user_preferences(user_id):
             'notifications_enabled', 'theme'
         ]
         
-        for field in allowed_fields:
-            if field in data:
-                updates.append(f'{field} = %s')
-                values.append(data[field])
+        fields = [field for field in allowed_fields if field in data]
+        for field in fields:
+            updates.append(f'{field} = %s')
+            values.append(data[field])
         
         if updates:
             updates.append('updated_at = CURRENT_TIMESTAMP')
-            values.append(user_id)
             query = f"""
-                INSERT INTO user_preferences (user_id, {', '.join([f.split(' = ')[0] for f in updates if 'updated_at' not in f])})
-                VALUES (%s, {', '.join(['%s'] * (len(values) - 1))})
+                INSERT INTO user_preferences (user_id, {', '.join(fields)})
+                VALUES (%s, {', '.join(['%s'] * len(fields))})
                 ON CONFLICT (user_id) DO UPDATE SET {', '.join(updates)}
             """
-            Database.execute(query, tuple([user_id] + values[:-1] + [user_id]))
+            # The inserted values, then the same values again for the update
+            Database.execute_query(query, tuple([user_id] + values + values), fetch=False)
         
         return jsonify({'message': 'Preferences updated'})
 
 # ============= CALENDAR & TASKS API =============
-@app.route('/api/users/\u003cint:user_id\u003e/calendar', methods=['GET'])
+@bp.route('/api/users/\u003cint:user_id\u003e/calendar', methods=['GET'])
 @token_required
 def calendar_tasks(user_id):
     """Get tasks for calendar view"""
@@ -1311,9 +1502,15 @@ def calendar_tasks(user_id):
     
     month = request.args.get('month')  # Format: YYYY-MM
     
+    # The calendar only draws the summary columns; ?fields=full returns whole rows
+    try:
+        columns = Task.select_list(request.args.get('fields', 'summary'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     if month:
-        query = """
-            SELECT t.*, s.subject_name, s.color_code
+        query = f"""
+            SELECT {columns}
             FROM tasks t
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s 
@@ -1323,8 +1520,8 @@ def calendar_tasks(user_id):
         tasks = Database.fetch_all(query, (user_id, f"{month}-01"))
     else:
         # Get current month
-        query = """
-            SELECT t.*, s.subject_name, s.color_code
+        query = f"""
+            SELECT {columns}
             FROM tasks t
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s 
@@ -1335,7 +1532,7 @@ def calendar_tasks(user_id):
     
     return jsonify({'tasks': tasks})
 
-@app.route('/api/tasks/\u003cint:task_id\u003e/reschedule', methods=['PUT'])
+@bp.route('/api/tasks/\u003cint:task_id\u003e/reschedule', methods=['PUT'])
 @token_required
 def reschedule_task(task_id):
     """Reschedule a task"""
@@ -1352,40 +1549,54 @@ def reschedule_task(task_id):
     if not new_date:
         return jsonify({'error': 'scheduled_date required'}), 400
     
-    query = """
-        UPDATE tasks 
-        SET scheduled_date = %s, scheduled_time = %s, status = 'rescheduled', updated_at = CURRENT_TIMESTAMP
-        WHERE task_id = %s
-    """
-    Database.execute(query, (new_date, new_time, task_id))
+    # Task.update logs the change for the stored schedule plan and bumps the user's data version
+    Task.update(task_id, scheduled_date=new_date, scheduled_time=new_time, status='rescheduled')
     
     return jsonify({'message': 'Task rescheduled'})
 
 # ============= ERROR HANDLERS =============
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(InvalidCursorError)
+def invalid_cursor(error):
+    return jsonify({'error': str(error)}), 400
+
+@bp.app_errorhandler(500)
 def internal_error(error):
     logger.error(f"Internal error: {error}")
     return jsonify({'error': 'Internal server error'}), 500
 
 # ============= AI AGENT ENDPOINTS =============
-@app.route('/api/agent/chat', methods=['POST'])
+def _chat_message_from_request():
+    """Validated chat message from the request body, or (None, error response)"""
+    data = request.get_json()
+    
+    if not data or 'message' not in data:
+        return None, (jsonify({'error': 'Message is required'}), 400)
+    
+    user_message = data['message'].strip()
+    if not user_message:
+        return None, (jsonify({'error': 'Message cannot be empty'}), 400)
+    return user_message, None
+
+def _chat_response(response_data):
+    return jsonify({
+        'response': response_data['response'],
+        'context_used': response_data.get('context_used', {}),
+        'error': response_data.get('error', False)
+    }), 200
+
+@bp.route('/api/agent/chat', methods=['POST'])
 @token_required
 def agent_chat():
     """Send a message to the AI study assistant"""
     try:
         user_id = g.user_id
-        data = request.get_json()
-        
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-        
-        user_message = data['message'].strip()
-        if not user_message:
-            return jsonify({'error': 'Message cannot be empty'}), 400
+        user_message, error = _chat_message_from_request()
+        if error:
+            return error
         
         # Get recent chat history for context
         chat_history = ChatMessage.get_recent(user_id, limit=10)
@@ -1400,39 +1611,63 @@ def agent_chat():
         if not response_data.get('error'):
             ChatMessage.create(user_id, 'assistant', response_data['response'])
         
-        return jsonify({
-            'response': response_data['response'],
-            'context_used': response_data.get('context_used', {}),
-            'error': response_data.get('error', False)
-        }), 200
+        return _chat_response(response_data)
         
     except Exception as e:
         logger.error(f'Agent chat error: {e}', exc_info=True)
         return jsonify({'error': 'Failed to process message'}), 500
 
-@app.route('/api/agent/history', methods=['GET'])
+@token_required
+async def agent_chat_async():
+    """Async variant of agent_chat; neither the DB nor the Gemini call blocks a thread"""
+    try:
+        user_id = g.user_id
+        user_message, error = _chat_message_from_request()
+        if error:
+            return error
+        
+        chat_history = await ChatMessage.get_recent_async(user_id, limit=10)
+        await ChatMessage.create_async(user_id, 'user', user_message)
+        
+        response_data = await agent_service.chat_async(user_id, user_message, chat_history)
+        
+        if not response_data.get('error'):
+            await ChatMessage.create_async(user_id, 'assistant', response_data['response'])
+        
+        return _chat_response(response_data)
+        
+    except Exception as e:
+        logger.error(f'Agent chat error: {e}', exc_info=True)
+        return jsonify({'error': 'Failed to process message'}), 500
+
+@bp.route('/api/agent/history', methods=['GET'])
 @token_required
 def agent_history():
     """Get chat history for the current user"""
     try:
         user_id = g.user_id
-        limit = request.args.get('limit', 50, type=int)
-        
-        # Limit max to 100 messages
-        limit = min(limit, 100)
+        limit = page_size(request.args.get('limit', type=int))
         
-        messages = ChatMessage.get_by_user(user_id, limit=limit)
+        # One extra (oldest) message tells us whether earlier history exists
+        messages = ChatMessage.get_by_user(user_id, limit=limit + 1, before=request.args.get('before'))
+        previous_cursor = None
+        if len(messages) > limit:
+            messages = messages[1:]
+            previous_cursor = ChatMessage.KEYSET.cursor_for(messages[0])
         
         return jsonify({
             'messages': messages,
-            'count': len(messages)
+            'count': len(messages),
+            'previous_cursor': previous_cursor
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f'Get agent history error: {e}')
         return jsonify({'error': 'Failed to retrieve chat history'}), 500
 
-@app.route('/api/agent/history', methods=['DELETE'])
+@bp.route('/api/agent/history', methods=['DELETE'])
 @token_required
 def clear_agent_history():
     """Clear chat history for the current user"""
@@ -1446,7 +1681,7 @@ def clear_agent_history():
         logger.error(f'Clear agent history error: {e}')
         return jsonify({'error': 'Failed to clear chat history'}), 500
 
-@app.route('/api/agent/suggestions', methods=['GET'])
+@bp.route('/api/agent/suggestions', methods=['GET'])
 @token_required
 def agent_suggestions():
     """Get proactive study suggestions from the AI agent"""
@@ -1463,7 +1698,7 @@ def agent_suggestions():
         logger.error(f'Get agent suggestions error: {e}')
         return jsonify({'error': 'Failed to get suggestions'}), 500
 
-@app.route('/api/agent/insights', methods=['GET'])
+@bp.route('/api/agent/insights', methods=['GET'])
 @token_required
 def agent_daily_insights():
     """Get daily insights and smart recommendations from AI agent"""
@@ -1486,7 +1721,7 @@ def agent_daily_insights():
         logger.error(f'Get agent insights error: {e}')
         return jsonify({'error': 'Failed to get insights'}), 500
 
-@app.route('/api/agent/generate-plan', methods=['POST'])
+@bp.route('/api/agent/generate-plan', methods=['POST'])
 @token_required
 def generate_study_plan():
     """Generate a study plan using AI"""
@@ -1509,17 +1744,17 @@ def generate_study_plan():
         # Optional: Automated task creation
         created_tasks = []
         if auto_create and result.get('tasks_to_create'):
-            for task_data in result['tasks_to_create']:
-                # Basic validation and creation
-                new_task = Task.create(
-                    user_id=user_id,
-                    title=task_data.get('title', 'AI Suggested Task'),
-                    estimated_hours=task_data.get('estimated_hours', 1.0),
-                    task_type=task_data.get('task_type', 'study'),
-                    priority=task_data.get('priority', 3),
-                    status='pending'
-                )
-                created_tasks.append(new_task)
+            # Basic validation, then create every suggested task in one batch
+            created_tasks = Task.create_many(user_id, [
+                {
+                    'title': task_data.get('title', 'AI Suggested Task'),
+                    'estimated_hours': task_data.get('estimated_hours', 1.0),
+                    'task_type': task_data.get('task_type', 'study'),
+                    'priority': task_data.get('priority', 3),
+                    'status': 'pending'
+                }
+                for task_data in result['tasks_to_create']
+            ])
                 
         return jsonify({
             'response': result['response'],
@@ -1533,6 +1768,51 @@ def generate_study_plan():
 
 
 
+# ============= APP FACTORY =============
+# Async variants swapped in for their sync endpoints when ASYNC_VIEWS is enabled
+ASYNC_VIEWS = {
+    'main.agent_chat': agent_chat_async,
+    'main.analytics_overview': analytics_overview_async,
+    'main.dashboard_data': dashboard_data_async
+}
+
+def async_views_supported():
+    """Async views need flask[async] (asgiref) and the async driver for the backend"""
+    return find_spec('asgiref') is not None and async_driver_available()
+
+def create_app():
+    """
+    Build the Flask application.
+    
+    Nothing here touches the database: the connection pool is created by the
+    first query in each process, so pre-fork servers (e.g. gunicorn
+    main:app) never share pooled connections across workers.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    
+    app = Flask(__name__, static_folder='../frontend', static_url_path='')
+    app.config['SECRET_KEY'] = AppConfig.SECRET_KEY
+    app.json = CustomJSONProvider(app)
+    CORS(app, origins=AppConfig.CORS_ORIGINS)
+    app.register_blueprint(bp)
+    
+    if AppConfig.ASYNC_VIEWS:
+        if async_views_supported():
+            app.view_functions.update(ASYNC_VIEWS)
+            logger.info(f"Async views enabled for: {', '.join(sorted(ASYNC_VIEWS))}")
+        else:
+            logger.warning("ASYNC_VIEWS is set but flask[async] or the async database driver is missing; using sync views")
+    return app
+
+
+# Entry point for gunicorn main:app and flask --app main; safe to build at
+# import because the pool is only created by the first query in each process
+app = create_app()
+
+
 # ============= MAIN =============
 if __name__ == '__main__':
     logger.info("Starting Smart Study Planner API")
@@ -0,0 +1,68 @@
+"""
+Migration 017: composite and partial indexes
+Replaces single-column user_id indexes with indexes shaped like the model
+queries (filter columns first, then the sort order), and drops indexes
+that are a prefix of a composite or UNIQUE index
+
+    python migrate_composite_indexes.py
+"""
+
+import logging
+import migrations
+
+VERSION = '017_composite_indexes'
+DESCRIPTION = 'Composite and partial indexes for per-user listings'
+
+INDEXES = [
+    # Task.get_by_date_range, planner and rescheduler day lookups
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_scheduled ON tasks(user_id, scheduled_date, scheduled_time)",
+    # Task.get_by_user(status=...) and status counts
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_status_deadline ON tasks(user_id, status, deadline)",
+    # Task.get_by_user keyset order
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_deadline ON tasks(user_id, deadline, priority DESC, task_id)",
+    # /api/users/<id>/tasks keyset order
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_created ON tasks(user_id, created_at DESC, task_id DESC)",
+    # Task.get_overdue_tasks only ever looks at open tasks
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_open_deadline ON tasks(user_id, deadline) "
+    "WHERE status NOT IN ('completed', 'rescheduled')",
+    # ON DELETE SET NULL from subjects otherwise scans every task
+    "CREATE INDEX IF NOT EXISTS idx_tasks_subject_id ON tasks(subject_id)",
+    # StudySession date-range and streaming queries
+    "CREATE INDEX IF NOT EXISTS idx_study_sessions_user_start ON study_sessions(user_id, start_time)",
+    # StudyGoal.get_by_user order
+    "CREATE INDEX IF NOT EXISTS idx_study_goals_user_target ON study_goals(user_id, target_date, created_at DESC)",
+    # Notification.get_by_user keyset order, and the unread-only listing
+    "CREATE INDEX IF NOT EXISTS idx_notifications_user_created "
+    "ON notifications(user_id, created_at DESC, notification_id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_notifications_user_unread "
+    "ON notifications(user_id, created_at DESC, notification_id DESC) WHERE is_read = FALSE",
+    # FileAttachment.get_by_user keyset order
+    "CREATE INDEX IF NOT EXISTS idx_file_attachments_user_uploaded "
+    "ON file_attachments(user_id, uploaded_at DESC, attachment_id DESC)",
+]
+
+# Leading-column duplicates of the indexes above or of UNIQUE constraints;
+# they only add write cost
+REDUNDANT_INDEXES = [
+    "DROP INDEX IF EXISTS idx_tasks_user_id",
+    "DROP INDEX IF EXISTS idx_study_sessions_user_id",
+    "DROP INDEX IF EXISTS idx_study_goals_user_id",
+    "DROP INDEX IF EXISTS idx_notifications_user_id",
+    "DROP INDEX IF EXISTS idx_file_attachments_user_id",
+    "DROP INDEX IF EXISTS idx_subjects_user_id",
+    "DROP INDEX IF EXISTS idx_weekly_summaries_user_id",
+    "DROP INDEX IF EXISTS idx_study_streaks_user_id",
+]
+
+
+def run_migration():
+    """Create the composite indexes, then drop the ones they supersede"""
+    return migrations.apply(VERSION, DESCRIPTION, INDEXES + REDUNDANT_INDEXES)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
@@ -0,0 +1,49 @@
+"""
+Migration 018: daily_user_stats rollup
+Creates the per-user, per-day study rollup maintained by models.DailyStats
+and fills it from the existing sessions, progress entries and tasks
+
+    python migrate_daily_user_stats.py
+"""
+
+import logging
+import migrations
+from models import DailyStats
+
+VERSION = '018_daily_user_stats'
+DESCRIPTION = 'Daily per-user, per-subject study rollup'
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS daily_user_stats (
+        user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+        stat_date DATE NOT NULL,
+        subject_id INTEGER NOT NULL DEFAULT 0,
+        study_minutes INTEGER NOT NULL DEFAULT 0,
+        sessions INTEGER NOT NULL DEFAULT 0,
+        progress_hours DECIMAL(8,2) NOT NULL DEFAULT 0,
+        tasks_completed INTEGER NOT NULL DEFAULT 0,
+        focus_sum INTEGER NOT NULL DEFAULT 0,
+        focus_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, stat_date, subject_id)
+    )
+    """,
+    # /api/stats/live counts recently active users across everyone
+    "CREATE INDEX IF NOT EXISTS idx_daily_user_stats_date ON daily_user_stats(stat_date)",
+]
+
+
+def run_migration():
+    """Create the rollup table and backfill it"""
+    if not migrations.apply(VERSION, DESCRIPTION, STATEMENTS):
+        return False
+    DailyStats.rebuild()
+    return True
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
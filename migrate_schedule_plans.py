@@ -0,0 +1,63 @@
+"""
+Migration 024: stored schedule plans
+Creates the tables behind SmartPlanner.planned_schedule: one plan per user,
+its day entries and the log of tasks changed since the plan was repaired.
+Plans are built on the first schedule read, so nothing is backfilled.
+
+    python migrate_schedule_plans.py
+"""
+
+import logging
+import migrations
+
+VERSION = '024_schedule_plans'
+DESCRIPTION = 'Stored per-user schedule plans with incremental repair'
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS schedule_plans (
+        user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+        start_date DATE NOT NULL,
+        days_ahead INTEGER NOT NULL,
+        hours_per_day DOUBLE PRECISION NOT NULL,
+        scored_at TIMESTAMP NOT NULL,
+        items TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schedule_entries (
+        user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+        plan_date DATE NOT NULL,
+        seq INTEGER NOT NULL,
+        task_id INTEGER NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+        piece INTEGER NOT NULL,
+        hours DOUBLE PRECISION NOT NULL,
+        total_hours DOUBLE PRECISION,
+        after_deadline BOOLEAN NOT NULL DEFAULT FALSE,
+        PRIMARY KEY (user_id, plan_date, seq)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schedule_changes (
+        user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+        task_id INTEGER NOT NULL,
+        PRIMARY KEY (user_id, task_id)
+    )
+    """,
+    # Task deletes cascade to their entries
+    "CREATE INDEX IF NOT EXISTS idx_schedule_entries_task_id ON schedule_entries(task_id)",
+]
+
+
+def run_migration():
+    """Create the schedule plan tables"""
+    return migrations.apply(VERSION, DESCRIPTION, STATEMENTS)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
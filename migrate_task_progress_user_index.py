@@ -0,0 +1,31 @@
+"""
+Migration 026: index task_progress.user_id
+Deleting a user cascades to task_progress; without an index on the foreign
+key every cascade scans the whole table (reported by index_advisor.py).
+
+    python migrate_task_progress_user_index.py
+"""
+
+import logging
+import migrations
+
+VERSION = '026_task_progress_user_index'
+DESCRIPTION = 'Index the task_progress.user_id foreign key'
+
+STATEMENTS = [
+    # ON DELETE CASCADE from users otherwise scans every progress row
+    "CREATE INDEX IF NOT EXISTS idx_task_progress_user_id ON task_progress(user_id)",
+]
+
+
+def run_migration():
+    """Create the foreign key index"""
+    return migrations.apply(VERSION, DESCRIPTION, STATEMENTS)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
@@ -0,0 +1,67 @@
+"""
+Migration 019: full-text task search
+SQLite gets an FTS5 index (tasks_fts) kept in step with tasks by triggers;
+PostgreSQL gets a GIN index over the weighted title/description tsvector
+that full_text.task_match queries
+
+    python migrate_task_search.py
+"""
+
+import logging
+import migrations
+from full_text import PG_DOCUMENT
+
+VERSION = '019_task_search'
+DESCRIPTION = 'Full-text index on task titles and descriptions'
+
+SQLITE_STATEMENTS = [
+    # External-content table: the text lives in tasks, tasks_fts holds only the index
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        user_id, title, description,
+        content='tasks', content_rowid='task_id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, user_id, title, description)
+        VALUES (new.task_id, new.user_id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, user_id, title, description)
+        VALUES ('delete', old.task_id, old.user_id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF user_id, title, description ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, user_id, title, description)
+        VALUES ('delete', old.task_id, old.user_id, old.title, old.description);
+        INSERT INTO tasks_fts (rowid, user_id, title, description)
+        VALUES (new.task_id, new.user_id, new.title, new.description);
+    END
+    """,
+    # Index the tasks that already exist
+    "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_STATEMENTS = [
+    f"CREATE INDEX IF NOT EXISTS idx_tasks_search ON tasks USING GIN ({PG_DOCUMENT.format(prefix='')})",
+]
+
+
+def run_migration():
+    """Create the full-text index for this backend"""
+    return migrations.apply(VERSION, DESCRIPTION, {
+        'sqlite': SQLITE_STATEMENTS,
+        'postgresql': POSTGRES_STATEMENTS
+    })
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
@@ -0,0 +1,37 @@
+"""
+Migration 025: per-user data versions
+Creates user_data_versions, the counter SmartPlanner keys its cached
+schedule, recommendations and workload results on. Users start at version 0
+when they have no row, so nothing is backfilled.
+
+    python migrate_user_data_versions.py
+"""
+
+import logging
+import migrations
+
+VERSION = '025_user_data_versions'
+DESCRIPTION = 'Per-user data version for the planner result cache'
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS user_data_versions (
+        user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+
+def run_migration():
+    """Create the data version table"""
+    return migrations.apply(VERSION, DESCRIPTION, STATEMENTS)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if run_migration():
+        print(f"Applied {VERSION}")
+    else:
+        print(f"{VERSION} was already applied")
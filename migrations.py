@@ -0,0 +1,75 @@
+"""
+Versioned schema migrations for Smart Study Planner
+Each migration runs once per database; applied versions are recorded in
+the schema_migrations table
+"""
+
+import re
+import logging
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(100) PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_INDEX_DDL = re.compile(r'^\s*(CREATE\s+(?:UNIQUE\s+)?INDEX|DROP\s+INDEX)\s+', re.IGNORECASE)
+
+
+def applied_versions():
+    """Versions already recorded in schema_migrations"""
+    Database.execute_query(_CREATE_TABLE, fetch=False)
+    rows = Database.fetch_all("SELECT version FROM schema_migrations", row_format='tuple')
+    return {row[0] for row in rows}
+
+
+def _concurrently(statement):
+    """Rewrite CREATE/DROP INDEX to the non-blocking PostgreSQL form"""
+    return _INDEX_DDL.sub(lambda m: f"{m.group(1)} CONCURRENTLY ", statement, count=1)
+
+
+def apply(version, description, statements, concurrent_indexes=True):
+    """
+    Run statements once for this database and record the version.
+
+    statements: a list of SQL strings, or a dict of per-backend lists keyed
+    by 'postgresql' and 'sqlite'. On PostgreSQL, index DDL runs with
+    CONCURRENTLY on an autocommit connection (when concurrent_indexes is
+    set) so building an index does not block writes to a live table.
+    Returns False when the migration had already been applied.
+    """
+    if version in applied_versions():
+        logger.info(f"Migration {version} already applied")
+        return False
+
+    if isinstance(statements, dict):
+        statements = statements.get('sqlite' if Database._db_type == 'sqlite' else 'postgresql', [])
+
+    logger.info(f"Applying migration {version}: {description}")
+    if Database._db_type != 'sqlite' and concurrent_indexes:
+        with Database.get_connection() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cursor:
+                    for statement in statements:
+                        if _INDEX_DDL.match(statement):
+                            statement = _concurrently(statement)
+                        cursor.execute(statement)
+            finally:
+                conn.autocommit = False
+    else:
+        with Database.transaction():
+            for statement in statements:
+                Database.execute_query(statement, fetch=False)
+
+    Database.execute_query(
+        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+        (version, description), fetch=False
+    )
+    logger.info(f"Migration {version} applied")
+    return True
@@ -4,6 +4,11 @@ ORM-like models for database operations
 """
 
 from database import Database
+from async_database import AsyncDatabase
+from records import TaskRecord, SubjectRecord, StudySessionRecord
+from identity_map import IdentityMap
+from pagination import Keyset
+import full_text
 from datetime import datetime, date, time
 import json
 
@@ -24,7 +29,10 @@ class User:
     def get_by_id(user_id):
         """Get user by ID"""
         query = "SELECT * FROM users WHERE user_id = %s"
-        return Database.fetch_one(query, (user_id,))
+        return IdentityMap.lookup(
+            'users', user_id, 'dict',
+            lambda row_format: Database.fetch_one(query, (user_id,), prepared=True)
+        )
     
     @staticmethod
     def get_by_username(username):
@@ -55,19 +63,25 @@ class Subject:
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING subject_id, user_id, subject_name, color_code, priority, level, target_grade, current_topic, sub_topics, created_at
         """
-        return Database.fetch_one(query, (user_id, subject_name, color_code, priority, level, target_grade, current_topic, sub_topics))
+        with Database.transaction():
+            subject = Database.fetch_one(query, (user_id, subject_name, color_code, priority, level, target_grade, current_topic, sub_topics))
+            DataVersion.bump([user_id])
+        return subject
     
     @staticmethod
-    def get_by_user(user_id):
-        """Get all subjects for a user"""
+    def get_by_user(user_id, as_records=False):
+        """Get all subjects for a user (as SubjectRecords when as_records is set)"""
         query = "SELECT * FROM subjects WHERE user_id = %s ORDER BY priority DESC, subject_name"
-        return Database.fetch_all(query, (user_id,))
+        return Database.fetch_all(query, (user_id,), prepared=True, row_format=SubjectRecord if as_records else 'dict')
     
     @staticmethod
-    def get_by_id(subject_id):
+    def get_by_id(subject_id, as_records=False):
         """Get subject by ID"""
         query = "SELECT * FROM subjects WHERE subject_id = %s"
-        return Database.fetch_one(query, (subject_id,))
+        return IdentityMap.lookup(
+            'subjects', subject_id, SubjectRecord if as_records else 'dict',
+            lambda row_format: Database.fetch_one(query, (subject_id,), prepared=True, row_format=row_format)
+        )
     
     @staticmethod
     def update(subject_id, **kwargs):
@@ -82,13 +96,26 @@ class Subject:
         query = f"UPDATE subjects SET {set_clause} WHERE subject_id = %s RETURNING *"
         params = list(updates.values()) + [subject_id]
         
-        return Database.fetch_one(query, params)
+        with Database.transaction():
+            subject = Database.fetch_one(query, params)
+            if subject:
+                DataVersion.bump([subject['user_id']])
+        IdentityMap.store('subjects', subject_id, subject)
+        # Cached tasks carry the joined subject name and colour
+        IdentityMap.discard('tasks')
+        return subject
     
     @staticmethod
     def delete(subject_id):
         """Delete subject"""
-        query = "DELETE FROM subjects WHERE subject_id = %s"
-        return Database.execute_query(query, (subject_id,), fetch=False)
+        query = "DELETE FROM subjects WHERE subject_id = %s RETURNING user_id"
+        with Database.transaction():
+            deleted = Database.fetch_one(query, (subject_id,))
+            if deleted:
+                DataVersion.bump([deleted['user_id']])
+        IdentityMap.discard('subjects', subject_id)
+        IdentityMap.discard('tasks')
+        return 1 if deleted else 0
 
 class Task:
     """Task model"""
@@ -110,8 +137,11 @@ class Task:
             'scheduled_time': kwargs.get('scheduled_time'),
             'status': kwargs.get('status', 'pending'),
             'is_recurring': kwargs.get('is_recurring', False),
-            'recurrence_pattern': kwargs.get('recurrence_pattern')
+            'recurrence_pattern': kwargs.get('recurrence_pattern'),
+            'completed_at': kwargs.get('completed_at')
         }
+        if optional_fields['status'] == 'completed' and not optional_fields['completed_at']:
+            optional_fields['completed_at'] = datetime.now()
         
         for field, value in optional_fields.items():
             if value is not None:
@@ -125,10 +155,133 @@ class Task:
             RETURNING *
         """
         
-        return Database.fetch_one(query, values)
+        with Database.transaction():
+            task = Database.fetch_one(query, values)
+            Task._record_completions({}, [task])
+            SchedulePlan.mark_changed([task])
+            DataVersion.bump([user_id])
+        return task
+    
+    # Columns written by create_many; missing optional values fall back to the
+    # same defaults as Task.create (None is the column default for the rest)
+    BULK_CREATE_DEFAULTS = {
+        'subject_id': None,
+        'description': None,
+        'task_type': 'study',
+        'priority': 1,
+        'estimated_hours': 1.0,
+        'deadline': None,
+        'scheduled_date': None,
+        'scheduled_time': None,
+        'status': 'pending',
+        'is_recurring': False,
+        'recurrence_pattern': None,
+        'completed_at': None
+    }
+    
+    # Sort order of get_by_user; task_id breaks ties so pages never overlap.
+    # The deadline is compared as a timestamp: SQLite stores it as text,
+    # with either a ' ' or a 'T' separator depending on how it was written
+    USER_KEYSET = Keyset(('t.deadline::timestamp', 'ASC', 'NULLS LAST'), ('t.priority', 'DESC'), ('t.task_id', 'ASC'))
+    
+    UPDATABLE_FIELDS = [
+        'title', 'description', 'subject_id', 'task_type', 'priority',
+        'estimated_hours', 'deadline', 'scheduled_date', 'scheduled_time',
+        'status', 'completion_percentage', 'actual_hours', 'completed_at'
+    ]
+    
+    # Named column sets for callers that never read the description text;
+    # 'full' (None) selects every column. Unselected fields of a TaskRecord
+    # hold their defaults and are left out of to_dict(); a dict row simply
+    # lacks them.
+    PROJECTIONS = {
+        'full': None,
+        'summary': (
+            'task_id', 'subject_id', 'title', 'task_type', 'priority', 'estimated_hours',
+            'deadline', 'scheduled_date', 'scheduled_time', 'status', 'completion_percentage',
+            'subject_name', 'color_code'
+        ),
+        'planning': (
+            'task_id', 'user_id', 'subject_id', 'title', 'task_type', 'priority',
+            'estimated_hours', 'actual_hours', 'deadline', 'scheduled_date', 'scheduled_time',
+            'status', 'completion_percentage', 'subject_name'
+        )
+    }
+    
+    _COLUMNS = {name for name, _, _ in TaskRecord.FIELDS}
+    _SUBJECT_COLUMNS = ('subject_name', 'color_code')
+    
+    @staticmethod
+    def select_list(fields=None, required=()):
+        """
+        SELECT list for tasks t LEFT JOIN subjects s
+        fields: a PROJECTIONS name, an iterable of column names, or None for all
+        required: columns added to any projection (e.g. the sort keys)
+        """
+        if fields is None or isinstance(fields, str):
+            if fields is not None and fields not in Task.PROJECTIONS:
+                raise ValueError(f"Unknown task projection: {fields}")
+            fields = Task.PROJECTIONS.get(fields)
+            if fields is None:
+                return "t.*, s.subject_name, s.color_code"
+        
+        columns = []
+        for name in ('task_id',) + tuple(fields) + tuple(required):
+            if name not in Task._COLUMNS:
+                raise ValueError(f"Unknown task column: {name}")
+            if name not in columns:
+                columns.append(name)
+        return ', '.join(f"s.{name}" if name in Task._SUBJECT_COLUMNS else f"t.{name}" for name in columns)
     
     @staticmethod
-    def get_by_id(task_id):
+    def create_many(user_id, tasks):
+        """Create several tasks for a user in one transaction"""
+        columns = ['user_id', 'title'] + list(Task.BULK_CREATE_DEFAULTS.keys())
+        rows = []
+        for task in tasks:
+            row = [user_id, task['title']]
+            for field, default in Task.BULK_CREATE_DEFAULTS.items():
+                value = task.get(field)
+                if field == 'completed_at' and value is None and task.get('status') == 'completed':
+                    value = datetime.now()
+                row.append(default if value is None else value)
+            rows.append(row)
+        
+        with Database.transaction():
+            created = Database.bulk_insert('tasks', columns, rows, returning='*')
+            Task._record_completions({}, created)
+            SchedulePlan.mark_changed(created)
+            if created:
+                DataVersion.bump([user_id])
+        return created
+    
+    @staticmethod
+    def update_many(updates):
+        """
+        Update several tasks in one transaction
+        updates: list of dicts containing task_id and the fields to change
+        Returns the updated task rows
+        """
+        rows = []
+        for update in updates:
+            fields = Task._with_completed_at({k: v for k, v in update.items() if k in Task.UPDATABLE_FIELDS})
+            if fields:
+                fields['task_id'] = update['task_id']
+                rows.append(fields)
+        
+        with Database.transaction():
+            before = Task._status_before([row['task_id'] for row in rows if 'status' in row])
+            updated = Database.bulk_update('tasks', 'task_id', rows, returning='*')
+            Task._record_completions(before, [row for row in updated if row['task_id'] in before])
+            planning = {row['task_id'] for row in rows if not SchedulePlan.PLANNING_FIELDS.isdisjoint(row)}
+            SchedulePlan.mark_changed([row for row in updated if row['task_id'] in planning])
+            DataVersion.bump(row['user_id'] for row in updated)
+        for row in updated:
+            Task._remember_update(row['task_id'], row)
+        return updated
+    
+    @staticmethod
+    def get_by_id(task_id, as_records=False):
         """Get task by ID"""
         query = """
             SELECT t.*, s.subject_name, s.color_code
@@ -136,13 +289,40 @@ class Task:
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.task_id = %s
         """
-        return Database.fetch_one(query, (task_id,))
+        return IdentityMap.lookup(
+            'tasks', task_id, TaskRecord if as_records else 'dict',
+            lambda row_format: Database.fetch_one(query, (task_id,), prepared=True, row_format=row_format)
+        )
     
     @staticmethod
-    def get_by_user(user_id, status=None, limit=None):
-        """Get tasks for a user"""
-        query = """
-            SELECT t.*, s.subject_name, s.color_code
+    def get_by_ids(user_id, task_ids, status=None, as_records=False, fields=None):
+        """A user's tasks among task_ids, in no particular order (fields: projection, see Task.select_list)"""
+        task_ids = list(task_ids)
+        if not task_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(task_ids))
+        query = f"""
+            SELECT {Task.select_list(fields)}
+            FROM tasks t
+            LEFT JOIN subjects s ON t.subject_id = s.subject_id
+            WHERE t.user_id = %s AND t.task_id IN ({placeholders})
+        """
+        params = [user_id] + task_ids
+        if status:
+            query += " AND t.status = %s"
+            params.append(status)
+        return Database.fetch_all(query, params, row_format=TaskRecord if as_records else 'dict')
+    
+    @staticmethod
+    def get_by_user(user_id, status=None, limit=None, as_records=False, after=None, fields=None):
+        """
+        Get tasks for a user (as TaskRecords when as_records is set)
+        after: cursor from USER_KEYSET to continue a paginated listing
+        fields: projection, see Task.select_list
+        """
+        columns = Task.select_list(fields, required=('deadline', 'priority'))
+        query = f"""
+            SELECT {columns}
             FROM tasks t
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s
@@ -153,34 +333,56 @@ class Task:
             query += " AND t.status = %s"
             params.append(status)
         
-        query += " ORDER BY t.deadline ASC NULLS LAST, t.priority DESC"
+        condition, after_params = Task.USER_KEYSET.after(after)
+        if condition:
+            query += f" AND {condition}"
+            params.extend(after_params)
+        
+        query += " " + Task.USER_KEYSET.order_by()
         
         if limit:
-            query += f" LIMIT {limit}"
+            query += " LIMIT %s"
+            params.append(limit)
         
-        return Database.fetch_all(query, params)
+        return Database.fetch_all(query, params, prepared=True, row_format=TaskRecord if as_records else 'dict')
     
     @staticmethod
-    def get_by_date_range(user_id, start_date, end_date):
-        """Get tasks within a date range"""
-        query = """
-            SELECT t.*, s.subject_name, s.color_code
+    def get_by_date_range(user_id, start_date, end_date, as_records=False, fields=None):
+        """Get tasks within a date range (fields: projection, see Task.select_list)"""
+        query = f"""
+            SELECT {Task.select_list(fields)}
             FROM tasks t
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s AND t.scheduled_date BETWEEN %s AND %s
             ORDER BY t.scheduled_date, t.scheduled_time
         """
-        return Database.fetch_all(query, (user_id, start_date, end_date))
+        return Database.fetch_all(query, (user_id, start_date, end_date), row_format=TaskRecord if as_records else 'dict')
+    
+    @staticmethod
+    def search(user_id, text, limit=50, as_records=False):
+        """
+        Full-text search over a user's task titles and descriptions, best
+        match first; every word of text is matched as a prefix
+        """
+        match = full_text.task_match(text, user_id)
+        if match is None:
+            return []
+        join, params, rank = match
+        query = f"""
+            SELECT t.*, s.subject_name, s.color_code
+            FROM tasks t
+            {join}
+            LEFT JOIN subjects s ON t.subject_id = s.subject_id
+            WHERE t.user_id = %s
+            ORDER BY {rank}, t.task_id
+            LIMIT %s
+        """
+        return Database.fetch_all(query, params + [user_id, limit], row_format=TaskRecord if as_records else 'dict')
     
     @staticmethod
     def update(task_id, **kwargs):
         """Update task"""
-        allowed_fields = [
-            'title', 'description', 'subject_id', 'task_type', 'priority',
-            'estimated_hours', 'deadline', 'scheduled_date', 'scheduled_time',
-            'status', 'completion_percentage', 'actual_hours', 'completed_at'
-        ]
-        updates = {k: v for k, v in kwargs.items() if k in allowed_fields}
+        updates = Task._with_completed_at({k: v for k, v in kwargs.items() if k in Task.UPDATABLE_FIELDS})
         
         if not updates:
             return None
@@ -189,19 +391,81 @@ class Task:
         query = f"UPDATE tasks SET {set_clause} WHERE task_id = %s RETURNING *"
         params = list(updates.values()) + [task_id]
         
-        return Database.fetch_one(query, params)
+        with Database.transaction():
+            before = Task._status_before([task_id]) if 'status' in updates else None
+            task = Database.fetch_one(query, params)
+            if before is not None:
+                Task._record_completions(before, [task] if task else [])
+            if task:
+                if not SchedulePlan.PLANNING_FIELDS.isdisjoint(updates):
+                    SchedulePlan.mark_changed([task])
+                DataVersion.bump([task['user_id']])
+        Task._remember_update(task_id, task)
+        return task
+    
+    @staticmethod
+    def _with_completed_at(updates):
+        """Stamp completed_at when a task is marked completed without one"""
+        if updates.get('status') == 'completed' and not updates.get('completed_at'):
+            updates['completed_at'] = datetime.now()
+        return updates
+    
+    @staticmethod
+    def _status_before(task_ids):
+        """{task_id: row} of the status columns, read before an update changes them"""
+        if not task_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(task_ids))
+        query = f"""
+            SELECT task_id, user_id, subject_id, status, completed_at
+            FROM tasks WHERE task_id IN ({placeholders})
+        """
+        return {row['task_id']: row for row in Database.fetch_all(query, list(task_ids))}
+    
+    @staticmethod
+    def _record_completions(before, rows):
+        """Keep DailyStats.tasks_completed in step with status changes"""
+        for row in rows:
+            old = before.get(row['task_id'])
+            was_completed = old is not None and old['status'] == 'completed'
+            if was_completed and row['status'] != 'completed':
+                DailyStats.record_completion(
+                    old['user_id'], old['subject_id'], old['completed_at'] or row['updated_at'], -1
+                )
+            elif row['status'] == 'completed' and not was_completed:
+                DailyStats.record_completion(row['user_id'], row['subject_id'], row['completed_at'] or date.today())
+    
+    @staticmethod
+    def _remember_update(task_id, row):
+        """Refresh the identity map after an UPDATE ... RETURNING *"""
+        cached = IdentityMap.peek('tasks', task_id)
+        if row is not None and cached is not None and cached.get('subject_id') == row.get('subject_id'):
+            # RETURNING * lacks the joined subject columns; keep the cached ones
+            IdentityMap.merge('tasks', task_id, row)
+        else:
+            IdentityMap.discard('tasks', task_id)
     
     @staticmethod
     def delete(task_id):
         """Delete task"""
-        query = "DELETE FROM tasks WHERE task_id = %s"
-        return Database.execute_query(query, (task_id,), fetch=False)
+        query = "DELETE FROM tasks WHERE task_id = %s RETURNING user_id, subject_id, status, completed_at, updated_at"
+        with Database.transaction():
+            deleted = Database.fetch_one(query, (task_id,))
+            if deleted and deleted['status'] == 'completed':
+                DailyStats.record_completion(
+                    deleted['user_id'], deleted['subject_id'], deleted['completed_at'] or deleted['updated_at'], -1
+                )
+            if deleted:
+                SchedulePlan.mark_changed([{'task_id': task_id, 'user_id': deleted['user_id']}])
+                DataVersion.bump([deleted['user_id']])
+        IdentityMap.discard('tasks', task_id)
+        return 1 if deleted else 0
     
     @staticmethod
-    def get_overdue_tasks(user_id):
-        """Get overdue tasks"""
-        query = """
-            SELECT t.*, s.subject_name, s.color_code
+    def get_overdue_tasks(user_id, as_records=False, fields=None):
+        """Get overdue tasks (fields: projection, see Task.select_list)"""
+        query = f"""
+            SELECT {Task.select_list(fields)}
             FROM tasks t
             LEFT JOIN subjects s ON t.subject_id = s.subject_id
             WHERE t.user_id = %s 
@@ -209,7 +473,7 @@ class Task:
             AND t.deadline < NOW()
             ORDER BY t.deadline
         """
-        return Database.fetch_all(query, (user_id,))
+        return Database.fetch_all(query, (user_id,), row_format=TaskRecord if as_records else 'dict')
 
 class StudySession:
     """Study session model"""
@@ -227,13 +491,17 @@ class StudySession:
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING *
         """
-        return Database.fetch_one(query, (task_id, user_id, start_time, end_time, duration_minutes, notes, focus_score, session_type))
+        with Database.transaction():
+            session = Database.fetch_one(query, (task_id, user_id, start_time, end_time, duration_minutes, notes, focus_score, session_type))
+            DailyStats.record_session(session)
+            DataVersion.bump([user_id])
+        return session
     
     @staticmethod
-    def get_by_task(task_id):
+    def get_by_task(task_id, as_records=False):
         """Get all sessions for a task"""
         query = "SELECT * FROM study_sessions WHERE task_id = %s ORDER BY start_time DESC"
-        return Database.fetch_all(query, (task_id,))
+        return Database.fetch_all(query, (task_id,), row_format=StudySessionRecord if as_records else 'dict')
     
     @staticmethod
     def create_pomodoro_session(user_id, session_type, duration_minutes, completed_at, notes=None):
@@ -243,24 +511,41 @@ class StudySession:
             VALUES (%s, %s, %s, %s, %s, %s)
             RETURNING *
         """
-        return Database.fetch_one(query, (None, user_id, completed_at, duration_minutes, session_type, notes))
+        with Database.transaction():
+            session = Database.fetch_one(query, (None, user_id, completed_at, duration_minutes, session_type, notes))
+            DailyStats.record_session(session)
+            DataVersion.bump([user_id])
+        return session
     
     @staticmethod
-    def get_by_user_and_date_range(user_id, start_date, end_date):
+    def get_by_user_and_date_range(user_id, start_date, end_date, as_records=False):
         """Get sessions for a user within a date range"""
         query = """
             SELECT * FROM study_sessions 
             WHERE user_id = %s AND start_time >= %s AND start_time <= %s 
             ORDER BY start_time DESC
         """
-        return Database.fetch_all(query, (user_id, start_date, end_date))
+        return Database.fetch_all(query, (user_id, start_date, end_date), row_format=StudySessionRecord if as_records else 'dict')
+    
+    @staticmethod
+    def iter_by_user(user_id, batch_size=None, as_records=False):
+        """Stream every session for a user (exports, fleet-wide jobs)"""
+        query = """
+            SELECT * FROM study_sessions
+            WHERE user_id = %s
+            ORDER BY start_time
+        """
+        return Database.iter_query(
+            query, (user_id,), batch_size=batch_size,
+            row_format=StudySessionRecord if as_records else 'dict'
+        )
     
     @staticmethod
-    def get_by_user_and_date(user_id, date):
+    def get_by_user_and_date(user_id, date, as_records=False):
         """Get sessions for a user on a specific date"""
         start_of_day = datetime.combine(date, time.min)
         end_of_day = datetime.combine(date, time.max)
-        return StudySession.get_by_user_and_date_range(user_id, start_of_day, end_of_day)
+        return StudySession.get_by_user_and_date_range(user_id, start_of_day, end_of_day, as_records)
 
 class TaskProgress:
     """Task progress model"""
@@ -273,7 +558,10 @@ class TaskProgress:
             VALUES (%s, %s, %s, %s, %s, %s)
             RETURNING *
         """
-        return Database.fetch_one(query, (task_id, user_id, progress_date, hours_spent, completion_delta, notes))
+        with Database.transaction():
+            entry = Database.fetch_one(query, (task_id, user_id, progress_date, hours_spent, completion_delta, notes))
+            DailyStats.record_progress(entry)
+        return entry
     
     @staticmethod
     def get_by_task(task_id):
@@ -281,6 +569,314 @@ class TaskProgress:
         query = "SELECT * FROM task_progress WHERE task_id = %s ORDER BY progress_date DESC"
         return Database.fetch_all(query, (task_id,))
 
+class DailyStats:
+    """
+    Per-user, per-day, per-subject study rollup (daily_user_stats).
+
+    Updated in the same transaction as the session, progress and task
+    writes it summarises, so analytics read a handful of rollup rows instead
+    of re-aggregating raw sessions. subject_id 0 holds work with no subject.
+    Rows attribute work to the subject a task had when it was written;
+    backfill_daily_stats.py rebuilds them from the raw tables.
+    """
+    
+    UPSERT_QUERY = """
+        INSERT INTO daily_user_stats (user_id, stat_date, subject_id, study_minutes, sessions,
+                                      progress_hours, tasks_completed, focus_sum, focus_count)
+        SELECT %s, %s, COALESCE(%s, (SELECT subject_id FROM tasks WHERE task_id = %s), 0),
+               %s, %s, %s, %s, %s, %s
+        WHERE 1 = 1
+        ON CONFLICT (user_id, stat_date, subject_id) DO UPDATE SET
+            study_minutes = daily_user_stats.study_minutes + EXCLUDED.study_minutes,
+            sessions = daily_user_stats.sessions + EXCLUDED.sessions,
+            progress_hours = daily_user_stats.progress_hours + EXCLUDED.progress_hours,
+            tasks_completed = daily_user_stats.tasks_completed + EXCLUDED.tasks_completed,
+            focus_sum = daily_user_stats.focus_sum + EXCLUDED.focus_sum,
+            focus_count = daily_user_stats.focus_count + EXCLUDED.focus_count
+    """
+    
+    # Range totals for one user; params (user_id, first_day, last_day)
+    TOTALS_QUERY = """
+        SELECT COALESCE(SUM(sessions), 0) AS sessions,
+               COALESCE(SUM(study_minutes), 0) / 60.0 AS hours,
+               COALESCE(SUM(progress_hours), 0) AS progress_hours,
+               COALESCE(SUM(tasks_completed), 0) AS tasks_completed,
+               COALESCE(SUM(focus_sum), 0) AS focus_sum,
+               COALESCE(SUM(focus_count), 0) AS focus_count
+        FROM daily_user_stats
+        WHERE user_id = %s AND stat_date BETWEEN %s AND %s
+    """
+    
+    # All-time study hours per subject; params (user_id,)
+    SUBJECT_HOURS_QUERY = """
+        SELECT subject_id, COALESCE(SUM(study_minutes), 0) / 60.0 AS hours
+        FROM daily_user_stats
+        WHERE user_id = %s
+        GROUP BY subject_id
+    """
+    
+    @staticmethod
+    def _stat_date(value):
+        """Calendar day of a date, datetime or ISO string (as stored by the client)"""
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return date.fromisoformat(str(value)[:10])
+    
+    @staticmethod
+    def _add(user_id, day, task_id=None, subject_id=None, study_minutes=0, sessions=0,
+             progress_hours=0, tasks_completed=0, focus_sum=0, focus_count=0):
+        Database.execute_query(DailyStats.UPSERT_QUERY, (
+            user_id, DailyStats._stat_date(day), subject_id, task_id,
+            study_minutes, sessions, progress_hours, tasks_completed, focus_sum, focus_count
+        ), fetch=False)
+    
+    @staticmethod
+    def record_session(session):
+        """Add a study_sessions row (as returned by INSERT ... RETURNING *)"""
+        focus_score = session.get('focus_score')
+        DailyStats._add(
+            session['user_id'], session['start_time'], task_id=session.get('task_id'),
+            study_minutes=session.get('duration_minutes') or 0, sessions=1,
+            focus_sum=focus_score or 0, focus_count=0 if focus_score is None else 1
+        )
+    
+    @staticmethod
+    def record_progress(entry):
+        """Add a task_progress row"""
+        DailyStats._add(
+            entry['user_id'], entry['progress_date'], task_id=entry['task_id'],
+            progress_hours=float(entry.get('hours_spent') or 0)
+        )
+    
+    @staticmethod
+    def record_completion(user_id, subject_id, completed_at, delta=1):
+        """Count a task completion (delta=-1 when a completed task is reopened or deleted)"""
+        DailyStats._add(user_id, completed_at, subject_id=subject_id or 0, tasks_completed=delta)
+    
+    @staticmethod
+    def totals(user_id, first_day, last_day):
+        """Summed stats for first_day through last_day"""
+        return Database.fetch_one(DailyStats.TOTALS_QUERY, (user_id, first_day, last_day))
+    
+    @staticmethod
+    def daily(user_id, first_day, last_day):
+        """One row per day with activity, summed over subjects"""
+        query = """
+            SELECT stat_date, SUM(sessions) AS sessions, SUM(study_minutes) / 60.0 AS hours,
+                   SUM(progress_hours) AS progress_hours, SUM(tasks_completed) AS tasks_completed,
+                   SUM(focus_sum) AS focus_sum, SUM(focus_count) AS focus_count
+            FROM daily_user_stats
+            WHERE user_id = %s AND stat_date BETWEEN %s AND %s
+            GROUP BY stat_date
+            ORDER BY stat_date
+        """
+        return Database.fetch_all(query, (user_id, first_day, last_day))
+    
+    @staticmethod
+    def by_subject(user_id, first_day, last_day):
+        """Study hours per existing subject for first_day through last_day"""
+        query = """
+            SELECT d.subject_id, s.subject_name, s.color_code, SUM(d.study_minutes) / 60.0 AS hours
+            FROM daily_user_stats d
+            JOIN subjects s ON d.subject_id = s.subject_id
+            WHERE d.user_id = %s AND d.stat_date BETWEEN %s AND %s
+            GROUP BY d.subject_id, s.subject_name, s.color_code
+            HAVING SUM(d.study_minutes) > 0
+            ORDER BY hours DESC
+        """
+        return Database.fetch_all(query, (user_id, first_day, last_day))
+    
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute the rollup from the raw tables (one user, or everyone when user_id is None)"""
+        query = """
+            INSERT INTO daily_user_stats (user_id, stat_date, subject_id, study_minutes, sessions,
+                                          progress_hours, tasks_completed, focus_sum, focus_count)
+            SELECT user_id, stat_date, subject_id, SUM(study_minutes), SUM(sessions),
+                   SUM(progress_hours), SUM(tasks_completed), SUM(focus_sum), SUM(focus_count)
+            FROM (
+                SELECT ss.user_id, ss.start_time::date AS stat_date, COALESCE(t.subject_id, 0) AS subject_id,
+                       COALESCE(ss.duration_minutes, 0) AS study_minutes, 1 AS sessions,
+                       0 AS progress_hours, 0 AS tasks_completed,
+                       COALESCE(ss.focus_score, 0) AS focus_sum,
+                       CASE WHEN ss.focus_score IS NULL THEN 0 ELSE 1 END AS focus_count
+                FROM study_sessions ss
+                LEFT JOIN tasks t ON ss.task_id = t.task_id
+                WHERE (%s IS NULL OR ss.user_id = %s)
+                UNION ALL
+                SELECT tp.user_id, tp.progress_date, COALESCE(t.subject_id, 0),
+                       0, 0, COALESCE(tp.hours_spent, 0), 0, 0, 0
+                FROM task_progress tp
+                LEFT JOIN tasks t ON tp.task_id = t.task_id
+                WHERE (%s IS NULL OR tp.user_id = %s)
+                UNION ALL
+                SELECT t.user_id, COALESCE(t.completed_at::date, t.updated_at::date), COALESCE(t.subject_id, 0),
+                       0, 0, 0, 1, 0, 0
+                FROM tasks t
+                WHERE t.status = 'completed' AND (%s IS NULL OR t.user_id = %s)
+            ) facts
+            GROUP BY user_id, stat_date, subject_id
+        """
+        with Database.transaction():
+            if user_id is None:
+                Database.execute_query("DELETE FROM daily_user_stats", fetch=False)
+            else:
+                Database.execute_query("DELETE FROM daily_user_stats WHERE user_id = %s", (user_id,), fetch=False)
+            Database.execute_query(query, (user_id,) * 6, fetch=False)
+
+class SchedulePlan:
+    """
+    Stored greedy schedule per user (schedule_plans, schedule_entries).
+
+    The plan keeps the ranked tasks it was packed from. Task writes that can
+    move a task in the plan log it in schedule_changes, and
+    SmartPlanner.planned_schedule repairs the plan from that log on the next
+    read, rewriting only the days whose entries changed; a read with nothing
+    logged writes nothing.
+    verify_schedules.py compares stored plans with a full replan.
+    """
+    
+    # Task columns that change a task's rank or size in the plan
+    PLANNING_FIELDS = frozenset((
+        'status', 'priority', 'deadline', 'estimated_hours', 'actual_hours',
+        'completion_percentage', 'task_type'
+    ))
+    
+    ENTRY_COLUMNS = ['user_id', 'plan_date', 'seq', 'task_id', 'piece', 'hours', 'total_hours', 'after_deadline']
+    
+    # Logs a change only for users that have a plan; params (task_id, user_id)
+    MARK_QUERY = """
+        INSERT INTO schedule_changes (user_id, task_id)
+        SELECT user_id, %s FROM schedule_plans WHERE user_id = %s
+        ON CONFLICT (user_id, task_id) DO NOTHING
+    """
+    
+    @staticmethod
+    def get(user_id):
+        """The user's plan with items decoded, or None"""
+        plan = Database.fetch_one("SELECT * FROM schedule_plans WHERE user_id = %s", (user_id,))
+        if plan is not None:
+            plan['items'] = json.loads(plan['items'])
+        return plan
+    
+    @staticmethod
+    def save(user_id, start_date, days_ahead, hours_per_day, scored_at, items):
+        """Create or replace the plan header; items are [task_id, hours, latest_day, score] in rank order"""
+        query = """
+            INSERT INTO schedule_plans (user_id, start_date, days_ahead, hours_per_day, scored_at, items)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (user_id) DO UPDATE SET
+                start_date = EXCLUDED.start_date,
+                days_ahead = EXCLUDED.days_ahead,
+                hours_per_day = EXCLUDED.hours_per_day,
+                scored_at = EXCLUDED.scored_at,
+                items = EXCLUDED.items,
+                updated_at = CURRENT_TIMESTAMP
+        """
+        Database.execute_query(query, (
+            user_id, start_date, days_ahead, hours_per_day, scored_at, json.dumps(items)
+        ), fetch=False)
+    
+    @staticmethod
+    def entries(user_id):
+        """Stored entries in day order, with the task columns the schedule shows"""
+        query = """
+            SELECT e.plan_date, e.seq, e.task_id, e.piece, e.hours, e.total_hours, e.after_deadline,
+                   t.title, s.subject_name, t.priority, t.deadline
+            FROM schedule_entries e
+            JOIN tasks t ON e.task_id = t.task_id
+            LEFT JOIN subjects s ON t.subject_id = s.subject_id
+            WHERE e.user_id = %s
+            ORDER BY e.plan_date, e.seq
+        """
+        return Database.fetch_all(query, (user_id,))
+    
+    @staticmethod
+    def replace_days(user_id, days, rows):
+        """
+        Replace the entries on days (every day when days is None) with rows,
+        tuples in ENTRY_COLUMNS order
+        """
+        if days is None:
+            Database.execute_query("DELETE FROM schedule_entries WHERE user_id = %s", (user_id,), fetch=False)
+        elif days:
+            days = list(days)
+            placeholders = ', '.join(['%s'] * len(days))
+            query = f"DELETE FROM schedule_entries WHERE user_id = %s AND plan_date IN ({placeholders})"
+            Database.execute_query(query, [user_id] + days, fetch=False)
+        Database.bulk_insert('schedule_entries', SchedulePlan.ENTRY_COLUMNS, rows)
+    
+    @staticmethod
+    def mark_changed(tasks):
+        """Log task rows (task_id, user_id) for repair; a no-op for users without a plan"""
+        params = [(task['task_id'], task['user_id']) for task in tasks if task]
+        if params:
+            Database.execute_many(SchedulePlan.MARK_QUERY, params)
+    
+    @staticmethod
+    def has_changes(user_id):
+        """Whether task changes are waiting to be repaired into the plan"""
+        query = "SELECT 1 FROM schedule_changes WHERE user_id = %s LIMIT 1"
+        return Database.fetch_one(query, (user_id,)) is not None
+    
+    @staticmethod
+    def lock(user_id):
+        """
+        Lock the user's plan row until the transaction ends. Without a plan
+        there is nothing to lock; concurrent first saves serialize on the
+        primary key, and replace_days(None) then rewrites every day.
+        """
+        query = "UPDATE schedule_plans SET updated_at = CURRENT_TIMESTAMP WHERE user_id = %s"
+        Database.execute_query(query, (user_id,), fetch=False)
+    
+    @staticmethod
+    def take_changes(user_id):
+        """Task ids logged since the last repair (the log is cleared)"""
+        query = "DELETE FROM schedule_changes WHERE user_id = %s RETURNING task_id"
+        return {row['task_id'] for row in Database.fetch_all(query, (user_id,))}
+
+
+class DataVersion:
+    """
+    Per-user data version (user_data_versions).
+
+    Every Task, Subject and StudySession write bumps its user's version in
+    the same transaction, so the version moves exactly when the data does.
+    SmartPlanner keys its cached results on it; a user without a row is at
+    version 0.
+    """
+    
+    BUMP_QUERY = """
+        INSERT INTO user_data_versions (user_id, version)
+        VALUES (%s, 1)
+        ON CONFLICT (user_id) DO UPDATE SET
+            version = user_data_versions.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """
+    
+    @staticmethod
+    def get(user_id):
+        """The user's current data version"""
+        query = "SELECT version FROM user_data_versions WHERE user_id = %s"
+        row = IdentityMap.lookup(
+            'user_data_versions', user_id, 'dict',
+            lambda row_format: Database.fetch_one(query, (user_id,), prepared=True)
+        )
+        return row['version'] if row else 0
+    
+    @staticmethod
+    def bump(user_ids):
+        """Advance the version of each user (ids in sorted order, so concurrent bumps never deadlock)"""
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if not user_ids:
+            return
+        Database.execute_many(DataVersion.BUMP_QUERY, [(user_id,) for user_id in user_ids])
+        for user_id in user_ids:
+            IdentityMap.discard('user_data_versions', user_id)
+
+
 class WeeklySummary:
     """Weekly summary model"""
     
@@ -363,7 +959,10 @@ class StudyGoal:
     def get_by_id(goal_id):
         """Get goal by ID"""
         query = "SELECT * FROM study_goals WHERE goal_id = %s"
-        return Database.fetch_one(query, (goal_id,))
+        return IdentityMap.lookup(
+            'study_goals', goal_id, 'dict',
+            lambda row_format: Database.fetch_one(query, (goal_id,))
+        )
 
     @staticmethod
     def update_progress(goal_id, current_value):
@@ -374,7 +973,9 @@ class StudyGoal:
             WHERE goal_id = %s
             RETURNING *
         """
-        return Database.fetch_one(query, (current_value, goal_id))
+        goal = Database.fetch_one(query, (current_value, goal_id))
+        IdentityMap.store('study_goals', goal_id, goal)
+        return goal
 
     @staticmethod
     def update_status(goal_id, status):
@@ -385,18 +986,46 @@ class StudyGoal:
             WHERE goal_id = %s
             RETURNING *
         """
-        return Database.fetch_one(query, (status, goal_id))
+        goal = Database.fetch_one(query, (status, goal_id))
+        IdentityMap.store('study_goals', goal_id, goal)
+        return goal
 
     @staticmethod
     def delete(goal_id):
         """Delete a goal"""
         query = "DELETE FROM study_goals WHERE goal_id = %s"
         Database.execute_query(query, (goal_id,))
+        IdentityMap.discard('study_goals', goal_id)
 
 
 class StudyStreak:
     """Study Streaks model"""
 
+    CURRENT_STREAK_QUERY = """
+        SELECT COUNT(*) as streak_days
+        FROM (
+            SELECT streak_date,
+                   streak_date - ROW_NUMBER() OVER (ORDER BY streak_date) * INTERVAL '1 day' as grp
+            FROM study_streaks
+            WHERE user_id = %s AND study_hours > 0
+            ORDER BY streak_date DESC
+        ) t
+        GROUP BY grp
+        ORDER BY MIN(streak_date) DESC
+        LIMIT 1
+    """
+
+    STREAK_STATS_QUERY = """
+        SELECT
+            COUNT(*) as total_study_days,
+            SUM(study_hours) as total_hours,
+            AVG(study_hours) as avg_daily_hours,
+            MAX(study_hours) as max_daily_hours,
+            SUM(tasks_completed) as total_tasks_completed
+        FROM study_streaks
+        WHERE user_id = %s AND study_hours > 0
+    """
+
     @staticmethod
     def create_or_update(user_id, streak_date, study_hours=0, tasks_completed=0):
         """Create or update a study streak for a date"""
@@ -425,36 +1054,13 @@ class StudyStreak:
     @staticmethod
     def get_current_streak(user_id):
         """Calculate current study streak"""
-        query = """
-            SELECT COUNT(*) as streak_days
-            FROM (
-                SELECT streak_date,
-                       streak_date - ROW_NUMBER() OVER (ORDER BY streak_date) * INTERVAL '1 day' as grp
-                FROM study_streaks
-                WHERE user_id = %s AND study_hours > 0
-                ORDER BY streak_date DESC
-            ) t
-            GROUP BY grp
-            ORDER BY MIN(streak_date) DESC
-            LIMIT 1
-        """
-        result = Database.fetch_one(query, (user_id,))
+        result = Database.fetch_one(StudyStreak.CURRENT_STREAK_QUERY, (user_id,))
         return result['streak_days'] if result else 0
 
     @staticmethod
     def get_streak_stats(user_id):
         """Get comprehensive streak statistics"""
-        query = """
-            SELECT
-                COUNT(*) as total_study_days,
-                SUM(study_hours) as total_hours,
-                AVG(study_hours) as avg_daily_hours,
-                MAX(study_hours) as max_daily_hours,
-                SUM(tasks_completed) as total_tasks_completed
-            FROM study_streaks
-            WHERE user_id = %s AND study_hours > 0
-        """
-        return Database.fetch_one(query, (user_id,))
+        return Database.fetch_one(StudyStreak.STREAK_STATS_QUERY, (user_id,))
 
 
 class Notification:
@@ -470,24 +1076,22 @@ class Notification:
         """
         return Database.fetch_one(query, (user_id, title, message, notification_type, scheduled_for))
 
+    KEYSET = Keyset(('created_at', 'DESC'), ('notification_id', 'DESC'))
+
     @staticmethod
-    def get_by_user(user_id, unread_only=False, limit=20):
-        """Get notifications for a user"""
+    def get_by_user(user_id, unread_only=False, limit=20, after=None):
+        """Get notifications for a user, newest first (after: cursor from KEYSET)"""
+        query = "SELECT * FROM notifications WHERE user_id = %s"
+        params = [user_id]
         if unread_only:
-            query = """
-                SELECT * FROM notifications
-                WHERE user_id = %s AND is_read = FALSE
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-        else:
-            query = """
-                SELECT * FROM notifications
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-        return Database.fetch_all(query, (user_id, limit))
+            query += " AND is_read = FALSE"
+        condition, after_params = Notification.KEYSET.after(after)
+        if condition:
+            query += f" AND {condition}"
+            params.extend(after_params)
+        query += f" {Notification.KEYSET.order_by()} LIMIT %s"
+        params.append(limit)
+        return Database.fetch_all(query, params)
 
     @staticmethod
     def mark_as_read(notification_id):
@@ -535,61 +1139,93 @@ class FileAttachment:
     def get_by_id(attachment_id):
         """Get attachment by ID"""
         query = "SELECT * FROM file_attachments WHERE attachment_id = %s"
-        return Database.fetch_one(query, (attachment_id,))
+        return IdentityMap.lookup(
+            'file_attachments', attachment_id, 'dict',
+            lambda row_format: Database.fetch_one(query, (attachment_id,))
+        )
 
     @staticmethod
     def delete(attachment_id):
         """Delete a file attachment"""
         query = "DELETE FROM file_attachments WHERE attachment_id = %s"
         Database.execute_query(query, (attachment_id,))
+        IdentityMap.discard('file_attachments', attachment_id)
+
+    KEYSET = Keyset(('uploaded_at', 'DESC'), ('attachment_id', 'DESC'))
 
     @staticmethod
-    def get_by_user(user_id):
-        """Get all attachments for a user"""
-        query = """
-            SELECT * FROM file_attachments
-            WHERE user_id = %s
-            ORDER BY uploaded_at DESC
-        """
-        return Database.fetch_all(query, (user_id,))
+    def get_by_user(user_id, limit=None, after=None):
+        """Get attachments for a user, newest first (after: cursor from KEYSET)"""
+        query = "SELECT * FROM file_attachments WHERE user_id = %s"
+        params = [user_id]
+        condition, after_params = FileAttachment.KEYSET.after(after)
+        if condition:
+            query += f" AND {condition}"
+            params.extend(after_params)
+        query += " " + FileAttachment.KEYSET.order_by()
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        return Database.fetch_all(query, params)
 
 
 class ChatMessage:
     """Chat Messages model for AI agent conversations"""
 
+    CREATE_QUERY = """
+        INSERT INTO chat_messages (user_id, role, content)
+        VALUES (%s, %s, %s)
+        RETURNING message_id, user_id, role, content, created_at
+    """
+
+    RECENT_QUERY = """
+        SELECT * FROM chat_messages
+        WHERE user_id = %s
+        ORDER BY created_at DESC
+        LIMIT %s
+    """
+
+    # History pages walk backwards from the newest message
+    KEYSET = Keyset(('created_at', 'DESC'), ('message_id', 'DESC'))
+
     @staticmethod
     def create(user_id, role, content):
         """Create a new chat message"""
-        query = """
-            INSERT INTO chat_messages (user_id, role, content)
-            VALUES (%s, %s, %s)
-            RETURNING message_id, user_id, role, content, created_at
-        """
-        return Database.fetch_one(query, (user_id, role, content))
+        return Database.fetch_one(ChatMessage.CREATE_QUERY, (user_id, role, content))
 
     @staticmethod
-    def get_by_user(user_id, limit=50):
-        """Get chat history for a user"""
-        query = """
-            SELECT * FROM chat_messages
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s
+    async def create_async(user_id, role, content):
+        """Async variant of create()"""
+        return await AsyncDatabase.fetch_one(ChatMessage.CREATE_QUERY, (user_id, role, content))
+
+    @staticmethod
+    def get_by_user(user_id, limit=50, before=None):
         """
-        messages = Database.fetch_all(query, (user_id, limit))
+        Get chat history for a user, in chronological order
+        before: cursor from KEYSET to load the messages preceding an earlier page
+        """
+        query = "SELECT * FROM chat_messages WHERE user_id = %s"
+        params = [user_id]
+        condition, after_params = ChatMessage.KEYSET.after(before)
+        if condition:
+            query += f" AND {condition}"
+            params.extend(after_params)
+        query += f" {ChatMessage.KEYSET.order_by()} LIMIT %s"
+        params.append(limit)
+        messages = Database.fetch_all(query, params)
         # Reverse to get chronological order
         return list(reversed(messages)) if messages else []
 
     @staticmethod
     def get_recent(user_id, limit=10):
         """Get recent chat messages for context"""
-        query = """
-            SELECT * FROM chat_messages
-            WHERE user_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s
-        """
-        messages = Database.fetch_all(query, (user_id, limit))
+        messages = Database.fetch_all(ChatMessage.RECENT_QUERY, (user_id, limit), prepared=True)
+        return list(reversed(messages)) if messages else []
+
+    @staticmethod
+    async def get_recent_async(user_id, limit=10):
+        """Async variant of get_recent()"""
+        messages = await AsyncDatabase.fetch_all(ChatMessage.RECENT_QUERY, (user_id, limit))
         return list(reversed(messages)) if messages else []
 
     @staticmethod
@@ -603,7 +1239,7 @@ class ChatMessage:
         """Delete messages older than specified days"""
         query = """
             DELETE FROM chat_messages
-            WHERE user_id = %s AND created_at < NOW() - INTERVAL '%s days'
+            WHERE user_id = %s AND created_at < NOW() - %s * INTERVAL '1 day'
         """
         Database.execute_query(query, (user_id, days))
 
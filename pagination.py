@@ -0,0 +1,136 @@
+"""
+Keyset pagination for Smart Study Planner
+List queries resume after the last row of the previous page instead of
+using OFFSET, so every page costs the same however deep it is
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise InvalidCursorError("Malformed cursor value")
+    return value
+
+
+class Keyset:
+    """
+    Sort order for a paginated query plus the matching "after this row" filter.
+
+    ``order`` lists (column, direction) pairs, optionally with a third
+    'NULLS LAST' flag for nullable ascending columns. The last column must
+    be unique (normally the primary key) so every row has exactly one
+    position. Rows are read back by the column's bare name, so ``t.task_id``
+    is looked up as ``row['task_id']``. A column may carry a cast
+    (``t.deadline::timestamp``); cursor values are cast the same way.
+    """
+
+    def __init__(self, *order):
+        self.order = []
+        for column in order:
+            expr, direction = column[0], column[1].upper()
+            nulls_last = len(column) > 2 and column[2].upper() == 'NULLS LAST'
+            name, _, cast = expr.partition('::')
+            self.order.append((expr, direction, nulls_last, name.rsplit('.', 1)[-1], '%s::' + cast if cast else '%s'))
+
+    def order_by(self):
+        """ORDER BY clause for this keyset"""
+        terms = []
+        for expr, direction, nulls_last, _, _ in self.order:
+            terms.append(f"{expr} {direction}{' NULLS LAST' if nulls_last else ''}")
+        return "ORDER BY " + ", ".join(terms)
+
+    def after(self, cursor):
+        """
+        WHERE condition (without the leading AND) and params selecting rows
+        that sort after the cursor; ('', []) when there is no cursor
+        """
+        if not cursor:
+            return '', []
+        values = decode_cursor(cursor)
+        if len(values) != len(self.order):
+            raise InvalidCursorError("Cursor does not match this listing")
+
+        # (a, b, c) after (x, y, z) expands to
+        # a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+        condition, params = None, []
+        for (expr, direction, nulls_last, _, placeholder), value in reversed(list(zip(self.order, values))):
+            greater, greater_params = self._beyond(expr, direction, nulls_last, placeholder, value)
+            if condition is None:
+                condition, params = greater, greater_params
+                continue
+            equal, equal_params = (f"{expr} IS NULL", []) if value is None else (f"{expr} = {placeholder}", [value])
+            condition = f"({greater} OR ({equal} AND {condition}))"
+            params = greater_params + equal_params + params
+        return condition, params
+
+    @staticmethod
+    def _beyond(expr, direction, nulls_last, placeholder, value):
+        """Condition for rows strictly past value in this column's order"""
+        if value is None:
+            # Only NULLS LAST columns hold NULLs, and nothing sorts after them
+            return "1 = 0", []
+        op = '<' if direction == 'DESC' else '>'
+        if nulls_last:
+            return f"({expr} {op} {placeholder} OR {expr} IS NULL)", [value]
+        return f"{expr} {op} {placeholder}", [value]
+
+    def cursor_for(self, row):
+        """Opaque cursor pointing just after row"""
+        return encode_cursor([row[key] for _, _, _, key, _ in self.order])
+
+    def page(self, rows, limit):
+        """
+        Split the result of a ``limit + 1`` fetch into one page and the
+        cursor for the next page (None on the last page)
+        """
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.cursor_for(rows[-1])
+
+
+def encode_cursor(values):
+    """Encode sort-key values as an opaque URL-safe token"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a token produced by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise InvalidCursorError("Invalid cursor")
+    return [_decode_value(value) for value in values]
+
+
+def page_size(requested, default=DEFAULT_PAGE_SIZE):
+    """Clamp a client-supplied page size to 1..MAX_PAGE_SIZE"""
+    if not requested or requested < 1:
+        return default
+    return min(requested, MAX_PAGE_SIZE)
@@ -0,0 +1,107 @@
+"""
+In-process cache for planner results
+Keeps a bounded LRU of SmartPlanner outputs per user, valid only for the
+user's current data version (see models.DataVersion)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+
+def _copy(value):
+    """Copy the dicts and lists of a result; row values and records are immutable and shared"""
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_copy(item) for item in value]
+    return value
+
+
+class _Entry:
+    """One cached result and what it was computed against"""
+
+    __slots__ = ('version', 'day', 'expires', 'value')
+
+    def __init__(self, version, day, expires, value):
+        self.version = version
+        self.day = day
+        self.expires = expires
+        self.value = value
+
+
+class PlannerCache:
+    """
+    LRU cache of planner results keyed by (user, call, arguments).
+
+    An entry is served only while the user's data version is the one it was
+    computed at, the local date has not changed and it is younger than
+    ``ttl`` seconds (results also depend on the clock: overdue tasks,
+    priority scores). The least recently used entry is dropped once
+    ``max_size`` is exceeded; a ``max_size`` of 0 disables caching.
+    Callers get their own dicts and lists, so they can never edit a cached
+    result.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max(0, int(max_size))
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get_or_compute(self, user_id, version, key, compute):
+        """Return the cached result of key for user_id at version, calling compute() on a miss"""
+        if not self.max_size:
+            return compute()
+
+        key = (user_id,) + tuple(key)
+        today = date.today()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.version == version and entry.day == today and entry.expires > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return _copy(entry.value)
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+
+        # Computed outside the lock; a concurrent miss on the same key just stores twice
+        value = compute()
+        with self._lock:
+            self._entries[key] = _Entry(version, today, now + self.ttl, _copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for cached planner results"""
+        total = self._hits + self._misses
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            'enabled': self.max_size > 0,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / total, 4) if total else 0.0,
+            'evictions': self._evictions,
+            'expirations': self._expirations,
+            'entries': entries,
+            'max_size': self.max_size,
+            'ttl': self.ttl
+        }
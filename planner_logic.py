@@ -3,8 +3,15 @@ Smart Planner Logic
 Intelligent task scheduling and planning algorithms
 """
 
-from datetime import datetime, date, timedelta
-from models import Task, Subject
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from database import Database
+from db_config import AppConfig
+from models import Task, Subject, SchedulePlan, DataVersion
+from planner_cache import PlannerCache
+from records import TaskRecord
+import priority_scoring
+import schedule_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,125 +19,328 @@ logger = logging.getLogger(__name__)
 class SmartPlanner:
     """Smart planning and scheduling logic"""
     
+    # 'optimal' runs schedule_engine.pack_optimal within a time budget and
+    # keeps the greedy plan if it runs out of time or does no better
+    SCHEDULE_MODES = ('greedy', 'optimal')
+    DEFAULT_TIME_BUDGET_MS = 200
+    MAX_TIME_BUDGET_MS = 2000
+    
+    # The greedy schedule is stored (SchedulePlan) only for the default
+    # parameters the dashboard asks for; other calls are planned in memory
+    PLAN_HOURS_PER_DAY = 4.0
+    PLAN_DAYS_AHEAD = 7
+    
+    # suggest_schedule, get_daily_recommendations and analyze_workload results,
+    # reused until the user's data version moves (see DataVersion)
+    _cache = PlannerCache(AppConfig.PLANNER_CACHE_SIZE, AppConfig.PLANNER_CACHE_TTL)
+    
     @staticmethod
     def calculate_priority_score(task):
         """
         Calculate a priority score for task scheduling
         Considers: deadline urgency, task priority, estimated hours
         """
-        score = 0
-        
-        # Base priority (1-5)
-        score += task.get('priority', 1) * 20
-        
-        # Deadline urgency
-        if task.get('deadline'):
-            deadline = task['deadline']
-            if isinstance(deadline, str):
-                deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
-            
-            days_until_deadline = (deadline - datetime.now()).days
-            
-            if days_until_deadline < 0:
-                score += 100  # Overdue - highest priority
-            elif days_until_deadline == 0:
-                score += 80  # Due today
-            elif days_until_deadline == 1:
-                score += 60  # Due tomorrow
-            elif days_until_deadline <= 3:
-                score += 40  # Due within 3 days
-            elif days_until_deadline <= 7:
-                score += 20  # Due within a week
-            else:
-                score += 10  # Due later
-        
-        # Task type importance
-        task_type_weights = {
-            'exam': 30,
-            'assignment': 25,
-            'revision': 15,
-            'study': 10
-        }
-        score += task_type_weights.get(task.get('task_type', 'study'), 10)
-        
-        # Completion percentage (prioritize incomplete tasks)
-        completion = task.get('completion_percentage', 0)
-        if completion < 25:
-            score += 15
-        elif completion < 50:
-            score += 10
-        elif completion < 75:
-            score += 5
-        
-        return score
+        return priority_scoring.score_task(task)
+    
+    @staticmethod
+    def calculate_priority_scores(tasks, now=None):
+        """
+        Priority scores for many tasks in one pass, in order
+        Same scores as calculate_priority_score (see priority_scoring)
+        """
+        return priority_scoring.score_tasks(tasks, now=now)
     
     @staticmethod
-    def suggest_schedule(user_id, available_hours_per_day=4, days_ahead=7):
+    def suggest_schedule(user_id, available_hours_per_day=4, days_ahead=7, mode='greedy', time_budget_ms=None):
         """
         Suggest an optimal schedule for upcoming tasks
         Returns a dictionary with date -> list of tasks
         """
+        SmartPlanner._check_schedule_mode(mode)
+        return SmartPlanner._cached(
+            user_id, ('schedule', available_hours_per_day, days_ahead, mode, time_budget_ms),
+            lambda: SmartPlanner._suggest_schedule(user_id, available_hours_per_day, days_ahead, mode, time_budget_ms)
+        )
+    
+    @staticmethod
+    def _suggest_schedule(user_id, available_hours_per_day, days_ahead, mode, time_budget_ms):
+        if mode == 'greedy':
+            return SmartPlanner.planned_schedule(user_id, available_hours_per_day, days_ahead)
+        
         # Get pending tasks
-        pending_tasks = Task.get_by_user(user_id, status='pending')
+        pending_tasks = Task.get_by_user(user_id, status='pending', as_records=True, fields='planning')
         
         if not pending_tasks:
             return {}
         
-        # Calculate priority scores
-        tasks_with_scores = []
-        for task in pending_tasks:
-            score = SmartPlanner.calculate_priority_score(task)
-            tasks_with_scores.append({
-                'task': task,
-                'score': score
-            })
+        return SmartPlanner.build_schedule(
+            pending_tasks, available_hours_per_day, days_ahead, mode=mode, time_budget_ms=time_budget_ms
+        )
+    
+    @staticmethod
+    def _cached(user_id, key, compute):
+        """compute() for the user, served from the cache while their data version is unchanged"""
+        return SmartPlanner._cache.get_or_compute(user_id, DataVersion.get(user_id), key, compute)
+    
+    @staticmethod
+    def cache_stats():
+        """Get planner result cache statistics"""
+        return SmartPlanner._cache.stats()
+    
+    @staticmethod
+    def _check_schedule_mode(mode):
+        if mode not in SmartPlanner.SCHEDULE_MODES:
+            raise ValueError(f"Unknown schedule mode '{mode}'; expected one of: {', '.join(SmartPlanner.SCHEDULE_MODES)}")
+    
+    @staticmethod
+    def build_schedule(tasks, available_hours_per_day, days_ahead, start_date=None, mode='greedy',
+                       time_budget_ms=None, now=None):
+        """
+        Pack tasks into days_ahead days of available_hours_per_day
+        Highest priority score goes first, then the earliest deadline, then
+        the largest task; see schedule_engine.pack for placement and splitting.
+        mode='optimal' also tries schedule_engine.pack_optimal and keeps it if
+        it finishes within time_budget_ms and gets more score-weighted hours
+        done before deadlines. Priority scores are taken at now (default: datetime.now()).
+        Split pieces carry 'split' and 'total_hours', pieces placed after the
+        task's deadline carry 'after_deadline'.
+        """
+        SmartPlanner._check_schedule_mode(mode)
+        started = perf_counter()
+        if start_date is None:
+            start_date = date.today()
         
-        # Sort by priority score (descending)
-        tasks_with_scores.sort(key=lambda x: x['score'], reverse=True)
+        ranked = SmartPlanner._rank(tasks, start_date, days_ahead, now)
+        tasks_by_id = {item[3]: item[4] for item in ranked}
+        items = [(task_id, task.remaining_hours, latest) for _, latest, _, task_id, task in ranked]
+        placements, unscheduled = schedule_engine.pack(items, days_ahead, available_hours_per_day)
         
-        # Create schedule
-        schedule = {}
-        current_date = date.today()
+        if mode == 'optimal':
+            if time_budget_ms is None:
+                time_budget_ms = SmartPlanner.DEFAULT_TIME_BUDGET_MS
+            time_budget_ms = min(max(time_budget_ms, 0), SmartPlanner.MAX_TIME_BUDGET_MS)
+            optimal = schedule_engine.pack_optimal(
+                items, days_ahead, available_hours_per_day, time_limit=started + time_budget_ms / 1000
+            )
+            if optimal is None:
+                logger.info(f"Optimal schedule for {len(items)} tasks exceeded {time_budget_ms} ms; using the greedy plan")
+            else:
+                weights = {item[3]: -item[0] for item in ranked}
+                if schedule_engine.on_time_value(optimal[0], weights) > schedule_engine.on_time_value(placements, weights) + 1e-9:
+                    placements, unscheduled = optimal
         
-        for i in range(days_ahead):
-            schedule_date = current_date + timedelta(days=i)
-            schedule[schedule_date.isoformat()] = []
+        days = [(start_date + timedelta(days=i)).isoformat() for i in range(days_ahead)]
+        schedule = {day: [] for day in days}
+        for task_id, day, hours, split, late in placements:
+            task = tasks_by_id[task_id]
+            entry = {
+                'task_id': task.task_id,
+                'title': task.title,
+                'subject_name': task.subject_name,
+                'estimated_hours': round(hours, 2),
+                'priority': task.priority,
+                'deadline': task.deadline.isoformat() if task.deadline else None
+            }
+            if split:
+                entry['split'] = True
+                entry['total_hours'] = round(task.remaining_hours, 2)
+            if late:
+                entry['after_deadline'] = True
+            schedule[days[day]].append(entry)
         
-        # Distribute tasks across days
-        current_day_index = 0
-        remaining_hours = {day: available_hours_per_day for day in schedule.keys()}
+        SmartPlanner._warn_unscheduled(unscheduled)
+        return schedule
+    
+    @staticmethod
+    def _warn_unscheduled(unscheduled):
+        if unscheduled:
+            logger.warning(
+                f"Could not schedule {sum(unscheduled.values()):.1f}h across {len(unscheduled)} tasks - insufficient time"
+            )
+    
+    @staticmethod
+    def _rank(tasks, start_date, days_ahead, now=None):
+        """
+        (-score, latest_day, -remaining_hours, task_id, task) per task, in
+        scheduling order; latest_day is the deadline's day index from start_date
+        """
+        tasks = [TaskRecord.coerce(task) for task in tasks]
+        scores = SmartPlanner.calculate_priority_scores(tasks, now=now)
+        ranked = []
+        for task, score in zip(tasks, scores):
+            if task.deadline:
+                latest = (task.deadline.date() - start_date).days
+            else:
+                latest = days_ahead - 1
+            ranked.append((-score, latest, -task.remaining_hours, task.task_id, task))
+        ranked.sort(key=lambda item: item[:4])
+        return ranked
+    
+    @staticmethod
+    def planned_schedule(user_id, available_hours_per_day=4, days_ahead=7):
+        """
+        suggest_schedule's greedy plan, stored per user (see SchedulePlan)
+        Rebuilt when the day changes; otherwise repaired from the tasks
+        written since the last read, keeping the scoring time of the last
+        rebuild so the result equals a full replan at that time. A plan with
+        no pending changes is only read. Parameters other than
+        PLAN_HOURS_PER_DAY and PLAN_DAYS_AHEAD are planned without storing.
+        """
+        if (float(available_hours_per_day), days_ahead) != (SmartPlanner.PLAN_HOURS_PER_DAY, SmartPlanner.PLAN_DAYS_AHEAD):
+            tasks = Task.get_by_user(user_id, status='pending', as_records=True, fields='planning')
+            return SmartPlanner.build_schedule(tasks, available_hours_per_day, days_ahead) if tasks else {}
         
-        for item in tasks_with_scores:
-            task = item['task']
-            estimated_hours = float(task.get('estimated_hours', 1.0))
-            
-            # Find a day with enough hours
-            scheduled = False
-            attempts = 0
-            
-            while not scheduled and attempts < days_ahead:
-                day_key = list(schedule.keys())[current_day_index]
-                
-                if remaining_hours[day_key] >= estimated_hours:
-                    schedule[day_key].append({
-                        'task_id': task['task_id'],
-                        'title': task['title'],
-                        'subject_name': task.get('subject_name'),
-                        'estimated_hours': estimated_hours,
-                        'priority': task.get('priority'),
-                        'deadline': task.get('deadline').isoformat() if task.get('deadline') else None
-                    })
-                    remaining_hours[day_key] -= estimated_hours
-                    scheduled = True
-                else:
-                    current_day_index = (current_day_index + 1) % days_ahead
-                    attempts += 1
-            
-            if not scheduled:
-                logger.warning(f"Could not schedule task {task['task_id']} - insufficient time")
+        today = date.today()
+        plan = SchedulePlan.get(user_id)
+        if SmartPlanner._plan_is_current(plan, today) and not SchedulePlan.has_changes(user_id):
+            entries = SchedulePlan.entries(user_id)
+        else:
+            with Database.transaction():
+                # Concurrent repairs would rewrite the same days from stale entries
+                SchedulePlan.lock(user_id)
+                plan = SchedulePlan.get(user_id)
+                changed = SchedulePlan.take_changes(user_id)
+                if not SmartPlanner._plan_is_current(plan, today):
+                    plan = SmartPlanner._replan(user_id, available_hours_per_day, days_ahead, today)
+                elif changed:
+                    plan = SmartPlanner._repair_plan(user_id, plan, changed)
+                entries = SchedulePlan.entries(user_id)
         
+        if not plan['items']:
+            return {}
+        days = [(plan['start_date'] + timedelta(days=i)).isoformat() for i in range(plan['days_ahead'])]
+        schedule = {day: [] for day in days}
+        for row in entries:
+            entry = {
+                'task_id': row['task_id'],
+                'title': row['title'],
+                'subject_name': row['subject_name'],
+                'estimated_hours': round(row['hours'], 2),
+                'priority': row['priority'],
+                'deadline': row['deadline'].isoformat() if row['deadline'] else None
+            }
+            if row['total_hours'] is not None:
+                entry['split'] = True
+                entry['total_hours'] = round(row['total_hours'], 2)
+            if row['after_deadline']:
+                entry['after_deadline'] = True
+            day = schedule.get(row['plan_date'].isoformat())
+            # Entries of a plan rebuilt after the header was read are skipped
+            if day is not None:
+                day.append(entry)
         return schedule
     
+    @staticmethod
+    def _plan_is_current(plan, today):
+        """Whether a stored plan starts today with the stored-plan parameters"""
+        return plan is not None and (plan['start_date'], plan['days_ahead'], plan['hours_per_day']) == (
+            today, SmartPlanner.PLAN_DAYS_AHEAD, SmartPlanner.PLAN_HOURS_PER_DAY)
+    
+    @staticmethod
+    def _replan(user_id, available_hours_per_day, days_ahead, start_date):
+        """Pack all pending tasks and store the plan and every day's entries"""
+        scored_at = datetime.now()
+        tasks = Task.get_by_user(user_id, status='pending', as_records=True, fields='planning')
+        items = [
+            [task_id, task.remaining_hours, latest, -neg_score]
+            for neg_score, latest, _, task_id, task in SmartPlanner._rank(tasks, start_date, days_ahead, scored_at)
+        ]
+        placements, unscheduled = schedule_engine.pack([item[:3] for item in items], days_ahead, available_hours_per_day)
+        SmartPlanner._warn_unscheduled(unscheduled)
+        
+        SchedulePlan.save(user_id, start_date, days_ahead, float(available_hours_per_day), scored_at, items)
+        SchedulePlan.replace_days(user_id, None, SmartPlanner._entry_rows(user_id, start_date, items, placements))
+        return SchedulePlan.get(user_id)
+    
+    @staticmethod
+    def _repair_plan(user_id, plan, changed):
+        """
+        Re-rank the changed tasks into the stored plan, repack from the first
+        rank that differs (earlier tasks keep their booked hours) and rewrite
+        the days whose entries changed
+        """
+        start_date, days_ahead = plan['start_date'], plan['days_ahead']
+        old_items = plan['items']
+        rows = Task.get_by_ids(user_id, changed, status='pending', as_records=True, fields='planning')
+        items = [item for item in old_items if item[0] not in changed] + [
+            [task_id, task.remaining_hours, latest, -neg_score]
+            for neg_score, latest, _, task_id, task in SmartPlanner._rank(rows, start_date, days_ahead, plan['scored_at'])
+        ]
+        items.sort(key=lambda item: (-item[3], item[2], -item[1], item[0]))
+        
+        unchanged = 0
+        for old, new in zip(old_items, items):
+            if old[:3] != new[:3]:
+                break
+            unchanged += 1
+        
+        rank = {item[0]: i for i, item in enumerate(old_items)}
+        stored = SchedulePlan.entries(user_id)
+        previous = [
+            (row['task_id'], (row['plan_date'] - start_date).days, row['hours'], None, row['after_deadline'])
+            for row in sorted(stored, key=lambda row: (rank.get(row['task_id'], -1), row['piece']))
+        ]
+        placements, unscheduled = schedule_engine.pack(
+            [item[:3] for item in items], days_ahead, plan['hours_per_day'], resume=(unchanged, previous)
+        )
+        SmartPlanner._warn_unscheduled(unscheduled)
+        
+        before = {}
+        for row in stored:
+            before.setdefault(row['plan_date'], []).append(
+                (user_id, row['plan_date'], row['seq'], row['task_id'], row['piece'],
+                 row['hours'], row['total_hours'], row['after_deadline'])
+            )
+        after = {}
+        for row in SmartPlanner._entry_rows(user_id, start_date, items, placements):
+            after.setdefault(row[1], []).append(row)
+        days = [day for day in set(before) | set(after) if before.get(day) != after.get(day)]
+        
+        SchedulePlan.save(user_id, start_date, days_ahead, plan['hours_per_day'], plan['scored_at'], items)
+        if days:
+            SchedulePlan.replace_days(user_id, days, [row for day in days for row in after.get(day, [])])
+        logger.info(
+            f"Repaired schedule for user {user_id}: {len(changed)} changed tasks, "
+            f"repacked from rank {unchanged} of {len(items)}, rewrote {len(days)} days"
+        )
+        plan['items'] = items
+        return plan
+    
+    @staticmethod
+    def _entry_rows(user_id, start_date, items, placements):
+        """schedule_entries rows (SchedulePlan.ENTRY_COLUMNS) for schedule_engine placements"""
+        hours_by_id = {item[0]: item[1] for item in items}
+        pieces, seqs, rows = {}, {}, []
+        for task_id, day, hours, split, late in placements:
+            plan_date = start_date + timedelta(days=day)
+            piece = pieces[task_id] = pieces.get(task_id, -1) + 1
+            seq = seqs[plan_date] = seqs.get(plan_date, -1) + 1
+            rows.append((
+                user_id, plan_date, seq, task_id, piece, hours,
+                hours_by_id[task_id] if split else None, late
+            ))
+        return rows
+    
+    @staticmethod
+    def verify_planned_schedule(user_id):
+        """
+        Days where the stored plan (after any pending repair) differs from a
+        full replan with the same start day, parameters and scoring time;
+        an empty list when they match or the user has no plan
+        """
+        plan = SchedulePlan.get(user_id)
+        if plan is None:
+            return []
+        stored = SmartPlanner.planned_schedule(user_id, plan['hours_per_day'], plan['days_ahead'])
+        plan = SchedulePlan.get(user_id)
+        tasks = Task.get_by_user(user_id, status='pending', as_records=True, fields='planning')
+        full = {}
+        if tasks:
+            full = SmartPlanner.build_schedule(
+                tasks, plan['hours_per_day'], plan['days_ahead'], plan['start_date'], now=plan['scored_at']
+            )
+        return sorted(day for day in set(stored) | set(full) if stored.get(day) != full.get(day))
+    
     @staticmethod
     def optimize_study_time(tasks, total_hours_available):
         """
@@ -141,18 +351,15 @@ class SmartPlanner:
             return {}
         
         # Calculate priority scores
+        tasks = [TaskRecord.coerce(task) for task in tasks]
+        scores = SmartPlanner.calculate_priority_scores(tasks)
         tasks_with_scores = []
-        for task in tasks:
-            score = SmartPlanner.calculate_priority_score(task)
-            estimated_hours = float(task.get('estimated_hours', 1.0))
-            completion = task.get('completion_percentage', 0)
-            remaining_hours = estimated_hours * (100 - completion) / 100
-            
+        for task, score in zip(tasks, scores):
             tasks_with_scores.append({
-                'task_id': task['task_id'],
+                'task_id': task.task_id,
                 'score': score,
-                'remaining_hours': remaining_hours,
-                'title': task['title']
+                'remaining_hours': task.remaining_hours,
+                'title': task.title
             })
         
         # Sort by score
@@ -189,7 +396,13 @@ class SmartPlanner:
         """
         if target_date is None:
             target_date = date.today()
-        
+        return SmartPlanner._cached(
+            user_id, ('recommendations', target_date),
+            lambda: SmartPlanner._daily_recommendations(user_id, target_date)
+        )
+    
+    @staticmethod
+    def _daily_recommendations(user_id, target_date):
         # Get tasks scheduled for this date
         scheduled_tasks = Task.get_by_date_range(user_id, target_date, target_date)
         
@@ -209,11 +422,10 @@ class SmartPlanner:
         
         # Add high-priority tasks not already scheduled
         scheduled_ids = {t['task_id'] for t in scheduled_tasks}
-        for task in pending_tasks:
-            if task['task_id'] not in scheduled_ids:
-                score = SmartPlanner.calculate_priority_score(task)
-                if score >= 50:  # High priority threshold
-                    recommendations['high_priority_tasks'].append(task)
+        candidates = [task for task in pending_tasks if task['task_id'] not in scheduled_ids]
+        for task, score in zip(candidates, SmartPlanner.calculate_priority_scores(candidates)):
+            if score >= 50:  # High priority threshold
+                recommendations['high_priority_tasks'].append(task)
         
         # Suggest focus area
         if scheduled_tasks:
@@ -232,17 +444,24 @@ class SmartPlanner:
         """
         Analyze upcoming workload
         """
+        return SmartPlanner._cached(
+            user_id, ('workload', days_ahead), lambda: SmartPlanner._analyze_workload(user_id, days_ahead)
+        )
+    
+    @staticmethod
+    def _analyze_workload(user_id, days_ahead):
         start_date = date.today()
         end_date = start_date + timedelta(days=days_ahead)
         
-        tasks = Task.get_by_date_range(user_id, start_date, end_date)
+        # The tasks are returned as they are by the workload API, so read whole rows
+        tasks = Task.get_by_date_range(user_id, start_date, end_date, as_records=True)
         
         # Group by date
         workload_by_date = {}
         for task in tasks:
-            task_date = task.get('scheduled_date')
+            task_date = task.scheduled_date
             if task_date:
-                date_str = task_date.isoformat() if hasattr(task_date, 'isoformat') else str(task_date)
+                date_str = task_date.isoformat()
                 if date_str not in workload_by_date:
                     workload_by_date[date_str] = {
                         'tasks': [],
@@ -251,7 +470,7 @@ class SmartPlanner:
                     }
                 
                 workload_by_date[date_str]['tasks'].append(task)
-                workload_by_date[date_str]['total_hours'] += float(task.get('estimated_hours', 0))
+                workload_by_date[date_str]['total_hours'] += task.estimated_hours
                 workload_by_date[date_str]['task_count'] += 1
         
         # Identify heavy days
@@ -264,5 +483,5 @@ class SmartPlanner:
             'workload_by_date': workload_by_date,
             'heavy_days': heavy_days,
             'total_tasks': len(tasks),
-            'total_hours': sum(float(t.get('estimated_hours', 0)) for t in tasks)
+            'total_hours': sum(t.estimated_hours for t in tasks)
         }
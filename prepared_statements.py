@@ -0,0 +1,120 @@
+"""
+Server-side prepared statements for the PostgreSQL backend
+Keeps a bounded LRU of PREPAREd statements per pooled connection
+"""
+
+import hashlib
+import threading
+import weakref
+import logging
+from collections import OrderedDict
+from sql_compiler import SQLCompiler
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE raised by EXECUTE when the session no longer knows the statement
+INVALID_STATEMENT_NAME = '26000'
+
+
+class _ConnectionStatements:
+    """Prepared statements owned by one server session"""
+
+    __slots__ = ('backend_pid', 'statements')
+
+    def __init__(self, backend_pid):
+        self.backend_pid = backend_pid
+        self.statements = OrderedDict()
+
+
+class PreparedStatementCache:
+    """
+    Per-connection LRU cache of server-side prepared statements.
+
+    Statements are keyed by their source SQL. A connection's cache is
+    dropped when its backend session changes (reconnect) or an EXECUTE
+    fails, and the least recently used statement is DEALLOCATEd once
+    ``max_size`` is exceeded.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max(1, int(max_size))
+        self._connections = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def statement_name(query):
+        """Stable server-side name for a statement"""
+        return 'ssp_' + hashlib.md5(query.encode('utf-8')).hexdigest()[:16]
+
+    def _statements_for(self, conn):
+        """Get the statement registry for a connection, resetting it after a reconnect"""
+        backend_pid = conn.get_backend_pid()
+        with self._lock:
+            entry = self._connections.get(conn)
+            if entry is None or entry.backend_pid != backend_pid:
+                if entry is not None:
+                    self._invalidations += 1
+                entry = _ConnectionStatements(backend_pid)
+                self._connections[conn] = entry
+        return entry.statements
+
+    def invalidate(self, conn):
+        """Forget every statement prepared on a connection"""
+        with self._lock:
+            if self._connections.pop(conn, None) is not None:
+                self._invalidations += 1
+
+    def execute(self, cursor, query, params=None):
+        """Execute a query through a prepared statement on the cursor's connection"""
+        params = tuple(params or ())
+        conn = cursor.connection
+        statements = self._statements_for(conn)
+        name = statements.get(query)
+
+        if name is not None:
+            statements.move_to_end(query)
+            self._hits += 1
+        else:
+            name = self.statement_name(query)
+            cursor.execute(f"PREPARE {name} AS {SQLCompiler.compile(query, 'postgresql-numbered')}")
+            statements[query] = name
+            self._misses += 1
+
+            while len(statements) > self.max_size:
+                _, evicted = statements.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {evicted}")
+                self._evictions += 1
+
+        try:
+            if params:
+                placeholders = ', '.join(['%s'] * len(params))
+                cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+            else:
+                cursor.execute(f"EXECUTE {name}")
+        except Exception as e:
+            if getattr(e, 'pgcode', None) == INVALID_STATEMENT_NAME:
+                logger.warning(f"Prepared statement {name} missing on server; resetting connection cache")
+                self.invalidate(conn)
+            raise
+
+    def stats(self):
+        """Return hit/miss counters for prepared statements"""
+        total = self._hits + self._misses
+        with self._lock:
+            connections = len(self._connections)
+            prepared = sum(len(entry.statements) for entry in self._connections.values())
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / total, 4) if total else 0.0,
+            'evictions': self._evictions,
+            'invalidations': self._invalidations,
+            'connections': connections,
+            'prepared': prepared,
+            'max_size': self.max_size
+        }
@@ -0,0 +1,172 @@
+"""
+Priority scoring for Smart Study Planner
+score_task scores one task; score_columns scores many tasks in one pass from
+column arrays, with NumPy when it is installed and a pure-Python loop
+otherwise. Both return identical scores.
+"""
+
+from datetime import datetime, timedelta
+from records import TaskRecord
+
+try:
+    import numpy as np
+except ImportError:  # optional: score_columns falls back to a Python loop
+    np = None
+
+TASK_TYPE_WEIGHTS = {
+    'exam': 30,
+    'assignment': 25,
+    'revision': 15,
+    'study': 10
+}
+DEFAULT_TYPE_WEIGHT = 10
+
+# task_type -> code for the type column; unknown types get UNKNOWN_TYPE
+TASK_TYPE_CODES = {task_type: code for code, task_type in enumerate(TASK_TYPE_WEIGHTS)}
+UNKNOWN_TYPE = len(TASK_TYPE_CODES)
+_TYPE_WEIGHT_BY_CODE = list(TASK_TYPE_WEIGHTS.values()) + [DEFAULT_TYPE_WEIGHT]
+
+# Deadlines travel as integer microseconds since this epoch, so whole-day
+# differences floor exactly like timedelta.days
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_DAY_US = 86400 * 1000000
+
+# Deadline column value for tasks without one (below any real datetime)
+NO_DEADLINE = -2 ** 63
+
+
+def deadline_epoch(deadline):
+    """Deadline column value for a datetime, ISO string or None"""
+    if not deadline:
+        return NO_DEADLINE
+    if isinstance(deadline, str):
+        deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+    return (deadline - _EPOCH) // _MICROSECOND
+
+
+def task_columns(tasks):
+    """
+    Column arrays for score_columns from task rows or TaskRecords:
+    priority, deadline (microseconds since 1970, NO_DEADLINE if unset),
+    type code (TASK_TYPE_CODES) and completion percentage
+    """
+    if all(isinstance(task, TaskRecord) for task in tasks):
+        # Records always have these fields (NULLs already hold the defaults)
+        priority = [task.priority for task in tasks]
+        deadline = [task.deadline for task in tasks]
+        task_type = [task.task_type for task in tasks]
+        completion = [task.completion_percentage for task in tasks]
+    else:
+        priority = [task.get('priority', 1) for task in tasks]
+        deadline = [task.get('deadline') for task in tasks]
+        task_type = [task.get('task_type', 'study') for task in tasks]
+        completion = [task.get('completion_percentage', 0) for task in tasks]
+
+    deadline = [(d - _EPOCH) // _MICROSECOND if type(d) is datetime else deadline_epoch(d) for d in deadline]
+    type_code = [TASK_TYPE_CODES.get(name, UNKNOWN_TYPE) for name in task_type]
+    return priority, deadline, type_code, completion
+
+
+def _urgency(days):
+    if days < 0:
+        return 100  # Overdue
+    if days == 0:
+        return 80  # Due today
+    if days == 1:
+        return 60  # Due tomorrow
+    if days <= 3:
+        return 40
+    if days <= 7:
+        return 20
+    return 10
+
+
+def _completion_weight(completion):
+    if completion < 25:
+        return 15
+    if completion < 50:
+        return 10
+    if completion < 75:
+        return 5
+    return 0
+
+
+# _urgency for days -1 (any overdue) to 8 (any later), and _completion_weight
+# as a step lookup, for the vectorised scorer
+_URGENCY_BY_DAY = [_urgency(days) for days in range(-1, 9)]
+_COMPLETION_STEPS = [25, 50, 75]
+_COMPLETION_WEIGHTS = [_completion_weight(completion) for completion in [0] + _COMPLETION_STEPS]
+if np is not None:
+    _URGENCY_BY_DAY = np.array(_URGENCY_BY_DAY)
+    _COMPLETION_WEIGHTS = np.array(_COMPLETION_WEIGHTS)
+
+
+def score_task(task, now=None):
+    """
+    Priority score for one task row or TaskRecord
+    Considers: task priority, deadline urgency, task type and completion
+    """
+    if now is None:
+        now = datetime.now()
+    score = task.get('priority', 1) * 20
+    deadline = task.get('deadline')
+    if deadline:
+        if isinstance(deadline, str):
+            deadline = datetime.fromisoformat(deadline.replace('Z', '+00:00'))
+        score += _urgency((deadline - now).days)
+    score += TASK_TYPE_WEIGHTS.get(task.get('task_type', 'study'), DEFAULT_TYPE_WEIGHT)
+    score += _completion_weight(task.get('completion_percentage', 0))
+    return score
+
+
+def _score_python(priority, deadline, type_code, completion, now_us):
+    scores = []
+    for p, d, t, c in zip(priority, deadline, type_code, completion):
+        score = p * 20 + _TYPE_WEIGHT_BY_CODE[t] + _completion_weight(c)
+        if d != NO_DEADLINE:
+            score += _urgency((d - now_us) // _DAY_US)
+        scores.append(score)
+    return scores
+
+
+def _score_numpy(priority, deadline, type_code, completion, now_us):
+    deadline = np.asarray(deadline, dtype=np.int64)
+    has_deadline = deadline != NO_DEADLINE
+    days = (np.where(has_deadline, deadline, now_us) - now_us) // _DAY_US
+    urgency = _URGENCY_BY_DAY[np.clip(days, -1, len(_URGENCY_BY_DAY) - 2) + 1]
+    completion_weight = _COMPLETION_WEIGHTS[
+        np.searchsorted(_COMPLETION_STEPS, np.asarray(completion, dtype=np.float64), side='right')
+    ]
+    type_weight = np.asarray(_TYPE_WEIGHT_BY_CODE, dtype=np.int64)[np.asarray(type_code, dtype=np.intp)]
+
+    scores = np.asarray(priority) * 20 + type_weight + completion_weight
+    scores += np.where(has_deadline, urgency, 0)
+    return scores.tolist()
+
+
+def score_columns(priority, deadline, type_code, completion, now=None, use_numpy=None):
+    """
+    Priority scores for parallel column arrays (see task_columns).
+    now defaults to datetime.now(); use_numpy defaults to whether NumPy is installed.
+    """
+    if now is None:
+        now = datetime.now()
+    now_us = (now - _EPOCH) // _MICROSECOND
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy and len(priority):
+        return _score_numpy(priority, deadline, type_code, completion, now_us)
+    return _score_python(priority, deadline, type_code, completion, now_us)
+
+
+def score_tasks(tasks, now=None, use_numpy=None):
+    """Priority scores for task rows or TaskRecords, in order"""
+    if now is None:
+        now = datetime.now()
+    if use_numpy is None:
+        use_numpy = np is not None
+    if not use_numpy:
+        # Building columns only pays off when NumPy does the arithmetic
+        return [score_task(task, now) for task in tasks]
+    return score_columns(*task_columns(tasks), now=now, use_numpy=True)
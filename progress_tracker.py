@@ -5,6 +5,7 @@ Track and analyze study progress
 
 from datetime import datetime, date, timedelta
 from models import Task, TaskProgress, StudySession
+from database import Database
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,28 +17,30 @@ class ProgressTracker:
     def update_task_progress(task_id, user_id, hours_spent, completion_percentage, notes=None):
         """Update progress for a task"""
         try:
-            task = Task.get_by_id(task_id)
-            if not task:
-                return None
-            
-            old_completion = task.get('completion_percentage', 0)
-            completion_delta = completion_percentage - old_completion
-            
-            updated_task = Task.update(
-                task_id,
-                completion_percentage=completion_percentage,
-                actual_hours=float(task.get('actual_hours', 0)) + hours_spent
-            )
-            
-            if completion_percentage >= 100:
-                updated_task = Task.update(task_id, status='completed', completed_at=datetime.now())
-            elif task.get('status') == 'pending':
-                updated_task = Task.update(task_id, status='in_progress')
-            
-            progress_entry = TaskProgress.create(
-                task_id=task_id, user_id=user_id, progress_date=date.today(),
-                hours_spent=hours_spent, completion_delta=completion_delta, notes=notes
-            )
+            # One connection and one commit for the read, update and progress entry
+            with Database.transaction():
+                task = Task.get_by_id(task_id)
+                if not task:
+                    return None
+                
+                old_completion = task.get('completion_percentage', 0)
+                completion_delta = completion_percentage - old_completion
+                
+                updates = {
+                    'completion_percentage': completion_percentage,
+                    'actual_hours': float(task.get('actual_hours', 0)) + hours_spent
+                }
+                if completion_percentage >= 100:
+                    updates.update(status='completed', completed_at=datetime.now())
+                elif task.get('status') == 'pending':
+                    updates['status'] = 'in_progress'
+                
+                updated_task = Task.update(task_id, **updates)
+                
+                progress_entry = TaskProgress.create(
+                    task_id=task_id, user_id=user_id, progress_date=date.today(),
+                    hours_spent=hours_spent, completion_delta=completion_delta, notes=notes
+                )
             
             logger.info(f"Updated progress for task {task_id}: {completion_percentage}%")
             return {'task': updated_task, 'progress_entry': progress_entry, 'completion_delta': completion_delta}
@@ -50,15 +53,16 @@ class ProgressTracker:
     def log_study_session(task_id, user_id, start_time, end_time, notes=None, focus_score=None):
         """Log a study session"""
         try:
-            session = StudySession.create(task_id, user_id, start_time, end_time, notes, focus_score)
-            
-            if start_time and end_time:
-                duration = end_time - start_time
-                hours_spent = duration.total_seconds() / 3600
-                task = Task.get_by_id(task_id)
-                if task:
-                    new_actual_hours = float(task.get('actual_hours', 0)) + hours_spent
-                    Task.update(task_id, actual_hours=new_actual_hours)
+            with Database.transaction():
+                session = StudySession.create(task_id, user_id, start_time, end_time, notes, focus_score)
+                
+                if start_time and end_time:
+                    duration = end_time - start_time
+                    hours_spent = duration.total_seconds() / 3600
+                    task = Task.get_by_id(task_id)
+                    if task:
+                        new_actual_hours = float(task.get('actual_hours', 0)) + hours_spent
+                        Task.update(task_id, actual_hours=new_actual_hours)
             
             logger.info(f"Logged study session for task {task_id}")
             return session
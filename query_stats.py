@@ -0,0 +1,158 @@
+"""
+Query instrumentation for Smart Study Planner
+Per-request query counts, DB time, slow-query logging and N+1 detection
+"""
+
+import threading
+import time
+import logging
+from db_config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('database.slow')
+
+
+def _shape(sql):
+    """Normalise a statement so repeats of the same query compare equal"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    return ' '.join(str(sql).split())
+
+
+class RequestQueryStats:
+    """Queries executed while handling one request"""
+
+    __slots__ = ('label', 'count', 'total_time', 'statements', 'slowest')
+
+    def __init__(self, label=None):
+        self.label = label
+        self.count = 0
+        self.total_time = 0.0
+        # raw statement -> [executions, total seconds]
+        self.statements = {}
+        # (seconds, raw statement), longest first
+        self.slowest = []
+
+    def record(self, sql, duration):
+        self.count += 1
+        self.total_time += duration
+
+        entry = self.statements.get(sql)
+        if entry is None:
+            self.statements[sql] = [1, duration]
+        else:
+            entry[0] += 1
+            entry[1] += duration
+
+        keep = DatabaseConfig.DB_SLOWEST_QUERIES_KEPT
+        if len(self.slowest) < keep or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, sql))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[keep:]
+
+    def repeated_statements(self, threshold=None):
+        """Statement shapes executed at least threshold times (likely N+1)"""
+        threshold = threshold or DatabaseConfig.DB_N_PLUS_ONE_THRESHOLD
+        shapes = {}
+        for sql, (executions, duration) in self.statements.items():
+            shape = _shape(sql)
+            total = shapes.setdefault(shape, [0, 0.0])
+            total[0] += executions
+            total[1] += duration
+        return [
+            {'statement': shape, 'count': executions, 'total_ms': round(duration * 1000, 2)}
+            for shape, (executions, duration) in shapes.items()
+            if executions >= threshold
+        ]
+
+    def summary(self):
+        return {
+            'label': self.label,
+            'query_count': self.count,
+            'db_time_ms': round(self.total_time * 1000, 2),
+            'slowest': [
+                {'statement': _shape(sql), 'ms': round(duration * 1000, 2)}
+                for duration, sql in self.slowest
+            ],
+            'n_plus_one': self.repeated_statements()
+        }
+
+
+class QueryInstrumentation:
+    """Thread-local collector fed by every cursor handed out by Database"""
+
+    _local = threading.local()
+
+    @classmethod
+    def start_request(cls, label=None):
+        """Begin collecting statistics for the current request"""
+        cls._local.stats = RequestQueryStats(label)
+        return cls._local.stats
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'stats', None)
+
+    @classmethod
+    def end_request(cls):
+        """Stop collecting and return the request's statistics (or None)"""
+        stats = getattr(cls._local, 'stats', None)
+        cls._local.stats = None
+        return stats
+
+    @classmethod
+    def record(cls, sql, duration):
+        stats = getattr(cls._local, 'stats', None)
+        if stats is not None:
+            stats.record(sql, duration)
+
+        if duration * 1000 >= DatabaseConfig.DB_SLOW_QUERY_MS:
+            label = f" [{stats.label}]" if stats is not None and stats.label else ''
+            slow_query_logger.warning(f"Slow query ({duration * 1000:.1f} ms){label}: {_shape(sql)[:500]}")
+
+    @classmethod
+    def report(cls, stats):
+        """Log likely N+1 patterns found in a finished request"""
+        for item in stats.repeated_statements():
+            logger.warning(
+                f"Possible N+1 in {stats.label or 'request'}: statement ran {item['count']} times "
+                f"({item['total_ms']} ms): {item['statement'][:300]}"
+            )
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times execute/executemany calls"""
+
+    __slots__ = ('_cursor',)
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return self._cursor.execute(sql)
+            return self._cursor.execute(sql, params)
+        finally:
+            QueryInstrumentation.record(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, params_list):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, params_list)
+        finally:
+            QueryInstrumentation.record(sql, time.perf_counter() - start)
+
+    def copy_expert(self, sql, file, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.copy_expert(sql, file, *args, **kwargs)
+        finally:
+            QueryInstrumentation.record(sql, time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
@@ -0,0 +1,208 @@
+"""
+Record types for Smart Study Planner
+Compact, immutable rows for the tables the planner walks in bulk
+"""
+
+from datetime import date, datetime, time
+from row_decoding import to_json_value
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_time(value):
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(str(value))
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.lower() in ('1', 't', 'true')
+    return bool(value)
+
+
+class _Record:
+    """
+    Base class for slot-based, read-only rows.
+
+    Subclasses list FIELDS as (name, converter, default) triples; the
+    converter runs once when the row is built and NULL becomes the default.
+    Records also answer ``record['field']`` and ``record.get('field')`` so
+    code written against row dicts keeps working unchanged.
+
+    A record read from a projection (a row without some of the columns)
+    remembers which fields it was given; the others hold their defaults
+    and are left out of to_dict().
+    """
+
+    __slots__ = ('_selected',)
+    FIELDS = ()
+
+    def __init__(self, **values):
+        for name, convert, default in self.FIELDS:
+            value = values.get(name)
+            object.__setattr__(self, name, default if value is None else convert(value))
+        object.__setattr__(self, '_selected', None)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a row dict (extra keys are ignored)"""
+        if row is None:
+            return None
+        record = cls(**row)
+        if any(name not in row for name, _, _ in cls.FIELDS):
+            object.__setattr__(record, '_selected', frozenset(row))
+        return record
+
+    @classmethod
+    def coerce(cls, row):
+        """Return row unchanged if it is already a record of this type"""
+        return row if isinstance(row, cls) else cls.from_row(row)
+
+    @classmethod
+    def decoder(cls, columns):
+        """Row converter for a column layout; used by RowDecoder for row_format=<record class>"""
+        index = {name: i for i, name in enumerate(columns)}
+        plan = [(name, index.get(name), convert, default) for name, convert, default in cls.FIELDS]
+        selected = None if all(i is not None for _, i, _, _ in plan) else frozenset(columns)
+        new = object.__new__
+        assign = object.__setattr__
+
+        def decode(row):
+            record = new(cls)
+            for name, i, convert, default in plan:
+                value = None if i is None else row[i]
+                assign(record, name, default if value is None else convert(value))
+            assign(record, '_selected', selected)
+            return record
+
+        return decode
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only; use replace()")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def replace(self, **changes):
+        """Copy of this record with some fields changed"""
+        values = {name: getattr(self, name) for name, _, _ in self.FIELDS}
+        values.update(changes)
+        record = type(self)(**values)
+        if self._selected is not None:
+            object.__setattr__(record, '_selected', self._selected.union(changes))
+        return record
+
+    def to_dict(self):
+        """JSON-ready dict for API responses (only the selected fields of a projection)"""
+        selected = self._selected
+        return {
+            name: to_json_value(getattr(self, name))
+            for name, _, _ in self.FIELDS
+            if selected is None or name in selected
+        }
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name, _, _ in self.FIELDS)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, name) for name, _, _ in self.FIELDS))
+
+    def __repr__(self):
+        key = self.FIELDS[0][0]
+        return f"{type(self).__name__}({key}={getattr(self, key)!r})"
+
+
+class TaskRecord(_Record):
+    """Task row (with the joined subject name and colour)"""
+
+    FIELDS = (
+        ('task_id', int, None),
+        ('user_id', int, None),
+        ('subject_id', int, None),
+        ('title', str, ''),
+        ('description', str, None),
+        ('task_type', str, 'study'),
+        ('priority', int, 1),
+        ('estimated_hours', float, 1.0),
+        ('deadline', _to_datetime, None),
+        ('scheduled_date', _to_date, None),
+        ('scheduled_time', _to_time, None),
+        ('status', str, 'pending'),
+        ('completion_percentage', int, 0),
+        ('actual_hours', float, 0.0),
+        ('is_recurring', _to_bool, False),
+        ('recurrence_pattern', str, None),
+        ('created_at', _to_datetime, None),
+        ('updated_at', _to_datetime, None),
+        ('completed_at', _to_datetime, None),
+        ('subject_name', str, None),
+        ('color_code', str, None)
+    )
+    __slots__ = tuple(name for name, _, _ in FIELDS)
+
+    @property
+    def remaining_hours(self):
+        """Estimated hours still to do given the completion percentage"""
+        return self.estimated_hours * (100 - self.completion_percentage) / 100
+
+
+class SubjectRecord(_Record):
+    """Subject row"""
+
+    FIELDS = (
+        ('subject_id', int, None),
+        ('user_id', int, None),
+        ('subject_name', str, ''),
+        ('color_code', str, '#3B82F6'),
+        ('priority', int, 1),
+        ('level', str, None),
+        ('target_grade', str, None),
+        ('current_topic', str, None),
+        ('sub_topics', str, None),
+        ('created_at', _to_datetime, None)
+    )
+    __slots__ = tuple(name for name, _, _ in FIELDS)
+
+
+class StudySessionRecord(_Record):
+    """Study session row"""
+
+    FIELDS = (
+        ('session_id', int, None),
+        ('task_id', int, None),
+        ('user_id', int, None),
+        ('start_time', _to_datetime, None),
+        ('end_time', _to_datetime, None),
+        ('duration_minutes', int, 0),
+        ('session_type', str, 'study'),
+        ('notes', str, None),
+        ('focus_score', int, None),
+        ('created_at', _to_datetime, None)
+    )
+    __slots__ = tuple(name for name, _, _ in FIELDS)
@@ -19,47 +19,58 @@ class TaskRescheduler:
         Automatically reschedule overdue tasks
         Returns list of rescheduled tasks
         """
-        overdue_tasks = Task.get_overdue_tasks(user_id)
-        rescheduled = []
+        overdue_tasks = Task.get_overdue_tasks(user_id, as_records=True, fields='planning')
+        planned = []
         
         for task in overdue_tasks:
             try:
                 # Calculate new deadline based on priority and remaining work
                 new_deadline = TaskRescheduler._calculate_new_deadline(task)
                 new_scheduled_date = TaskRescheduler._calculate_new_scheduled_date(task)
-                
-                # Update task
-                updated_task = Task.update(
-                    task['task_id'],
-                    deadline=new_deadline,
-                    scheduled_date=new_scheduled_date,
-                    status='rescheduled'
-                )
-                
-                if updated_task:
-                    rescheduled.append({
-                        'task_id': task['task_id'],
-                        'title': task['title'],
-                        'old_deadline': task.get('deadline'),
-                        'new_deadline': new_deadline,
-                        'new_scheduled_date': new_scheduled_date
-                    })
-                    logger.info(f"Rescheduled task {task['task_id']}: {task['title']}")
-                
+                planned.append((task, new_deadline, new_scheduled_date))
             except Exception as e:
                 logger.error(f"Error rescheduling task {task['task_id']}: {e}")
         
+        if not planned:
+            return []
+        
+        # Write all new dates in a single transaction
+        try:
+            updated_tasks = Task.update_many([
+                {
+                    'task_id': task['task_id'],
+                    'deadline': new_deadline,
+                    'scheduled_date': new_scheduled_date,
+                    'status': 'rescheduled'
+                }
+                for task, new_deadline, new_scheduled_date in planned
+            ])
+        except Exception as e:
+            logger.error(f"Error rescheduling overdue tasks for user {user_id}: {e}")
+            return []
+        
+        updated_ids = {t['task_id'] for t in updated_tasks}
+        rescheduled = []
+        for task, new_deadline, new_scheduled_date in planned:
+            if task['task_id'] in updated_ids:
+                rescheduled.append({
+                    'task_id': task['task_id'],
+                    'title': task['title'],
+                    'old_deadline': task.get('deadline'),
+                    'new_deadline': new_deadline,
+                    'new_scheduled_date': new_scheduled_date
+                })
+                logger.info(f"Rescheduled task {task['task_id']}: {task['title']}")
+        
         return rescheduled
     
     @staticmethod
     def _calculate_new_deadline(task):
         """Calculate new deadline based on task properties"""
-        priority = task.get('priority', 1)
-        completion = task.get('completion_percentage', 0)
-        estimated_hours = float(task.get('estimated_hours', 1.0))
+        priority = task.priority
         
         # Calculate remaining work
-        remaining_work = estimated_hours * (100 - completion) / 100
+        remaining_work = task.remaining_hours
         
         # Base days to add based on priority (higher priority = sooner deadline)
         priority_days = {
@@ -86,7 +97,7 @@ class TaskRescheduler:
     @staticmethod
     def _calculate_new_scheduled_date(task):
         """Calculate new scheduled date"""
-        priority = task.get('priority', 1)
+        priority = task.priority
         
         # High priority tasks scheduled sooner
         if priority >= 4:
@@ -109,33 +120,35 @@ class TaskRescheduler:
             target_date = date.today()
         
         # Get tasks scheduled for target date that are not completed
-        tasks = Task.get_by_date_range(user_id, target_date, target_date)
+        tasks = Task.get_by_date_range(user_id, target_date, target_date, fields='planning')
         incomplete_tasks = [t for t in tasks if t.get('status') not in ['completed']]
         
-        rescheduled = []
+        if not incomplete_tasks:
+            return []
         
+        # Move to next available day
+        new_scheduled_date = target_date + timedelta(days=1)
+        
+        try:
+            updated_tasks = Task.update_many([
+                {'task_id': task['task_id'], 'scheduled_date': new_scheduled_date, 'status': 'rescheduled'}
+                for task in incomplete_tasks
+            ])
+        except Exception as e:
+            logger.error(f"Error rescheduling incomplete tasks for user {user_id}: {e}")
+            return []
+        
+        updated_ids = {t['task_id'] for t in updated_tasks}
+        rescheduled = []
         for task in incomplete_tasks:
-            try:
-                # Move to next available day
-                new_scheduled_date = target_date + timedelta(days=1)
-                
-                updated_task = Task.update(
-                    task['task_id'],
-                    scheduled_date=new_scheduled_date,
-                    status='rescheduled'
-                )
-                
-                if updated_task:
-                    rescheduled.append({
-                        'task_id': task['task_id'],
-                        'title': task['title'],
-                        'old_date': target_date.isoformat(),
-                        'new_date': new_scheduled_date.isoformat()
-                    })
-                    logger.info(f"Rescheduled incomplete task {task['task_id']}")
-                
-            except Exception as e:
-                logger.error(f"Error rescheduling incomplete task {task['task_id']}: {e}")
+            if task['task_id'] in updated_ids:
+                rescheduled.append({
+                    'task_id': task['task_id'],
+                    'title': task['title'],
+                    'old_date': target_date.isoformat(),
+                    'new_date': new_scheduled_date.isoformat()
+                })
+                logger.info(f"Rescheduled incomplete task {task['task_id']}")
         
         return rescheduled
     
@@ -148,27 +161,27 @@ class TaskRescheduler:
         start_date = date.today()
         end_date = start_date + timedelta(days=days_ahead)
         
-        tasks = Task.get_by_date_range(user_id, start_date, end_date)
+        tasks = Task.get_by_date_range(user_id, start_date, end_date, as_records=True, fields='planning')
         
         # Group tasks by date
         tasks_by_date = {}
         for task in tasks:
-            task_date = task.get('scheduled_date')
+            task_date = task.scheduled_date
             if task_date:
-                date_str = task_date.isoformat() if hasattr(task_date, 'isoformat') else str(task_date)
+                date_str = task_date.isoformat()
                 if date_str not in tasks_by_date:
                     tasks_by_date[date_str] = []
                 tasks_by_date[date_str].append(task)
         
-        rebalanced = []
+        moves = []
         
         # Check each day for overload
         for date_str, day_tasks in tasks_by_date.items():
-            total_hours = sum(float(t.get('estimated_hours', 0)) for t in day_tasks)
+            total_hours = sum(t.estimated_hours for t in day_tasks)
             
             if total_hours > max_hours_per_day:
                 # Sort tasks by priority (lower priority tasks moved first)
-                day_tasks.sort(key=lambda t: t.get('priority', 1))
+                day_tasks.sort(key=lambda t: t.priority)
                 
                 hours_to_move = total_hours - max_hours_per_day
                 current_hours_moved = 0
@@ -177,28 +190,36 @@ class TaskRescheduler:
                     if current_hours_moved >= hours_to_move:
                         break
                     
-                    task_hours = float(task.get('estimated_hours', 0))
+                    task_hours = task.estimated_hours
                     
                     # Find next available day
                     current_date = datetime.fromisoformat(date_str).date()
                     new_date = current_date + timedelta(days=1)
                     
-                    # Update task
-                    updated_task = Task.update(
-                        task['task_id'],
-                        scheduled_date=new_date
-                    )
-                    
-                    if updated_task:
-                        rebalanced.append({
-                            'task_id': task['task_id'],
-                            'title': task['title'],
-                            'moved_from': date_str,
-                            'moved_to': new_date.isoformat(),
-                            'reason': 'workload_balancing'
-                        })
-                        current_hours_moved += task_hours
-                        logger.info(f"Moved task {task['task_id']} for workload balancing")
+                    moves.append((task, date_str, new_date))
+                    current_hours_moved += task_hours
+        
+        if not moves:
+            return []
+        
+        # Apply all moves in a single transaction
+        updated_tasks = Task.update_many([
+            {'task_id': task['task_id'], 'scheduled_date': new_date}
+            for task, _, new_date in moves
+        ])
+        
+        updated_ids = {t['task_id'] for t in updated_tasks}
+        rebalanced = []
+        for task, date_str, new_date in moves:
+            if task['task_id'] in updated_ids:
+                rebalanced.append({
+                    'task_id': task['task_id'],
+                    'title': task['title'],
+                    'moved_from': date_str,
+                    'moved_to': new_date.isoformat(),
+                    'reason': 'workload_balancing'
+                })
+                logger.info(f"Moved task {task['task_id']} for workload balancing")
         
         return rebalanced
     
@@ -0,0 +1,143 @@
+"""
+Row decoding for Smart Study Planner
+Turns raw driver rows into dicts, tuples or lightweight records, with
+typed columns converted once by the driver instead of per caller
+"""
+
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime, time
+from decimal import Decimal
+
+ROW_FORMATS = ('dict', 'tuple', 'record')
+
+# Decoders are cached per column layout; the cap only guards against
+# unbounded growth from ad-hoc queries
+_MAX_DECODERS = 512
+
+
+def _parse_datetime(value):
+    text = value.decode('utf-8') if isinstance(value, bytes) else value
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return text
+
+
+def _parse_date(value):
+    text = value.decode('utf-8') if isinstance(value, bytes) else value
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+def _parse_time(value):
+    text = value.decode('utf-8') if isinstance(value, bytes) else value
+    try:
+        return time.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _parse_decimal(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _parse_boolean(value):
+    try:
+        return bool(int(value))
+    except ValueError:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+_SQLITE_CONVERTERS = {
+    'DATETIME': _parse_datetime,
+    'TIMESTAMP': _parse_datetime,
+    'DATE': _parse_date,
+    'TIME': _parse_time,
+    'DECIMAL': _parse_decimal,
+    'NUMERIC': _parse_decimal,
+    'BOOLEAN': _parse_boolean
+}
+
+
+def register_sqlite_converters():
+    """
+    Register column converters keyed by declared type so sqlite3 (with
+    PARSE_DECLTYPES) returns date/datetime/time/float/bool values directly
+    """
+    for declared_type, converter in _SQLITE_CONVERTERS.items():
+        sqlite3.register_converter(declared_type, converter)
+
+
+def register_postgres_decimal_as_float():
+    """Make psycopg2 return NUMERIC columns as float instead of Decimal"""
+    from psycopg2 import extensions
+
+    def cast_decimal(value, cursor):
+        return float(value) if value is not None else None
+
+    decimal_to_float = extensions.new_type(
+        extensions.DECIMAL.values, 'DECIMAL_AS_FLOAT', cast_decimal
+    )
+    extensions.register_type(decimal_to_float)
+
+
+class RowDecoder:
+    """Builds (and caches) a row converter per cursor description and format"""
+
+    _decoders = {}
+
+    @classmethod
+    def for_description(cls, description, row_format='dict'):
+        return cls.for_columns(tuple(col[0] for col in description), row_format)
+
+    @classmethod
+    def for_columns(cls, columns, row_format='dict'):
+        key = (columns, row_format)
+        decoder = cls._decoders.get(key)
+        if decoder is None:
+            decoder = cls._build(columns, row_format)
+            if len(cls._decoders) >= _MAX_DECODERS:
+                cls._decoders.clear()
+            cls._decoders[key] = decoder
+        return decoder
+
+    @staticmethod
+    def _build(columns, row_format):
+        if row_format == 'dict':
+            return lambda row: dict(zip(columns, row))
+        if row_format == 'tuple':
+            return tuple
+        if row_format == 'record':
+            return namedtuple('Row', columns, rename=True)._make
+        if isinstance(row_format, type) and hasattr(row_format, 'decoder'):
+            # A records.py class builds its own converter for this layout
+            return row_format.decoder(columns)
+        raise ValueError(f"Unknown row format: {row_format!r} (expected one of {ROW_FORMATS})")
+
+    @classmethod
+    def decode_one(cls, cursor, row, row_format='dict'):
+        if row is None or cursor.description is None:
+            return row
+        return cls.for_description(cursor.description, row_format)(row)
+
+    @classmethod
+    def decode_all(cls, cursor, rows, row_format='dict'):
+        if not rows or cursor.description is None:
+            return rows
+        decode = cls.for_description(cursor.description, row_format)
+        return [decode(row) for row in rows]
+
+
+def to_json_value(value):
+    """JSON-friendly form of decoded column values"""
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
@@ -0,0 +1,224 @@
+"""
+Scheduling engine for Smart Study Planner
+Packs tasks into per-day study capacity with best-fit decreasing placement,
+respecting deadlines and splitting tasks that do not fit into a single day;
+pack_optimal maximises the priority-weighted hours done before deadlines
+"""
+
+from bisect import bisect_left, insort
+from operator import itemgetter
+from time import perf_counter
+
+# Capacity below this is treated as used up (float rounding guard)
+_EPSILON = 1e-9
+
+
+class DayCapacities:
+    """
+    Remaining study hours per day, kept ordered by (hours left, day index).
+
+    Best fit is a binary search for the smallest capacity that still holds
+    the task; ties go to the earliest day, so packing fills the calendar
+    front to back and later small tasks backfill the gaps.
+    """
+
+    def __init__(self, days, hours_per_day):
+        self.remaining = [float(hours_per_day)] * days
+        self._order = [(float(hours_per_day), day) for day in range(days)]
+
+    def __len__(self):
+        """Number of days that still have room"""
+        return len(self._order)
+
+    def best_fit(self, hours, first, latest):
+        """Day in first..latest with the least room that still fits hours (None if none)"""
+        order = self._order
+        for i in range(bisect_left(order, (hours - _EPSILON, -1)), len(order)):
+            if first <= order[i][1] <= latest:
+                return order[i][1]
+        return None
+
+    def roomiest(self, first, latest, min_hours):
+        """Days first..latest with at least min_hours left, most room (then earliest) first"""
+        days = []
+        for capacity, day in reversed(self._order):
+            if capacity < min_hours - _EPSILON:
+                break
+            if first <= day <= latest:
+                days.append((-capacity, day))
+        return [day for _, day in sorted(days)]
+
+    def take(self, day, hours):
+        """Book hours on day"""
+        old = self.remaining[day]
+        self._order.pop(bisect_left(self._order, (old, day)))
+        self.remaining[day] = max(0.0, old - hours)
+        if self.remaining[day] > _EPSILON:
+            insort(self._order, (self.remaining[day], day))
+
+
+def _place(capacities, hours, first, latest, min_chunk):
+    """
+    Book hours on days first..latest: whole on the best-fitting day, or else
+    split over the roomiest days in pieces of at least min_chunk.
+    Returns the (day, hours) pieces booked and the hours left over.
+    """
+    if not capacities:
+        return [], hours
+    day = capacities.best_fit(hours, first, latest)
+    if day is not None:
+        capacities.take(day, hours)
+        return [(day, hours)], 0.0
+
+    left = hours
+    pieces = []
+    for day in capacities.roomiest(first, latest, min(min_chunk, left)):
+        chunk = min(left, capacities.remaining[day])
+        capacities.take(day, chunk)
+        pieces.append((day, chunk))
+        left -= chunk
+        if left <= _EPSILON:
+            return pieces, 0.0
+    return pieces, left
+
+
+def pack(items, days, hours_per_day, min_chunk=0.5, resume=None):
+    """
+    Place items into days of hours_per_day capacity.
+
+    items: (key, hours, latest_day) in scheduling priority order, where
+    latest_day is the last day index the work should land on (its deadline).
+    The first pass puts each item whole on the best-fitting day up to its
+    deadline, or splits it over the roomiest days before the deadline in
+    pieces of at least min_chunk hours. Only once every item had its chance
+    to finish on time does a second pass place the leftovers after their
+    deadlines, in the same priority order.
+
+    resume=(count, placements) repairs an earlier result: the first count
+    items must equal those of the items the placements were made for, so
+    their on-time pieces are booked again as they were instead of being
+    searched for, and only the items from count on are placed anew. The
+    result is the same as packing all items from scratch.
+
+    Returns (placements, unscheduled): placements are (key, day, hours,
+    part_of_split, after_deadline) tuples grouped by item in priority order,
+    each item's pieces in the order they were booked, and unscheduled maps
+    key to the hours that did not fit anywhere.
+    """
+    if days <= 0 or hours_per_day <= 0:
+        return [], {key: hours for key, hours, _ in items}
+
+    capacities = DayCapacities(days, hours_per_day)
+    last_day = days - 1
+    pieces = {}
+    overdue = []
+
+    count, previous = resume or (0, ())
+    on_time = {}
+    for key, day, hours, _, late in previous:
+        if not late:
+            on_time.setdefault(key, []).append((day, hours))
+
+    for index, (key, hours, latest) in enumerate(items):
+        if hours <= _EPSILON:
+            continue
+        latest = min(max(latest, 0), last_day)
+        if index < count:
+            booked, left = _rebook(capacities, hours, on_time.get(key, ()))
+        else:
+            booked, left = _place(capacities, hours, 0, latest, min_chunk)
+        pieces[key] = [(day, chunk, False) for day, chunk in booked]
+        if left > _EPSILON:
+            overdue.append((key, left, latest))
+
+    unscheduled = _place_overdue(capacities, overdue, last_day, min_chunk, pieces)
+    return _placements(pieces, unscheduled), unscheduled
+
+
+def _rebook(capacities, hours, booked):
+    """Book (day, hours) pieces again in their original order; same result as the _place call that made them"""
+    left = hours
+    for day, chunk in booked:
+        capacities.take(day, chunk)
+        left -= chunk
+    return booked, 0.0 if left <= _EPSILON else left
+
+
+def pack_optimal(items, days, hours_per_day, min_chunk=0.5, time_limit=None):
+    """
+    Place items like pack, maximising the priority-weighted hours that land
+    by each item's deadline.
+
+    Deadline windows all start at day 0, so they nest: hours due by day k
+    can never exceed the capacity of days 0..k. Admitting each item's hours
+    in priority order up to the tightest of those limits is the optimum of
+    the underlying flow problem (before min_chunk rounding), so an urgent
+    item is no longer crowded out by a higher-priority item that had time
+    to spare. Admitted hours are then placed earliest deadline first, which
+    always fits them, and the rest goes after the deadline as in pack.
+
+    Same arguments and result as pack; returns None once time.perf_counter()
+    passes time_limit.
+    """
+    if days <= 0 or hours_per_day <= 0:
+        return [], {key: hours for key, hours, _ in items}
+
+    last_day = days - 1
+    # slack[k]: hours of days 0..k not yet promised to admitted items
+    slack = [float(hours_per_day) * (day + 1) for day in range(days)]
+    admitted = []
+    for rank, (key, hours, latest) in enumerate(items):
+        if time_limit is not None and perf_counter() > time_limit:
+            return None
+        if hours <= _EPSILON:
+            continue
+        latest = min(max(latest, 0), last_day)
+        on_time = min(hours, min(slack[latest:]))
+        if on_time > _EPSILON:
+            slack[latest:] = [left - on_time for left in slack[latest:]]
+        else:
+            on_time = 0.0
+        admitted.append((latest, rank, key, hours, on_time))
+
+    capacities = DayCapacities(days, hours_per_day)
+    pieces = {key: [] for _, _, key, _, _ in admitted}
+    remainder = {}
+    for latest, _, key, hours, on_time in sorted(admitted, key=itemgetter(0, 1)):
+        if time_limit is not None and perf_counter() > time_limit:
+            return None
+        left = 0.0
+        if on_time > _EPSILON:
+            booked, left = _place(capacities, on_time, 0, latest, min_chunk)
+            pieces[key] = [(day, chunk, False) for day, chunk in booked]
+        remainder[key] = hours - on_time + left
+
+    overdue = [
+        (key, remainder[key], latest)
+        for latest, _, key, _, _ in admitted if remainder[key] > _EPSILON
+    ]
+    unscheduled = _place_overdue(capacities, overdue, last_day, min_chunk, pieces)
+    return _placements(pieces, unscheduled), unscheduled
+
+
+def on_time_value(placements, weights):
+    """Sum of weights[key] * hours over placements that land by their deadline"""
+    return sum(weights[key] * hours for key, _, hours, _, late in placements if not late)
+
+
+def _place_overdue(capacities, overdue, last_day, min_chunk, pieces):
+    """Place (key, hours, latest) leftovers after their deadlines; returns unscheduled hours"""
+    unscheduled = {}
+    for key, hours, latest in overdue:
+        booked, left = _place(capacities, hours, latest + 1, last_day, min_chunk)
+        pieces[key].extend((day, chunk, True) for day, chunk in booked)
+        if left > _EPSILON:
+            unscheduled[key] = left
+    return unscheduled
+
+
+def _placements(pieces, unscheduled):
+    placements = []
+    for key, booked in pieces.items():
+        split = len(booked) > 1 or key in unscheduled
+        placements.extend((key, day, chunk, split, late) for day, chunk, late in booked)
+    return placements
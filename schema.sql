@@ -2,6 +2,11 @@
 -- PostgreSQL Database
 
 -- Drop existing tables if they exist
+DROP TABLE IF EXISTS user_data_versions CASCADE;
+DROP TABLE IF EXISTS schedule_changes CASCADE;
+DROP TABLE IF EXISTS schedule_entries CASCADE;
+DROP TABLE IF EXISTS schedule_plans CASCADE;
+DROP TABLE IF EXISTS daily_user_stats CASCADE;
 DROP TABLE IF EXISTS task_progress CASCADE;
 DROP TABLE IF EXISTS weekly_summaries CASCADE;
 DROP TABLE IF EXISTS study_sessions CASCADE;
@@ -127,6 +132,57 @@ CREATE TABLE study_streaks (
     UNIQUE(user_id, streak_date)
 );
 
+-- Daily Study Stats table (rollup maintained by models.DailyStats)
+CREATE TABLE daily_user_stats (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    stat_date DATE NOT NULL,
+    subject_id INTEGER NOT NULL DEFAULT 0, -- 0 = no subject
+    study_minutes INTEGER NOT NULL DEFAULT 0,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    progress_hours DECIMAL(8,2) NOT NULL DEFAULT 0,
+    tasks_completed INTEGER NOT NULL DEFAULT 0,
+    focus_sum INTEGER NOT NULL DEFAULT 0,
+    focus_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, stat_date, subject_id)
+);
+
+-- Stored schedule plans (maintained by models.SchedulePlan / SmartPlanner.planned_schedule)
+CREATE TABLE schedule_plans (
+    user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    days_ahead INTEGER NOT NULL,
+    hours_per_day DOUBLE PRECISION NOT NULL,
+    scored_at TIMESTAMP NOT NULL, -- priority scores are taken at this time
+    items TEXT NOT NULL, -- JSON [[task_id, hours, latest_day, score], ...] in rank order
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE schedule_entries (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    plan_date DATE NOT NULL,
+    seq INTEGER NOT NULL, -- order within the day
+    task_id INTEGER NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+    piece INTEGER NOT NULL, -- booking order within the task
+    hours DOUBLE PRECISION NOT NULL,
+    total_hours DOUBLE PRECISION, -- set when the task is split
+    after_deadline BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (user_id, plan_date, seq)
+);
+
+-- Tasks written since their user's plan was last repaired
+CREATE TABLE schedule_changes (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    task_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, task_id)
+);
+
+-- Per-user data version, bumped by every task, subject and study session write
+CREATE TABLE user_data_versions (
+    user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Notifications table
 CREATE TABLE notifications (
     notification_id SERIAL PRIMARY KEY,
@@ -152,19 +208,35 @@ CREATE TABLE file_attachments (
 );
 
 -- Indexes for better performance
-CREATE INDEX idx_tasks_user_id ON tasks(user_id);
+-- Per-user indexes lead with user_id, then the filter and sort columns of
+-- the model queries (see migrate_composite_indexes.py for existing databases).
+-- subjects, weekly_summaries and study_streaks are covered by their UNIQUE constraints.
 CREATE INDEX idx_tasks_status ON tasks(status);
 CREATE INDEX idx_tasks_deadline ON tasks(deadline);
 CREATE INDEX idx_tasks_scheduled_date ON tasks(scheduled_date);
-CREATE INDEX idx_subjects_user_id ON subjects(user_id);
+CREATE INDEX idx_tasks_user_scheduled ON tasks(user_id, scheduled_date, scheduled_time);
+CREATE INDEX idx_tasks_user_status_deadline ON tasks(user_id, status, deadline);
+CREATE INDEX idx_tasks_user_deadline ON tasks(user_id, deadline, priority DESC, task_id);
+CREATE INDEX idx_tasks_user_created ON tasks(user_id, created_at DESC, task_id DESC);
+CREATE INDEX idx_tasks_user_open_deadline ON tasks(user_id, deadline) WHERE status NOT IN ('completed', 'rescheduled');
+CREATE INDEX idx_tasks_subject_id ON tasks(subject_id);
 CREATE INDEX idx_study_sessions_task_id ON study_sessions(task_id);
-CREATE INDEX idx_study_sessions_user_id ON study_sessions(user_id);
+CREATE INDEX idx_study_sessions_user_start ON study_sessions(user_id, start_time);
 CREATE INDEX idx_task_progress_task_id ON task_progress(task_id);
-CREATE INDEX idx_weekly_summaries_user_id ON weekly_summaries(user_id);
-CREATE INDEX idx_study_goals_user_id ON study_goals(user_id);
-CREATE INDEX idx_study_streaks_user_id ON study_streaks(user_id);
-CREATE INDEX idx_notifications_user_id ON notifications(user_id);
+CREATE INDEX idx_task_progress_user_id ON task_progress(user_id);
+CREATE INDEX idx_study_goals_user_target ON study_goals(user_id, target_date, created_at DESC);
+CREATE INDEX idx_notifications_user_created ON notifications(user_id, created_at DESC, notification_id DESC);
+CREATE INDEX idx_notifications_user_unread ON notifications(user_id, created_at DESC, notification_id DESC) WHERE is_read = FALSE;
 CREATE INDEX idx_file_attachments_task_id ON file_attachments(task_id);
+CREATE INDEX idx_file_attachments_user_uploaded ON file_attachments(user_id, uploaded_at DESC, attachment_id DESC);
+CREATE INDEX idx_daily_user_stats_date ON daily_user_stats(stat_date);
+CREATE INDEX idx_schedule_entries_task_id ON schedule_entries(task_id);
+-- Full-text search over task titles and descriptions; the expression must
+-- match full_text.PG_DOCUMENT for the planner to use it
+CREATE INDEX idx_tasks_search ON tasks USING GIN (
+    (setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+     setweight(to_tsvector('simple', coalesce(description, '')), 'B'))
+);
 
 -- Function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -0,0 +1,200 @@
+"""
+SQL dialect compiler for Smart Study Planner
+Translates the PostgreSQL-flavoured queries used by the models into the
+dialect of the active backend, caching each compiled statement
+"""
+
+import re
+from functools import lru_cache
+from db_config import DatabaseConfig
+
+# A parenthesised group, allowing two levels of nested parentheses
+_PARENS = r"\((?:[^()]|\((?:[^()]|\([^()]*\))*\))*\)"
+
+# Postgres interval arithmetic on the current date/time or a column, with an
+# optional multiplier, e.g. NOW() - INTERVAL '7 days',
+# CURRENT_DATE - %s * INTERVAL '1 day' or
+# streak_date - ROW_NUMBER() OVER (ORDER BY streak_date) * INTERVAL '1 day'
+_INTERVAL_RE = re.compile(
+    r"(NOW\(\)|CURRENT_DATE|CURRENT_TIMESTAMP|[\w.]+)\s*([-+])\s*"
+    r"(?:(%s|\d+(?:\.\d+)?|[\w.]+(?:\s*" + _PARENS + r")?(?:\s+OVER\s*" + _PARENS + r")?)\s*\*\s*)?"
+    r"INTERVAL\s*'(\d+(?:\.\d+)?|%s)\s+(day|hour|minute|second|month|year)s?'",
+    re.IGNORECASE
+)
+# INTERVAL '%s days': psycopg2 fills the quoted placeholder client-side, but
+# a server-side parameter cannot sit inside a literal
+_QUOTED_INTERVAL_PARAM_RE = re.compile(
+    r"INTERVAL\s*'%s\s+(day|hour|minute|second|month|year)s?'",
+    re.IGNORECASE
+)
+_DATE_TRUNC_RE = re.compile(r"DATE_TRUNC\(\s*'(\w+)'\s*,\s*([^()]+?)\s*\)", re.IGNORECASE)
+_EXTRACT_EPOCH_RE = re.compile(
+    r"EXTRACT\(\s*EPOCH\s+FROM\s+\(\s*([\w.]+)\s*-\s*([\w.]+)\s*\)\s*\)",
+    re.IGNORECASE
+)
+_EXTRACT_RE = re.compile(r"EXTRACT\(\s*(YEAR|MONTH|DAY|HOUR|MINUTE|DOW)\s+FROM\s+([\w.]+)\s*\)", re.IGNORECASE)
+_DATE_CAST_RE = re.compile(r"(\?|[\w.]+)::date\b", re.IGNORECASE)
+# datetime() also reads ISO text with a 'T' separator, so mixed stored formats compare correctly
+_TIMESTAMP_CAST_RE = re.compile(r"(\?|[\w.]+)::timestamp\b", re.IGNORECASE)
+# The operand is a function call, parenthesised group, placeholder or name
+_FLOAT_CAST_RE = re.compile(
+    r"([\w.]*" + _PARENS + r"|\?|[\w.]+)::(?:float|real|numeric|double precision)\b",
+    re.IGNORECASE
+)
+_ILIKE_RE = re.compile(r"\bILIKE\b", re.IGNORECASE)
+_NOW_RE = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+_CURRENT_DATE_RE = re.compile(r"\bCURRENT_DATE\b", re.IGNORECASE)
+
+_EXTRACT_FORMATS = {
+    'YEAR': '%Y',
+    'MONTH': '%m',
+    'DAY': '%d',
+    'HOUR': '%H',
+    'MINUTE': '%M',
+    'DOW': '%w'
+}
+
+_TRUNC_MODIFIERS = {
+    'year': "'start of year'",
+    'month': "'start of month'",
+    'day': None
+}
+
+
+def _sqlite_interval(match):
+    """Rewrite <date/time> +/- [n *] INTERVAL into a SQLite date()/datetime() call"""
+    base, sign, factor, amount, unit = match.groups()
+    unit = unit.lower()
+    if factor is None and amount != '%s':
+        modifier = f"'{sign}{amount} {unit}s'"
+    else:
+        # Signed number concatenated with the unit, e.g. -(? * 7) || ' days'
+        value = ' * '.join(term for term in (factor, amount) if term not in (None, '1')) or '1'
+        modifier = f"{'-' if sign == '-' else ''}({value}) || ' {unit}s'"
+    anchor = base.upper()
+    if anchor == 'CURRENT_DATE':
+        # date() keeps CURRENT_DATE comparable with both DATE and DATETIME columns
+        return f"date('now', 'localtime', {modifier})"
+    if anchor in ('NOW()', 'CURRENT_TIMESTAMP'):
+        return f"datetime('now', 'localtime', {modifier})"
+    # date/timestamp column - interval is a timestamp in Postgres too
+    return f"datetime({base}, {modifier})"
+
+
+
+def _sqlite_date_trunc(match):
+    """Rewrite DATE_TRUNC('unit', expr) into SQLite date()"""
+    unit, expr = match.group(1).lower(), match.group(2)
+    if unit not in _TRUNC_MODIFIERS:
+        return match.group(0)
+    modifier = _TRUNC_MODIFIERS[unit]
+    return f"date({expr}, {modifier})" if modifier else f"date({expr})"
+
+
+def _sqlite_extract(match):
+    """Rewrite EXTRACT(field FROM expr) into strftime()"""
+    field, expr = match.group(1).upper(), match.group(2)
+    return f"CAST(strftime('{_EXTRACT_FORMATS[field]}', {expr}) AS INTEGER)"
+
+
+def _convert_placeholders(sql, numbered=False):
+    """
+    Convert psycopg2 pyformat placeholders (%s, %%) to sqlite3 qmark style,
+    or to PostgreSQL $1..$n parameters when numbered is set
+    """
+    out = []
+    count = 0
+    i = 0
+    quote = None
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        if char == '%' and i + 1 < length:
+            nxt = sql[i + 1]
+            if nxt == '%':
+                out.append('%')
+                i += 2
+                continue
+            if nxt == 's' and quote and numbered:
+                raise ValueError(f"Placeholder inside a quoted literal cannot be a server-side parameter: {sql.strip()[:80]}")
+            if nxt == 's' and not quote:
+                count += 1
+                out.append(f"${count}" if numbered else '?')
+                i += 2
+                continue
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def _compile_sqlite(sql):
+    """Translate a PostgreSQL statement into SQLite syntax"""
+    sql = _INTERVAL_RE.sub(_sqlite_interval, sql)
+    sql = _convert_placeholders(sql)
+    sql = _EXTRACT_EPOCH_RE.sub(r"((julianday(\1) - julianday(\2)) * 86400)", sql)
+    sql = _EXTRACT_RE.sub(_sqlite_extract, sql)
+    sql = _DATE_TRUNC_RE.sub(_sqlite_date_trunc, sql)
+    sql = _DATE_CAST_RE.sub(r"date(\1)", sql)
+    sql = _TIMESTAMP_CAST_RE.sub(r"datetime(\1)", sql)
+    sql = _FLOAT_CAST_RE.sub(r"CAST(\1 AS REAL)", sql)
+    sql = _ILIKE_RE.sub("LIKE", sql)
+    sql = _NOW_RE.sub("datetime('now', 'localtime')", sql)
+    sql = _CURRENT_DATE_RE.sub("date('now', 'localtime')", sql)
+    return sql
+
+
+def _compile_numbered(sql):
+    """
+    Convert pyformat placeholders to PostgreSQL $n parameters (PREPARE/asyncpg).
+    INTERVAL '%s unit' becomes (%s * INTERVAL '1 unit'); any other placeholder
+    inside a quoted literal raises ValueError.
+    """
+    sql = _QUOTED_INTERVAL_PARAM_RE.sub(lambda m: f"(%s * INTERVAL '1 {m.group(1).lower()}')", sql)
+    return _convert_placeholders(sql, numbered=True)
+
+
+_COMPILERS = {
+    'sqlite': _compile_sqlite,
+    'postgresql-numbered': _compile_numbered
+}
+
+
+@lru_cache(maxsize=DatabaseConfig.DB_STATEMENT_CACHE_SIZE)
+def _compile_cached(sql, dialect):
+    return _COMPILERS[dialect](sql)
+
+
+class SQLCompiler:
+    """Per-dialect statement translation with a bounded compile cache"""
+
+    @staticmethod
+    def compile(sql, dialect):
+        """
+        Compile a PostgreSQL-style statement for the given dialect.
+        PostgreSQL statements are returned unchanged; other dialects are
+        translated once and served from the cache on later calls.
+        """
+        if dialect not in _COMPILERS:
+            return sql
+        return _compile_cached(sql, dialect)
+
+    @staticmethod
+    def cache_info():
+        """Get compile cache hit/miss statistics"""
+        info = _compile_cached.cache_info()
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize
+        }
+
+    @staticmethod
+    def clear_cache():
+        """Drop all compiled statements"""
+        _compile_cached.cache_clear()
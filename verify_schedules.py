@@ -0,0 +1,54 @@
+"""
+Check stored schedule plans against a full replan
+
+    python verify_schedules.py [--user-id 42] [--rebuild]
+
+Applies any pending repair to each stored plan, then compares it day by day
+with SmartPlanner.build_schedule run from scratch on the same pending tasks,
+start day, parameters and scoring time. Exits with status 1 when a plan
+differs; --rebuild replaces the differing plans with a fresh one.
+"""
+
+import argparse
+import logging
+import sys
+
+from database import Database
+from models import SchedulePlan
+from planner_logic import SmartPlanner
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify incrementally repaired schedule plans')
+    parser.add_argument('--user-id', type=int, help='only check this user (default: every stored plan)')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild plans that differ')
+    args = parser.parse_args()
+
+    if args.user_id:
+        user_ids = [args.user_id]
+    else:
+        user_ids = [row[0] for row in Database.fetch_all(
+            "SELECT user_id FROM schedule_plans ORDER BY user_id", row_format='tuple'
+        )]
+
+    mismatched = 0
+    for user_id in user_ids:
+        days = SmartPlanner.verify_planned_schedule(user_id)
+        if not days:
+            continue
+        mismatched += 1
+        print(f"user {user_id}: stored plan differs from a full replan on {', '.join(days)}")
+        if args.rebuild:
+            plan = SchedulePlan.get(user_id)
+            with Database.transaction():
+                SmartPlanner._replan(user_id, plan['hours_per_day'], plan['days_ahead'], plan['start_date'])
+            print(f"user {user_id}: plan rebuilt")
+
+    print(f"Checked {len(user_ids)} plans, {mismatched} differ")
+    Database.close_pool()
+    return 1 if mismatched and not args.rebuild else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    sys.exit(main())
@@ -22,14 +22,14 @@ class WeeklySummaryGenerator:
         
         week_end_date = week_start_date + timedelta(days=6)
         
-        tasks = Task.get_by_date_range(user_id, week_start_date, week_end_date)
+        tasks = Task.get_by_date_range(user_id, week_start_date, week_end_date, as_records=True, fields='planning')
         
         total_tasks_planned = len(tasks)
-        completed_tasks = [t for t in tasks if t.get('status') == 'completed']
+        completed_tasks = [t for t in tasks if t.status == 'completed']
         total_tasks_completed = len(completed_tasks)
         
-        total_hours_planned = sum(float(t.get('estimated_hours', 0)) for t in tasks)
-        total_hours_actual = sum(float(t.get('actual_hours', 0)) for t in tasks)
+        total_hours_planned = sum(t.estimated_hours for t in tasks)
+        total_hours_actual = sum(t.actual_hours for t in tasks)
         
         completion_rate = (total_tasks_completed / total_tasks_planned * 100) if total_tasks_planned > 0 else 0
         
@@ -40,12 +40,12 @@ class WeeklySummaryGenerator:
         
         subject_breakdown = {}
         for task in tasks:
-            subject = task.get('subject_name', 'No Subject')
+            subject = task.subject_name or 'No Subject'
             if subject not in subject_breakdown:
                 subject_breakdown[subject] = {'total': 0, 'completed': 0, 'hours': 0}
             subject_breakdown[subject]['total'] += 1
-            subject_breakdown[subject]['hours'] += float(task.get('actual_hours', 0))
-            if task.get('status') == 'completed':
+            subject_breakdown[subject]['hours'] += task.actual_hours
+            if task.status == 'completed':
                 subject_breakdown[subject]['completed'] += 1
         
         summary_data = {
@@ -58,9 +58,9 @@ class WeeklySummaryGenerator:
             'subject_breakdown': subject_breakdown,
             'tasks_by_status': {
                 'completed': total_tasks_completed,
-                'in_progress': len([t for t in tasks if t.get('status') == 'in_progress']),
-                'pending': len([t for t in tasks if t.get('status') == 'pending']),
-                'overdue': len([t for t in tasks if t.get('status') == 'overdue'])
+                'in_progress': len([t for t in tasks if t.status == 'in_progress']),
+                'pending': len([t for t in tasks if t.status == 'pending']),
+                'overdue': len([t for t in tasks if t.status == 'overdue'])
             }
         }
         